@@ -0,0 +1,6 @@
+"""Benchmarks."""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
@@ -0,0 +1,91 @@
+"""Fragment sets.
+
+Generates synthetic fragment sets for the benchmarks.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import numpy
+import os
+
+from os import path as ospath
+from PIL import Image as pil_image
+
+# Aliases
+
+_default_rng = numpy.random.default_rng
+_join = ospath.join
+_makedirs = os.makedirs
+_npmgrid = numpy.mgrid
+_npsin = numpy.sin
+_npstack = numpy.stack
+_npubyte = numpy.ubyte
+_pil_image_fromarray = pil_image.fromarray
+
+# End
+
+source_scale = 2
+"""Source image size to fragment resolution ratio. The fragments are downscaled when loaded, as the real ones are."""
+
+
+def make_frag(loc, width, height, seed):
+    """Makes a synthetic JPEG fragment with smooth stripes and some noise.
+
+    Args:
+        loc: the image location
+        width: the image width
+        height: the image height
+        seed: the seed of the stripe directions, the colors, and the noise
+    """
+    width = int(width)
+    height = int(height)
+    rng = _default_rng(seed)
+
+    y_grid, x_grid = _npmgrid[0: height, 0: width]
+    channels = []
+
+    for _ in range(3):
+        x_freq, y_freq = rng.uniform(0.01, 0.1, 2)
+        phase = rng.uniform(0, 6.28)
+        channel = (_npsin(x_grid * x_freq + y_grid * y_freq + phase) + 1) * rng.uniform(40, 127)
+        channels.append(channel)
+    # end for
+
+    image_np = _npstack(channels, axis=-1)
+    image_np += rng.normal(0, 6, image_np.shape)
+    image_np = image_np.clip(0, 255).astype(_npubyte)
+    _pil_image_fromarray(image_np, "RGB").save(loc, quality=90)
+
+
+def make_frag_set(path, count, resolution, seed=0):
+    """Makes a synthetic fragment set.
+
+    Args:
+        path: the fragment set folder, created if needed
+        count: the fragment count
+        resolution: the fragment resolution that the set is for
+        seed: the seed of the first fragment; The other fragments use the following seeds
+
+    Returns:
+        result: the fragment locations
+    """
+    path = str(path)
+    count = int(count)
+    resolution = int(resolution)
+    seed = int(seed)
+
+    _makedirs(path, exist_ok=True)
+    width = resolution * source_scale
+    height = resolution * source_scale * 3 // 4
+    result = []
+
+    for index in range(count):
+        loc = _join(path, f"Frag-{index + 1}.jpg")
+        make_frag(loc, width, height, seed + index)
+        result.append(loc)
+    # end for
+
+    return result
@@ -0,0 +1,335 @@
+"""Benchmark suites.
+
+Times the stages of the blending engine on synthetic fragment sets.
+The cases are a grid of fragment resolutions, fragment counts, and grid sizes.
+The results are JSON serializable, so that they can be compared between releases.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import datetime
+import itertools
+import numpy
+import os
+import platform
+import statistics
+import tempfile
+import time
+
+from os import path as ospath
+from PIL import Image as pil_image
+
+from aidesign_blend.benchmarks import frag_sets
+from aidesign_blend.libs import blenders
+from aidesign_blend.libs import configs
+from aidesign_blend.libs import defaults
+from aidesign_blend.libs import pack_info
+from aidesign_blend.libs import utils
+
+# Aliases
+
+_Blender = blenders.Blender
+_BlendersConfig = configs.BlendersConfig
+_cpu_count = os.cpu_count
+_join = ospath.join
+_logln = utils.logln
+_makedirs = os.makedirs
+_make_frag_set = frag_sets.make_frag_set
+_mean = statistics.mean
+_median = statistics.median
+_now = datetime.datetime.now
+_perf_counter = time.perf_counter
+_platform = platform.platform
+_product = itertools.product
+_python_version = platform.python_version
+_TemporaryDirectory = tempfile.TemporaryDirectory
+
+# End
+
+results_version = 1
+"""Benchmark results format version."""
+
+stage_names = blenders.timed_stage_names
+"""Names of the timed blender methods, in the timing order. Same as blenders.timed_stage_names."""
+
+default_frag_resolutions = [32, 64, 128]
+"""Default fragment resolutions."""
+default_frag_counts = [16, 64]
+"""Default fragment counts."""
+default_grid_sizes = [(8, 8), (16, 16)]
+"""Default grid sizes. The (x_frag_count, y_frag_count) tuples."""
+
+quick_frag_resolutions = [16]
+"""Quick suite fragment resolutions."""
+quick_frag_counts = [8]
+"""Quick suite fragment counts."""
+quick_grid_sizes = [(4, 4)]
+"""Quick suite grid sizes."""
+
+debug_logging_levels = [0, 105]
+"""Debug levels of the debug logging timings. 0 disables the debug logs. 105 enables the block array logs."""
+
+
+def make_cases(frag_resolutions, frag_counts, grid_sizes):
+    """Makes the cases of a suite.
+
+    Args:
+        frag_resolutions: the fragment resolutions
+        frag_counts: the fragment counts
+        grid_sizes: the grid sizes, the (x_frag_count, y_frag_count) tuples
+
+    Returns:
+        result: the cases, the dicts with the "frag_resolution", "frag_count", "x_frag_count", and "y_frag_count" keys
+    """
+    result = []
+
+    for resolution, count, grid_size in _product(frag_resolutions, frag_counts, grid_sizes):
+        x_frag_count, y_frag_count = grid_size
+
+        case = {
+            "frag_resolution": int(resolution),
+            "frag_count": int(count),
+            "x_frag_count": int(x_frag_count),
+            "y_frag_count": int(y_frag_count)
+        }
+
+        result.append(case)
+    # end for
+
+    return result
+
+
+def _time_stage(func, repeats, call_count):
+    """Returns timing.
+
+    Calls func repeats times. Each call makes call_count calls of the timed blender method.
+    """
+    secs = []
+
+    for _ in range(repeats):
+        start_time = _perf_counter()
+        func()
+        secs.append(_perf_counter() - start_time)
+    # end for
+
+    timing = {
+        "calls_per_repeat": call_count,
+        "min_secs": min(secs),
+        "median_secs": _median(secs),
+        "mean_secs": _mean(secs),
+        "min_secs_per_call": min(secs) / call_count
+    }
+
+    return timing
+
+
+def _make_config_overrides(case):
+    """Returns overrides.
+
+    Starts from the default blenders config. Blends a random layout in memory on 1 thread, without the persistent
+    fragment index and store.
+    """
+    overrides = _BlendersConfig.load_default()
+
+    overrides.update({
+        "manual_seed": 0,
+        "random_frags": True,
+        "avoid_random_duplicates": False,
+        "frag_resolution": case["frag_resolution"],
+        "x_frag_count": case["x_frag_count"],
+        "y_frag_count": case["y_frag_count"],
+        "save_frag_locations": False,
+        "frag_locations_data_format": "none",
+        "workers": 1,
+        "canvas_backend": "memory"
+    })
+
+    overrides["frag_resolution_overrides"]["apply"] = False
+    overrides["frags_grid"]["save"] = True
+    overrides["streaming"]["enabled"] = False
+    overrides["pipeline"]["enabled"] = False
+    overrides["frag_prefetch"]["enabled"] = False
+    overrides["frag_index"]["enabled"] = False
+    overrides["batch"]["count"] = 1
+    overrides["frag_store"]["enabled"] = False
+    overrides["preview"]["enabled"] = False
+    return overrides
+
+
+class _EagerLogBlender(_Blender):
+    """Eager logging blender.
+
+    Builds every debug log message, then discards the ones below its debug level. This is how the blender logged
+    before it built the messages lazily.
+    """
+
+    def enabled_for(self, debug_level):
+        return True
+
+    def logstr(self, string="", debug_level=0):
+        if callable(string):
+            string = string()
+
+        super().logstr(string, debug_level)
+
+    def logln(self, line="", debug_level=0):
+        if callable(line):
+            line = line()
+
+        super().logln(line, debug_level)
+
+
+def time_debug_logging(case, frags_path, proj_path, repeats):
+    """Times the _blend_block method of a case at each debug level in debug_logging_levels.
+
+    At each level, times an eager logging blender, which builds every debug log message as the blender did before, and
+    the lazy logging Blender.
+
+    Args:
+        case: the case, a dict from make_cases
+        frags_path: the synthetic fragment set folder of the case
+        proj_path: the blend project folder of the case
+        repeats: the count of the timed repeats
+
+    Returns:
+        result: a dict from the "eager_level_<level>" and "lazy_level_<level>" keys to the _blend_block timings
+    """
+    def time_stage(name, func, call_count):
+        # Runs the other stages once without timing them
+        if name != "_blend_block":
+            func()
+            return None
+        # end if
+
+        timing = _time_stage(func, repeats, call_count)
+        return timing
+
+    result = {}
+
+    for debug_level in debug_logging_levels:
+        for mode, blender_class in [("eager", _EagerLogBlender), ("lazy", _Blender)]:
+            blender = blender_class(frags_path, proj_path, [], debug_level)
+            blender.config_overrides.update(_make_config_overrides(case))
+            stages = blender.time_stages(time_stage)
+            result[f"{mode}_level_{debug_level}"] = stages["timings"]["_blend_block"]
+        # end for
+    # end for
+
+    return result
+
+
+def run_case(case, frags_path, proj_path, repeats):
+    """Runs a benchmark case.
+
+    Times the blender methods in stage_names with the Blender.time_stages method. Then times the debug logging with
+    time_debug_logging.
+
+    Args:
+        case: the case, a dict from make_cases
+        frags_path: the synthetic fragment set folder of the case
+        proj_path: the blend project folder of the case
+        repeats: the count of the timed repeats of each method
+
+    Returns:
+        result: the case result, the case items and the "canvas_width", "canvas_height", "timings", and "debug_logging"
+            items
+    """
+    frags_path = str(frags_path)
+    proj_path = str(proj_path)
+    repeats = int(repeats)
+    repeats = max(repeats, 1)
+
+    blender = _Blender(frags_path, proj_path, [], 0)
+    blender.config_overrides.update(_make_config_overrides(case))
+    stages = blender.time_stages(lambda name, func, call_count: _time_stage(func, repeats, call_count))
+
+    if stages["frag_count"] != case["frag_count"]:
+        raise ValueError(f"Found {stages['frag_count']} fragments at {frags_path}; Expects {case['frag_count']}")
+
+    result = dict(case)
+    result["canvas_width"] = stages["canvas_width"]
+    result["canvas_height"] = stages["canvas_height"]
+    result["timings"] = stages["timings"]
+    result["debug_logging"] = time_debug_logging(case, frags_path, proj_path, repeats)
+    return result
+
+
+def _make_env_info():
+    """Returns info."""
+    info = {
+        "package_version": pack_info.ver,
+        "python_version": _python_version(),
+        "numpy_version": numpy.__version__,
+        "pillow_version": pil_image.__version__,
+        "platform": _platform(),
+        "cpu_count": _cpu_count()
+    }
+
+    return info
+
+
+def run_suite(cases, repeats=3, logs=None):
+    """Runs a benchmark suite.
+
+    Generates a synthetic fragment set for each fragment resolution and count, and a blend project for each case,
+    in a temporary folder.
+
+    Args:
+        cases: the cases, the dicts from make_cases
+        repeats: the count of the timed repeats of each method
+        logs: the progress logs, or None for no progress logs
+
+    Returns:
+        result: the suite result, a JSON serializable dict
+    """
+    repeats = int(repeats)
+    repeats = max(repeats, 1)
+
+    if logs is None:
+        logs = []
+
+    start_time = _now()
+    case_results = []
+
+    with _TemporaryDirectory() as temp_path:
+        frags_paths = {}
+
+        for index, case in enumerate(cases):
+            set_key = case["frag_resolution"], case["frag_count"]
+
+            if set_key not in frags_paths:
+                frags_path = _join(temp_path, f"Frags-{set_key[0]}px-{set_key[1]}")
+                _make_frag_set(frags_path, set_key[1], set_key[0])
+                frags_paths[set_key] = frags_path
+            # end if
+
+            proj_path = _join(temp_path, f"Project-{index + 1}")
+            config = _BlendersConfig.load_from_path(defaults.default_blend_project_path)
+            _makedirs(proj_path)
+            _BlendersConfig.save_to_path(config, proj_path)
+            case_result = run_case(case, frags_paths[set_key], proj_path, repeats)
+            case_results.append(case_result)
+
+            blend_secs = case_result["timings"]["_blend_block"]["min_secs"]
+            info = str(
+                f"Completed benchmark case {index + 1} / {len(cases)}:  "
+                f"Resolution: {case['frag_resolution']}  Fragments: {case['frag_count']}  "
+                f"Grid: {case['x_frag_count']} x {case['y_frag_count']}  Blend: {blend_secs:.3f} s"
+            )
+
+            _logln(logs, info)
+        # end for
+    # end with
+
+    result = {
+        "version": results_version,
+        "time": start_time.isoformat(timespec="seconds"),
+        "repeats": repeats,
+        "environment": _make_env_info(),
+        "cases": case_results
+    }
+
+    return result
@@ -103,6 +103,22 @@ def _run_command():
         from aidesign_blend.exes import blend_info
         blend_info.argv_copy = argv_copy
         blend_info.run()
+    elif command == "sweep":
+        from aidesign_blend.exes import blend_sweep
+        blend_sweep.argv_copy = argv_copy
+        blend_sweep.run()
+    elif command == "render":
+        from aidesign_blend.exes import blend_render
+        blend_render.argv_copy = argv_copy
+        blend_render.run()
+    elif command == "cache":
+        from aidesign_blend.exes import blend_cache
+        blend_cache.argv_copy = argv_copy
+        blend_cache.run()
+    elif command == "bench":
+        from aidesign_blend.exes import blend_bench
+        blend_bench.argv_copy = argv_copy
+        blend_bench.run()
     else:  # elif command is AnyOther:
         print(unknown_cmd_info.format(command), file=_stderr)
         _exit(1)
@@ -0,0 +1,167 @@
+""""blend bench" command executable."""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import copy
+import json
+import sys
+
+from aidesign_blend.benchmarks import suites
+
+# Aliases
+
+_argv = sys.argv
+_deepcopy = copy.deepcopy
+_dumps_json = json.dumps
+_exit = sys.exit
+_make_cases = suites.make_cases
+_run_suite = suites.run_suite
+_stderr = sys.stderr
+
+# -
+
+brief_usage = "blend bench [--quick] [--repeats <repeats>] [--output <file>]"
+"""Brief usage."""
+
+usage = str(
+    f"Usage: {brief_usage}\n"
+    f"Help: blend help"
+)
+"""Usage."""
+
+# Nominal info strings
+
+will_start_info = "Will run {} benchmark cases with {} repeats each"
+"""Info to display when the benchmarks start."""
+
+saved_info = "Saved the benchmark results at: {}"
+"""Info to display after saving the results."""
+
+# -
+# Error info strings
+
+unknown_arg_info = str(
+    f"\"{brief_usage}\" gets an unknown argument: {{}}\n"
+    f"{usage}"
+)
+"""Info to display when getting an unknown argument."""
+
+missing_val_info = str(
+    f"\"{brief_usage}\" gets no value for the argument: {{}}\n"
+    f"{usage}"
+)
+"""Info to display when an argument misses its value."""
+
+invalid_repeats_info = str(
+    f"\"{brief_usage}\" gets an invalid repeat count: {{}}\n"
+    f"Expects a positive integer\n"
+    f"{usage}"
+)
+"""Info to display when getting an invalid repeat count."""
+
+# End of error info strings
+
+argv_copy = None
+"""Consumable copy of sys.argv."""
+quick = None
+"""Whether to run the quick suite."""
+repeats = None
+"""Repeat count."""
+output_loc = None
+"""Output file location, or None."""
+
+
+def _parse_args():
+    global argv_copy
+    global quick
+    global repeats
+    global output_loc
+
+    quick = False
+    repeats_str = None
+    output_loc = None
+
+    while len(argv_copy) > 0:
+        arg = str(argv_copy.pop(0))
+
+        if arg == "--quick":
+            quick = True
+            continue
+
+        if arg not in ["--repeats", "--output"]:
+            print(unknown_arg_info.format(arg), file=_stderr)
+            _exit(1)
+
+        if len(argv_copy) <= 0:
+            print(missing_val_info.format(arg), file=_stderr)
+            _exit(1)
+
+        val = str(argv_copy.pop(0))
+
+        if arg == "--repeats":
+            repeats_str = val
+        else:  # elif arg == "--output":
+            output_loc = val
+        # end if
+    # end while
+
+    if repeats_str is None:
+        repeats = 1 if quick else 3
+    else:
+        try:
+            repeats = int(repeats_str)
+        except ValueError as _:
+            repeats = 0
+        # end try
+
+        if repeats < 1:
+            print(invalid_repeats_info.format(repeats_str), file=_stderr)
+            _exit(1)
+        # end if
+    # end if
+
+
+def run():
+    """Runs the executable as a command.
+
+    Prints the JSON results on stdout and the progress on stderr, so that the results can be piped.
+    """
+    _parse_args()
+
+    if quick:
+        cases = _make_cases(suites.quick_frag_resolutions, suites.quick_frag_counts, suites.quick_grid_sizes)
+    else:
+        cases = _make_cases(suites.default_frag_resolutions, suites.default_frag_counts, suites.default_grid_sizes)
+
+    print(will_start_info.format(len(cases), repeats), file=_stderr)
+    results = _run_suite(cases, repeats, [_stderr])
+    results_str = _dumps_json(results, indent=4)
+
+    if output_loc is not None:
+        with open(output_loc, "w") as output_file:
+            output_file.write(results_str + "\n")
+
+        print(saved_info.format(output_loc), file=_stderr)
+    # end if
+
+    print(results_str)
+    _exit(0)
+
+
+def main():
+    """Starts the executable."""
+    global argv_copy
+    argv_length = len(_argv)
+
+    assert argv_length >= 1
+
+    argv_copy = _deepcopy(_argv)
+    argv_copy.pop(0)
+    run()
+
+
+if __name__ == "__main__":
+    main()
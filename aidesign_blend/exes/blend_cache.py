@@ -0,0 +1,150 @@
+""""blend cache" command executable."""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import copy
+import sys
+
+from os import path as ospath
+
+from aidesign_blend.libs import blenders
+from aidesign_blend.libs import caches
+from aidesign_blend.libs import configs
+from aidesign_blend.libs import defaults
+from aidesign_blend.libs import utils
+
+# Aliases
+
+_argv = sys.argv
+_BlendersConfig = configs.BlendersConfig
+_deepcopy = copy.deepcopy
+_exists = ospath.exists
+_exit = sys.exit
+_find_frag_store_path = blenders.find_frag_store_path
+_FragStore = caches.FragStore
+_join = ospath.join
+_load_json = utils.load_json
+_stderr = sys.stderr
+
+# -
+
+brief_usage = "blend cache [clear]"
+"""Brief usage."""
+
+usage = str(
+    f"Usage: {brief_usage}\n"
+    f"Help: blend help"
+)
+"""Usage."""
+
+# Nominal info strings
+
+info = str(
+    f"Fragment store is at: {{}}\n"
+    f"Files: {{}}  Size: {{:.2f}} MB"
+)
+"""Primary info to display."""
+
+clear_info = "Cleared {} files from the fragment store at: {}"
+"""Info to display after clearing the fragment store."""
+
+# -
+# Error info strings
+
+too_many_args_info = str(
+    f"\"{brief_usage}\" gets too many arguments\n"
+    f"Expects 0 to 1 arguments; Gets {{}} arguments\n"
+    f"{usage}"
+)
+"""Info to display when getting too many arguments."""
+
+unknown_arg_info = str(
+    f"\"{brief_usage}\" gets an unknown argument: {{}}\n"
+    f"{usage}"
+)
+"""Info to display when getting an unknown argument."""
+
+# -
+
+argv_copy = None
+"""Consumable copy of sys.argv."""
+
+
+def _find_store_path():
+    """Returns path.
+
+    The fragment store path of the selected project, resolved the same way as in a blending session.
+    The default path if no project with a blenders config is selected.
+    """
+    path = defaults.frag_store_path
+
+    if not _exists(defaults.blend_start_status_loc):
+        return path
+
+    start_status = _load_json(defaults.blend_start_status_loc)
+    proj_path = start_status.get("project_path")
+
+    if proj_path is None:
+        return path
+
+    proj_path = str(proj_path)
+    config_loc = _join(proj_path, _BlendersConfig.default_name)
+
+    if not _exists(config_loc):
+        return path
+
+    config = _BlendersConfig.load(config_loc)
+    config = _BlendersConfig.verify(config)
+    path = _find_frag_store_path(config, proj_path)
+    return path
+
+
+def run():
+    """Runs the executable as a command."""
+    global argv_copy
+    argv_copy_length = len(argv_copy)
+
+    assert argv_copy_length >= 0
+
+    # The byte budget is not used to inspect or clear the store
+    frag_store = _FragStore(_find_store_path(), 0)
+
+    if argv_copy_length == 0:
+        file_count, held_bytes = frag_store.find_usage()
+        held_megabytes = held_bytes / (1024 * 1024)
+        print(info.format(frag_store.path, file_count, held_megabytes))
+        _exit(0)
+    elif argv_copy_length == 1:
+        arg = str(argv_copy.pop(0))
+
+        if arg == "clear":
+            removed_count = frag_store.clear()
+            print(clear_info.format(removed_count, frag_store.path))
+            _exit(0)
+        else:
+            print(unknown_arg_info.format(arg), file=_stderr)
+            _exit(1)
+        # end if
+    else:  # elif argv_copy_length > 1:
+        print(too_many_args_info.format(argv_copy_length), file=_stderr)
+        _exit(1)
+    # end if
+
+
+def main():
+    """Starts the executable."""
+    global argv_copy
+    argv_length = len(_argv)
+
+    assert argv_length >= 1
+
+    argv_copy = _deepcopy(_argv)
+    argv_copy.pop(0)
+    run()
+
+
+if __name__ == "__main__":
+    main()
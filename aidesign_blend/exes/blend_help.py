@@ -56,10 +56,31 @@ start:
     When:   You start a session.
     How-to: blend start
     Notes:  You will be prompted with the command status. You need to confirm to continue.
+sweep:
+    When:   You start a session that blends a picture for each of some manual seeds.
+    How-to: blend sweep --seeds <seeds> [--jobs <jobs>]
+    Notes:  <seeds> is like 1..64 or 1,5,9..12. <jobs> is the process count, the CPU count by default.
+            The results are tagged with their seeds and match the "blend start" results with those seeds.
+render:
+    When:   You re-render a saved fragment layout, such as a preview layout, at another resolution.
+    How-to: blend render <layout-file> [--frag-resolution <resolution>]
+    Notes:  <layout-file> is a Frag-Locations-From-*.npz, .csv, .jsonl, or .txt file.
+            The .txt files saved by the earlier versions have no rotations.
+            <resolution> is in pixels; the project config resolution by default. Uses no random layout.
 reset:
     When:   You want to reset the app data.
     How-to: blend reset
     Notes:  You will lose the current app data after the reset.
+cache:
+    When:   You inspect or clear the stored resized fragments.
+    How-to: blend cache [clear]
+    Notes:  "blend cache" shows the fragment store size. "blend cache clear" removes the stored fragments.
+            Uses the frag_store.path config item of the selected project; The default store otherwise.
+bench:
+    When:   You time the blending engine, such as to compare 2 releases.
+    How-to: blend bench [--quick] [--repeats <repeats>] [--output <file>]
+    Notes:  Blends synthetic fragment sets of several resolutions, counts, and grid sizes in a temporary folder.
+            Prints the JSON results; Also saves them to <file> if given. --quick runs 1 small case.
 
 """.strip()
 """Primary info to display."""
@@ -0,0 +1,289 @@
+""""blend render" command executable."""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import copy
+import datetime
+import sys
+import traceback
+import typing
+
+from os import path as ospath
+
+from aidesign_blend.libs import blenders
+from aidesign_blend.libs import defaults
+from aidesign_blend.libs import layouts
+from aidesign_blend.libs import utils
+
+# Aliases
+
+_abspath = ospath.abspath
+_argv = sys.argv
+_Blender = blenders.Blender
+_deepcopy = copy.deepcopy
+_exit = sys.exit
+_format_exc = traceback.format_exc
+_IO = typing.IO
+_join = ospath.join
+_layout_exts = layouts.exts
+_load_json = utils.load_json
+_load_layout = layouts.load
+_logln = utils.logln
+_logstr = utils.logstr
+_now = datetime.datetime.now
+_stderr = sys.stderr
+_stdout = sys.stdout
+
+# -
+
+brief_usage = "blend render <layout-file> [--frag-resolution <resolution>]"
+"""Brief usage."""
+
+usage = str(
+    f"Usage: {brief_usage}\n"
+    f"Help: blend help"
+)
+"""Usage."""
+
+# Nominal info strings
+
+will_start_session_info = str(
+    f"Will start a layout rendering session\n"
+    f"---- The following will be logged to: {{}} ----"
+)
+"""Info to display when the session starts."""
+
+completed_session_info = str(
+    f"---- The above has been logged to: {{}} ----\n"
+    f"Completed the layout rendering session"
+)
+"""Info to display when the session completes."""
+
+# -
+# Error info strings
+
+unknown_arg_info = str(
+    f"\"{brief_usage}\" gets an unknown argument: {{}}\n"
+    f"{usage}"
+)
+"""Info to display when getting an unknown argument."""
+
+missing_val_info = str(
+    f"\"{brief_usage}\" gets no value for the argument: {{}}\n"
+    f"{usage}"
+)
+"""Info to display when an argument misses its value."""
+
+missing_layout_info = str(
+    f"\"{brief_usage}\" gets no layout file\n"
+    f"{usage}"
+)
+"""Info to display when getting no layout file."""
+
+invalid_layout_info = str(
+    f"\"{brief_usage}\" cannot load the layout file: {{}}\n"
+    f"{{}}\n"
+    f"Expects a fragment locations file with any of the extensions: {{}}\n"
+    f"{usage}"
+)
+"""Info to display when the layout file cannot be loaded."""
+
+invalid_res_info = str(
+    f"\"{brief_usage}\" gets an invalid fragment resolution: {{}}\n"
+    f"Expects an integer greater than or equal to 2\n"
+    f"{usage}"
+)
+"""Info to display when getting an invalid fragment resolution."""
+
+none_proj_info = str(
+    f"\"{brief_usage}\" finds that the project_path selection is None\n"
+    f"Please select a project with the \"blend project <path-to-project>\" command\n"
+    f"{usage}"
+)
+"""Info to display when the project selection is None."""
+
+stopped_session_info = str(
+    f"---- The above has been logged to: {{}} ----\n"
+    f"Stopped the layout rendering session"
+)
+"""Info to display when the session stops from an exception."""
+
+# End of error info strings
+# Session info strings
+
+session_header_info = str(
+    f"AIDesign-Blend layout rendering session\n"
+    f"Project path: {{}}\n"
+    f"Layout file: {{}}\n"
+    f"Fragment resolution: {{}}\n"
+    f"-"
+)
+"""Session header info."""
+
+session_stop_trailer_info = str(
+    f"-\n"
+    f"Execution stopped after: {{}} (days, hours: minutes: seconds)\n"
+    f"End of AIDesign-Blend layout rendering session (stopped)"
+)
+"""Session trailer info to display after execution stops."""
+
+session_comp_trailer_info = str(
+    f"-\n"
+    f"Execution time: {{}} (days, hours: minutes: seconds)\n"
+    f"End of AIDesign-Blend layout rendering session"
+)
+"""Session trailer info to display after execution completes."""
+
+# -
+
+argv_copy = None
+"""Consumable copy of sys.argv."""
+proj_path = None
+"""Project path."""
+log_loc = None
+"""Log location."""
+layout_loc = None
+"""Layout file location."""
+layout = None
+"""Layout."""
+frag_res = None
+"""Fragment resolution. None for the project config resolution."""
+
+
+def _start_session():
+    start_time = _now()
+    log_file: _IO = open(log_loc, "a+")
+    all_logs = [_stdout, log_file]
+    err_logs = [_stderr, log_file]
+    frag_res_str = "Project config" if frag_res is None else str(frag_res)
+    _logln(all_logs, session_header_info.format(proj_path, layout_loc, frag_res_str))
+
+    try:
+        debug_level = 1  # NOTE: Check before each release
+        blender = _Blender(None, proj_path, all_logs, debug_level)
+        blender.layout = layout
+
+        if frag_res is not None:
+            blender.config_overrides["frag_resolution"] = frag_res
+            blender.config_overrides["frag_resolution_overrides"] = {
+                "apply": False, "x_resolution": frag_res, "y_resolution": frag_res
+            }
+        # end if
+
+        blender.prep()
+        blender.blend()
+    except BaseException as base_exception:
+        _logstr(err_logs, _format_exc())
+        end_time = _now()
+        exe_time = end_time - start_time
+        _logln(all_logs, session_stop_trailer_info.format(exe_time))
+        log_file.close()
+        raise base_exception
+    # end try
+
+    end_time = _now()
+    exe_time = end_time - start_time
+    _logln(all_logs, session_comp_trailer_info.format(exe_time))
+    log_file.close()
+
+
+def _parse_args():
+    global argv_copy
+    global layout_loc
+    global frag_res
+
+    layout_loc = None
+    frag_res = None
+
+    while len(argv_copy) > 0:
+        arg = str(argv_copy.pop(0))
+
+        if arg == "--frag-resolution":
+            if len(argv_copy) <= 0:
+                print(missing_val_info.format(arg), file=_stderr)
+                _exit(1)
+
+            val = str(argv_copy.pop(0))
+
+            try:
+                frag_res = int(val)
+            except ValueError as _:
+                frag_res = 0
+            # end try
+
+            if frag_res < 2:
+                print(invalid_res_info.format(val), file=_stderr)
+                _exit(1)
+        elif layout_loc is None and not arg.startswith("--"):
+            layout_loc = arg
+        else:
+            print(unknown_arg_info.format(arg), file=_stderr)
+            _exit(1)
+        # end if
+    # end while
+
+    if layout_loc is None:
+        print(missing_layout_info, file=_stderr)
+        _exit(1)
+
+
+def run():
+    """Runs the executable as a command."""
+    global proj_path
+    global log_loc
+    global layout_loc
+    global layout
+
+    _parse_args()
+
+    start_status = _load_json(defaults.blend_start_status_loc)
+    proj_path = start_status["project_path"]
+
+    if proj_path is None:
+        print(none_proj_info, file=_stderr)
+        _exit(1)
+
+    proj_path = str(proj_path)
+    layout_loc = _abspath(layout_loc)
+
+    try:
+        layout = _load_layout(layout_loc)
+    except (OSError, ValueError, KeyError) as exception:
+        print(invalid_layout_info.format(layout_loc, exception, _layout_exts), file=_stderr)
+        _exit(1)
+    # end try
+
+    log_loc = _join(proj_path, "log.txt")
+    print(will_start_session_info.format(log_loc))
+
+    try:
+        _start_session()
+    except BaseException as base_exception:
+        if isinstance(base_exception, SystemExit):
+            exit_code = base_exception.code
+        else:
+            exit_code = 1
+
+        print(stopped_session_info.format(log_loc), file=_stderr)
+        _exit(exit_code)
+    # end try
+
+    print(completed_session_info.format(log_loc))
+    _exit(0)
+
+
+def main():
+    """Starts the executable."""
+    global argv_copy
+    argv_length = len(_argv)
+    assert argv_length >= 1
+    argv_copy = _deepcopy(_argv)
+    argv_copy.pop(0)
+    run()
+
+
+if __name__ == "__main__":
+    main()
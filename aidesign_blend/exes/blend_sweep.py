@@ -0,0 +1,296 @@
+""""blend sweep" command executable."""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import copy
+import datetime
+import os
+import sys
+import traceback
+import typing
+
+from os import path as ospath
+
+from aidesign_blend.libs import defaults
+from aidesign_blend.libs import sweeps
+from aidesign_blend.libs import utils
+
+# Aliases
+
+_argv = sys.argv
+_cpu_count = os.cpu_count
+_deepcopy = copy.deepcopy
+_exit = sys.exit
+_format_exc = traceback.format_exc
+_IO = typing.IO
+_join = ospath.join
+_load_json = utils.load_json
+_logln = utils.logln
+_logstr = utils.logstr
+_now = datetime.datetime.now
+_parse_seeds = sweeps.parse_seeds
+_run_sweep = sweeps.run_sweep
+_stderr = sys.stderr
+_stdout = sys.stdout
+
+# -
+
+brief_usage = "blend sweep --seeds <seeds> [--jobs <jobs>]"
+"""Brief usage."""
+
+usage = str(
+    f"Usage: {brief_usage}\n"
+    f"Help: blend help"
+)
+"""Usage."""
+
+# Nominal info strings
+
+will_start_session_info = str(
+    f"Will start a seed sweep session\n"
+    f"---- The following will be logged to: {{}} ----"
+)
+"""Info to display when the session starts."""
+
+completed_session_info = str(
+    f"---- The above has been logged to: {{}} ----\n"
+    f"Completed the seed sweep session"
+)
+"""Info to display when the session completes."""
+
+# -
+# Error info strings
+
+unknown_arg_info = str(
+    f"\"{brief_usage}\" gets an unknown argument: {{}}\n"
+    f"{usage}"
+)
+"""Info to display when getting an unknown argument."""
+
+missing_val_info = str(
+    f"\"{brief_usage}\" gets no value for the argument: {{}}\n"
+    f"{usage}"
+)
+"""Info to display when an argument misses its value."""
+
+missing_seeds_info = str(
+    f"\"{brief_usage}\" gets no seeds\n"
+    f"{usage}"
+)
+"""Info to display when getting no seeds."""
+
+invalid_seeds_info = str(
+    f"\"{brief_usage}\" gets invalid seeds: {{}}\n"
+    f"Expects comma separated seeds and seed ranges; For example: 1..64 or 1,5,9..12\n"
+    f"{usage}"
+)
+"""Info to display when getting invalid seeds."""
+
+invalid_jobs_info = str(
+    f"\"{brief_usage}\" gets an invalid job count: {{}}\n"
+    f"Expects a positive integer\n"
+    f"{usage}"
+)
+"""Info to display when getting an invalid job count."""
+
+none_frags_info = str(
+    f"\"{brief_usage}\" finds that the frags_path selection is None\n"
+    f"Please select the frags with the \"blend frags <path-to-frags>\" command\n"
+    f"{usage}"
+)
+"""Info to display when the frags selection is None."""
+
+none_proj_info = str(
+    f"\"{brief_usage}\" finds that the project_path selection is None\n"
+    f"Please select a project with the \"blend project <path-to-project>\" command\n"
+    f"{usage}"
+)
+"""Info to display when the project selection is None."""
+
+stopped_session_info = str(
+    f"---- The above has been logged to: {{}} ----\n"
+    f"Stopped the seed sweep session"
+)
+"""Info to display when the session stops from an exception."""
+
+# End of error info strings
+# Session info strings
+
+session_header_info = str(
+    f"AIDesign-Blend seed sweep session\n"
+    f"Project path: {{}}\n"
+    f"Frags path: {{}}\n"
+    f"Seeds: {{}}\n"
+    f"-"
+)
+"""Session header info."""
+
+session_stop_trailer_info = str(
+    f"-\n"
+    f"Execution stopped after: {{}} (days, hours: minutes: seconds)\n"
+    f"End of AIDesign-Blend seed sweep session (stopped)"
+)
+"""Session trailer info to display after execution stops."""
+
+session_comp_trailer_info = str(
+    f"-\n"
+    f"Execution time: {{}} (days, hours: minutes: seconds)\n"
+    f"End of AIDesign-Blend seed sweep session"
+)
+"""Session trailer info to display after execution completes."""
+
+# -
+
+argv_copy = None
+"""Consumable copy of sys.argv."""
+frags_path = None
+"""Frags path."""
+proj_path = None
+"""Project path."""
+log_loc = None
+"""Log location."""
+seeds_str = None
+"""Seeds string."""
+seeds = None
+"""Seeds."""
+jobs = None
+"""Job count."""
+
+
+def _start_session():
+    start_time = _now()
+    log_file: _IO = open(log_loc, "a+")
+    all_logs = [_stdout, log_file]
+    err_logs = [_stderr, log_file]
+    _logln(all_logs, session_header_info.format(proj_path, frags_path, seeds_str))
+
+    try:
+        debug_level = 1  # NOTE: Check before each release
+        _run_sweep(frags_path, proj_path, seeds, jobs, all_logs, debug_level)
+    except BaseException as base_exception:
+        _logstr(err_logs, _format_exc())
+        end_time = _now()
+        exe_time = end_time - start_time
+        _logln(all_logs, session_stop_trailer_info.format(exe_time))
+        log_file.close()
+        raise base_exception
+    # end try
+
+    end_time = _now()
+    exe_time = end_time - start_time
+    _logln(all_logs, session_comp_trailer_info.format(exe_time))
+    log_file.close()
+
+
+def _parse_args():
+    global argv_copy
+    global seeds_str
+    global seeds
+    global jobs
+
+    seeds_str = None
+    jobs_str = None
+
+    while len(argv_copy) > 0:
+        arg = str(argv_copy.pop(0))
+
+        if arg not in ["--seeds", "--jobs"]:
+            print(unknown_arg_info.format(arg), file=_stderr)
+            _exit(1)
+
+        if len(argv_copy) <= 0:
+            print(missing_val_info.format(arg), file=_stderr)
+            _exit(1)
+
+        val = str(argv_copy.pop(0))
+
+        if arg == "--seeds":
+            seeds_str = val
+        else:  # elif arg == "--jobs":
+            jobs_str = val
+        # end if
+    # end while
+
+    if seeds_str is None:
+        print(missing_seeds_info, file=_stderr)
+        _exit(1)
+
+    try:
+        seeds = _parse_seeds(seeds_str)
+    except ValueError as _:
+        print(invalid_seeds_info.format(seeds_str), file=_stderr)
+        _exit(1)
+    # end try
+
+    if jobs_str is None:
+        jobs = _cpu_count() or 1
+    else:
+        try:
+            jobs = int(jobs_str)
+        except ValueError as _:
+            jobs = 0
+        # end try
+
+        if jobs < 1:
+            print(invalid_jobs_info.format(jobs_str), file=_stderr)
+            _exit(1)
+        # end if
+    # end if
+
+
+def run():
+    """Runs the executable as a command."""
+    global frags_path
+    global proj_path
+    global log_loc
+
+    _parse_args()
+
+    start_status = _load_json(defaults.blend_start_status_loc)
+    frags_path = start_status["frags_path"]
+    proj_path = start_status["project_path"]
+
+    if frags_path is None:
+        print(none_frags_info, file=_stderr)
+        _exit(1)
+
+    if proj_path is None:
+        print(none_proj_info, file=_stderr)
+        _exit(1)
+
+    frags_path = str(frags_path)
+    proj_path = str(proj_path)
+    log_loc = _join(proj_path, "log.txt")
+    print(will_start_session_info.format(log_loc))
+
+    try:
+        _start_session()
+    except BaseException as base_exception:
+        if isinstance(base_exception, SystemExit):
+            exit_code = base_exception.code
+        else:
+            exit_code = 1
+
+        print(stopped_session_info.format(log_loc), file=_stderr)
+        _exit(exit_code)
+    # end try
+
+    print(completed_session_info.format(log_loc))
+    _exit(0)
+
+
+def main():
+    """Starts the executable."""
+    global argv_copy
+    argv_length = len(_argv)
+    assert argv_length >= 1
+    argv_copy = _deepcopy(_argv)
+    argv_copy.pop(0)
+    run()
+
+
+if __name__ == "__main__":
+    main()
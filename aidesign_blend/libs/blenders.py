@@ -5,54 +5,142 @@
 # First added by username: liu-yucheng
 # Last updated by username: liu-yucheng
 
+import concurrent.futures
+import csv
 import datetime
+import json
 import numpy
 import os
 import pathlib
 import random
+import threading
+import time
 import typing
 
 from os import path as ospath
 from PIL import Image as pil_image
 
+from aidesign_blend.libs import caches
 from aidesign_blend.libs import configs
 from aidesign_blend.libs import contexts
 from aidesign_blend.libs import defaults
+from aidesign_blend.libs import frags
 from aidesign_blend.libs import grads
+from aidesign_blend.libs import layouts
+from aidesign_blend.libs import metrics
+from aidesign_blend.libs import pipelines
+from aidesign_blend.libs import reporters
 from aidesign_blend.libs import utils
+from aidesign_blend.libs import writers
 
 # Aliases
 
+_as_completed = concurrent.futures.as_completed
 _BlendersConfig = configs.BlendersConfig
 _BlenderContext = contexts.BlenderContext
 _Callable = typing.Callable
-_clamp = utils.clamp_float
+_commonpath = ospath.commonpath
+_csv_writer = csv.writer
+_default_rng = numpy.random.default_rng
+_dirname = ospath.dirname
+_discover_frags = frags.discover_frags
+_dumps_json = json.dumps
+_exists = ospath.exists
+_find_index_loc = frags.find_index_loc
+_FragCache = caches.FragCache
+_FragIndex = frags.FragIndex
+_FragStore = caches.FragStore
+_Generator = numpy.random.Generator
+_hash_file = frags.hash_file
+_isabs = ospath.isabs
 _join = ospath.join
-_listdir = os.listdir
+_Layout = layouts.Layout
+_load_frag = caches.load_frag
 _load_json = utils.load_json
+_local = threading.local
+_Lock = threading.Lock
 _logstr = utils.logstr
 _LU = grads.LU
+_makedirs = os.makedirs
+_make_writer = writers.make_writer
 _now = datetime.datetime.now
+_npadd = numpy.add
+_nparange = numpy.arange
 _nparray = numpy.array
 _npclip = numpy.clip
+_npcopyto = numpy.copyto
+_npdouble = numpy.double
+_npintc = numpy.intc
+_nplinspace = numpy.linspace
 _npmultiply = numpy.multiply
 _npseed = numpy.random.seed
 _npsingle = numpy.single
-_nptranspose = numpy.transpose
+_npsqrt = numpy.sqrt
+_npstack = numpy.stack
+_nptile = numpy.tile
 _npubyte = numpy.ubyte
+_npunique = numpy.unique
+_npzeros = numpy.zeros
 _np_ndarray = numpy.ndarray
+_open_memmap = numpy.lib.format.open_memmap
 _Path = pathlib.Path
+_perf_counter = time.perf_counter
+_PhaseMetrics = metrics.PhaseMetrics
 _pil_image_fromarray = pil_image.fromarray
-_pil_image_open = pil_image.open
+_PlannedFragCache = caches.PlannedFragCache
 _Poly1V = grads.Poly1V
+_ProgressEvents = reporters.ProgressEvents
+_ProgressReporter = reporters.ProgressReporter
 _randint = random.randint
-_rand_bool = utils.rand_bool
-_save_text = utils.save_text
+_remove = os.remove
+_save_layout_npz = layouts.save_npz
 _seed = random.seed
-_shuffle = random.shuffle
+_SharedFrags = caches.SharedFrags
+_StageTimer = pipelines.StageTimer
+_ThreadPoolExecutor = concurrent.futures.ThreadPoolExecutor
+_verify_blendable_layout = layouts.verify_blendable
 
 # End
 
+flip_x = layouts.flip_x
+"""Flipping matrix bit flag of the flip named "x". Same as layouts.flip_x."""
+flip_y = layouts.flip_y
+"""Flipping matrix bit flag of the flip named "y". Same as layouts.flip_y."""
+rot_180 = layouts.rot_180
+"""Rotation matrix bit flag of the 180 degree rotation. Same as layouts.rot_180."""
+flip_str = layouts.flip_str
+"""Finds the name of a flipping matrix item. Same as layouts.flip_str."""
+rand_perm_chunk_size = 1024 * 1024
+"""Fragment index count of each chunk of random permutations."""
+frag_locs_buffer_size = 1024 * 1024
+"""Write buffer size of the fragment locations files in bytes."""
+scratch_strip_size = 16 * 1024 * 1024
+"""Byte count of each strip of rows read from a memmap scratch file when its image is saved."""
+timed_stage_names = ["_read_frags_path", "_prep_matrices", "_blend_block", "_render_frags_grid", "_save_blended_blocks"]
+"""Names of the blender methods that Blender.time_stages times, in the timing order."""
+
+
+def find_frag_store_path(config, proj_path):
+    """Finds the fragment store path of a blend project.
+
+    Args:
+        config: the verified blenders config of the project
+        proj_path: the project path
+
+    Returns:
+        result: the default fragment store path if the frag_store.path config item is None, the item joined to the
+            project path if it is relative, or the item as is if it is absolute
+    """
+    result = config["frag_store"]["path"]
+
+    if result is None:
+        result = defaults.frag_store_path
+    elif not _isabs(result):
+        result = _join(str(proj_path), result)
+    # end if
+
+    return result
+
 
 class Blender:
     """Blender."""
@@ -71,15 +159,67 @@ class Blender:
         """Configuration."""
         self._context = _BlenderContext()
         """Context."""
+        self._thread_local = _local()
+        """Thread local data."""
+        self.config_overrides = {}
+        """Config items that override the project config items."""
+        self.result_tag = None
+        """Tag added to the result file names. None for no tag."""
+        self.layout = None
+        """Layout to render instead of a random layout. None for a random layout."""
+        self.metrics = _PhaseMetrics()
+        """Phase metrics. Records the wall time, the CPU time, the peak RSS, and the throughput of each phase."""
+
+    def _run_phase(self, phase_func, counts=None, labels=None, overlapped=False):
+        """Runs a phase method, records its metrics, and logs them.
+
+        Args:
+            phase_func: the phase method, called without args
+            counts: a callable that returns the counts of the items the phase processes, or None
+            labels: the labels to add to the phase record, a dict, or None
+            overlapped: whether the phase runs on the encoder thread alongside the other phases
+
+        Returns:
+            result: the phase method result
+        """
+        c = self._context
+
+        result, record = self.metrics.run(
+            phase_func.__name__, phase_func, counts=counts, labels=labels, overlapped=overlapped
+        )
+
+        self.logln(lambda: self.metrics.phase_str(record), 1)
+
+        if c.progress_events is not None:
+            c.progress_events.emit("phase", phase=record)
+
+        return result
+
+    def enabled_for(self, debug_level):
+        """Finds if the logs at a debug level are enabled.
+
+        Guard the building of expensive log messages with this method.
+
+        Args:
+            debug_level: the debug level
+
+        Returns:
+            result: the result
+        """
+        result = debug_level <= self._debug_level
+        return result
 
     def logstr(self, string="", debug_level=0):
         """Logs a string.
 
         Args:
-            string: the string
+            string: the string, or a callable that returns the string and is called only if the debug level is enabled
             debug_level: the debug level
         """
         if debug_level <= self._debug_level:
+            if callable(string):
+                string = string()
+
             _logstr(self._logs, string)
         # end if
 
@@ -87,16 +227,28 @@ class Blender:
         """Logs a line.
 
         Args:
-            line: the line
+            line: the line, or a callable that returns the line and is called only if the debug level is enabled
             debug_level: the debug level
         """
-        line += "\n"
-        self.logstr(line, debug_level)
+        if debug_level <= self._debug_level:
+            if callable(line):
+                line = line()
+
+            line += "\n"
+            self.logstr(line, debug_level)
+        # end if
 
     def _read_config(self):
         config_loc = _join(self._proj_path, _BlendersConfig.default_name)
         self.logln(f"Blenders config location: {config_loc}", 1)
         self._config = _BlendersConfig.load(config_loc)
+
+        if len(self.config_overrides) > 0:
+            self._config.update(self.config_overrides)
+            self._config = _BlendersConfig.verify(self._config)
+            self.logln(f"Overrode blenders config items: {self.config_overrides}", 1)
+        # end if
+
         self.logln("Completed reading blenders config", 1)
 
     def _pad_coefs_exps(self, coefs, exps):
@@ -157,6 +309,7 @@ class Blender:
 
         _seed(rand_seed)
         _npseed(rand_seed)
+        c.rng = _default_rng(rand_seed)
         c.rand_seed = rand_seed
         c.rand_mode = rand_mode
         self.logln(f"Random:  Mode: {rand_mode}  Seed: {rand_seed}", 1)
@@ -228,6 +381,39 @@ class Blender:
         c.save_frag_locs = save_frag_locs
         self.logln(f"Save fragment locations: {save_frag_locs}", 1)
 
+        # End
+        # Parse save_metrics
+
+        save_metrics: bool = self._config["save_metrics"]
+        c.save_metrics = save_metrics
+        self.logln(f"Save metrics: {save_metrics}", 1)
+
+        # End
+        # Parse progress
+
+        progress_key = "progress"
+        progress_interval: int = self._config[progress_key]["interval_seconds"]
+        progress_events_path: str = self._config[progress_key]["events_path"]
+        c.progress_interval = progress_interval
+
+        if progress_events_path is None:
+            c.progress_events = None
+            self.logln(f"Progress:  Interval: {progress_interval} s", 1)
+        else:
+            if not _isabs(progress_events_path):
+                progress_events_path = _join(self._proj_path, progress_events_path)
+
+            c.progress_events = _ProgressEvents(progress_events_path, self.result_tag)
+            self.logln(f"Progress:  Interval: {progress_interval} s  Events path: {progress_events_path}", 1)
+        # end if
+
+        # End
+        # Parse frag_locations_data_format
+
+        frag_locs_data_format: str = self._config["frag_locations_data_format"]
+        c.frag_locs_data_format = frag_locs_data_format
+        self.logln(f"Fragment locations data format: {frag_locs_data_format}", 1)
+
         # End
         # Already parsed frag_resolution_overrides; End
         # Parse frags_grid
@@ -265,6 +451,142 @@ class Blender:
 
         self.logln(info, 1)
 
+        # End
+        # Parse frag_cache_megabytes
+
+        frag_cache_megabytes: int = self._config["frag_cache_megabytes"]
+        frag_cache_bytes = frag_cache_megabytes * 1024 * 1024
+        c.frag_cache_bytes = frag_cache_bytes
+        self.logln(f"Fragment cache:  Budget: {frag_cache_megabytes} MB ({frag_cache_bytes} bytes)", 1)
+
+        # End
+        # Parse workers
+
+        workers: int = self._config["workers"]
+        c.workers = workers
+        self.logln(f"Workers: {workers}", 1)
+
+        # End
+        # Parse streaming
+
+        streaming_key = "streaming"
+        stream_canvas: bool = self._config[streaming_key]["enabled"]
+        stream_format: str = self._config[streaming_key]["format"]
+        c.stream_canvas = stream_canvas
+        c.stream_format = stream_format
+        self.logln(f"Streaming:  Enabled: {stream_canvas}  Format: {stream_format}", 1)
+
+        # End
+        # Parse pipeline
+
+        pipeline_key = "pipeline"
+        pipeline_enabled: bool = self._config[pipeline_key]["enabled"]
+        pipeline_loaders: int = self._config[pipeline_key]["loaders"]
+        prefetch_rows: int = self._config[pipeline_key]["prefetch_rows"]
+        c.pipeline_enabled = pipeline_enabled
+        c.pipeline_loaders = pipeline_loaders
+        c.prefetch_rows = prefetch_rows
+
+        if pipeline_enabled:
+            self.logln(f"Pipeline:  Loaders: {pipeline_loaders}  Prefetch rows: {prefetch_rows}", 1)
+
+        # End
+        # Parse frag_prefetch
+
+        frag_prefetch_key = "frag_prefetch"
+        frag_prefetch_enabled: bool = self._config[frag_prefetch_key]["enabled"]
+        frag_prefetch_rows: int = self._config[frag_prefetch_key]["rows_ahead"]
+        c.frag_prefetch_enabled = frag_prefetch_enabled
+        c.frag_prefetch_rows = frag_prefetch_rows
+        c.frags_grid_interleaved = False
+
+        if frag_prefetch_enabled:
+            self.logln(f"Fragment prefetch:  Rows ahead: {frag_prefetch_rows}", 1)
+
+        # End
+        # Parse canvas_backend, scratch_path
+
+        canvas_backend: str = self._config["canvas_backend"]
+        scratch_path: str = self._config["scratch_path"]
+
+        if scratch_path is None:
+            scratch_path = self._proj_path
+        elif not _isabs(scratch_path):
+            scratch_path = _join(self._proj_path, scratch_path)
+        # end if
+
+        c.canvas_backend = canvas_backend
+        c.scratch_path = scratch_path
+
+        if canvas_backend == "memmap":
+            self.logln(f"Canvas backend: {canvas_backend}  Scratch path: {scratch_path}", 1)
+        else:
+            self.logln(f"Canvas backend: {canvas_backend}", 1)
+        # end if
+
+        # End
+        # Parse frag_index
+
+        frag_index_key = "frag_index"
+        frag_index_enabled: bool = self._config[frag_index_key]["enabled"]
+        frag_index_path: str = self._config[frag_index_key]["path"]
+
+        if frag_index_path is None:
+            frag_index_path = defaults.frag_indexes_path
+        elif not _isabs(frag_index_path):
+            frag_index_path = _join(self._proj_path, frag_index_path)
+        # end if
+
+        c.frag_index_enabled = frag_index_enabled
+        c.frag_index_path = frag_index_path
+
+        if frag_index_enabled:
+            self.logln(f"Fragment index path: {frag_index_path}", 1)
+
+        # End
+        # Parse batch
+
+        batch_count: int = self._config["batch"]["count"]
+        c.batch_count = batch_count
+        c.batch_index = 0
+        self.logln(f"Batch count: {batch_count}", 1)
+
+        # End
+        # Parse draft_decoding
+
+        draft_decoding: bool = self._config["draft_decoding"]
+        c.draft_decoding = draft_decoding
+        self.logln(f"Draft decoding: {draft_decoding}", 1)
+
+        # End
+        # Parse frag_store
+
+        frag_store_key = "frag_store"
+        frag_store_enabled: bool = self._config[frag_store_key]["enabled"]
+        frag_store_megabytes: int = self._config[frag_store_key]["max_megabytes"]
+        frag_store_path = find_frag_store_path(self._config, self._proj_path)
+
+        c.frag_store_enabled = frag_store_enabled
+        c.frag_store_bytes = frag_store_megabytes * 1024 * 1024
+        c.frag_store_path = frag_store_path
+
+        if frag_store_enabled:
+            self.logln(f"Fragment store:  Path: {frag_store_path}  Cap: {frag_store_megabytes} MB", 1)
+
+        # End
+        # Parse preview
+
+        preview_key = "preview"
+        preview_enabled: bool = self._config[preview_key]["enabled"]
+        preview_res: int = self._config[preview_key]["resolution"]
+        preview_continue: bool = self._config[preview_key]["continue"]
+        c.preview_enabled = preview_enabled
+        c.preview_res = preview_res
+        c.preview_continue = preview_continue
+
+        if preview_enabled:
+            self.logln(f"Preview:  Resolution: {preview_res}  Continue: {preview_continue}", 1)
+
         # End
         # Parse custom_gradient
 
@@ -298,51 +620,54 @@ class Blender:
         self.logln(f"Tweaked PIL safety max pixels:  Width: {max_width}  Height: {max_height}  Total: {max_pixels}", 1)
 
     def _read_frags_path(self, frags_path):
-        frag_names = _listdir(frags_path)
-        frag_names.sort()
-        self.logln(f"frag_names: {frag_names}", 102)
-        frag_locs = []
+        """Returns frag_infos.
 
-        for name in frag_names:
-            loc = _join(frags_path, name)
-            frag_locs.append(loc)
+        Scans the folder for the image file extensions, then probes the image headers with a bounded thread pool.
+        With the fragment index enabled, only probes the files that are not in the index or changed.
+        """
+        c = self._context
 
-        orig_frag_locs = frag_locs
-        frag_locs = []
+        if c.frag_index_enabled:
+            index_loc = _find_index_loc(c.frag_index_path, frags_path)
+            frag_index = _FragIndex(index_loc, frags_path)
+            frag_index.load()
+            frag_infos = frag_index.update()
 
-        for loc in orig_frag_locs:
-            try:
-                image = _pil_image_open(loc)
-                image_format = image.format
-            except Exception as _:
-                image_format = None
-            # end try
+            if frag_index.needs_save():
+                frag_index.save()
 
-            is_image = image_format is not None
+            info = str(
+                f"Updated the fragment index at: {index_loc}\n"
+                f"  Reused: {frag_index.reused_count}  Probed: {frag_index.probed_count}  "
+                f"Removed: {frag_index.removed_count}"
+            )
 
-            if is_image:
-                frag_locs.append(loc)
-        # end for
+            self.logln(info, 1)
+        else:
+            frag_infos = _discover_frags(frags_path)
+        # end if
 
-        self.logln(f"frag_locs: {frag_locs}", 102)
-        frag_count = len(frag_locs)
+        self.logln(lambda: f"frag_infos: {frag_infos}", 102)
+        frag_count = len(frag_infos)
         self.logln(f"frag_count: {frag_count}", 101)
-        return frag_locs
+        return frag_infos
 
     def _prep_frags(self):
         c = self._context
 
         frags_path = self._frags_path
-        frag_locs = self._read_frags_path(frags_path)
-        frag_count = len(frag_locs)
+        frag_infos = self._read_frags_path(frags_path)
+        frag_count = len(frag_infos)
 
         if frag_count <= 0:
             frags_path = defaults.default_frags_path
             self.logln(f"Found no fragments in frags_path, defaulting frags_path to: {frags_path}", 1)
-            frag_locs = self._read_frags_path(frags_path)
-            frag_count = len(frag_locs)
+            frag_infos = self._read_frags_path(frags_path)
+            frag_count = len(frag_infos)
         # end if
 
+        frag_locs = [info.loc for info in frag_infos]
+
         frags_name = _Path(frags_path).name
         c.frags_path = frags_path
         self.logln(f"Fragments path: {frags_path}", 1)
@@ -351,262 +676,414 @@ class Blender:
         c.frag_count = frag_count
         self.logln(f"Fragment count: {frag_count}", 1)
         c.frag_locs = frag_locs
+        c.frag_infos = frag_infos
         self.logln("Prepared fragment locations")
 
-    def _make_2d_matrix(self, y_size, x_size):
-        matrix = [
-            [
-                None
-                for _ in range(x_size)
-            ]
-            for _ in range(y_size)
-        ]
+    def _prep_layout_frags(self):
+        """Prepares the fragment locations from self.layout instead of the fragments path."""
+        c = self._context
 
-        return matrix
+        layout: _Layout = self.layout
+        missing_locs = [loc for loc in layout.frag_locs if not _exists(loc)]
 
-    def _make_numpy_2d_matrix(self, x_size, y_size):
-        matrix = _np_ndarray((x_size, y_size), dtype=_npsingle)
-        return matrix
+        if len(missing_locs) > 0:
+            raise ValueError(f"Found {len(missing_locs)} missing layout fragments, including: {missing_locs[0]}")
 
-    def _grad_prog(self, index, count):
-        index = int(index)
-        count = int(count)
-        c = self._context
+        frags_path = _commonpath([_dirname(loc) for loc in layout.frag_locs])
+        frags_name = _Path(frags_path).name
+        c.frags_path = frags_path
+        self.logln(f"Fragments path: {frags_path}", 1)
+        c.frags_name = frags_name
+        self.logln(f"Fragments name: {frags_name}", 1)
+        c.frag_count = len(layout.frag_locs)
+        self.logln(f"Fragment count: {c.frag_count}", 1)
+        c.frag_locs = layout.frag_locs
 
-        last_index = count - 1
-        float_index = float(index)
-        float_last_index = float(last_index)
-        line_prog = float_index / float_last_index
+        # The content hashes for the fragment store are found on demand
+        c.frag_infos = []
+        self.logln("Prepared fragment locations from the layout")
 
-        grad_func: _Callable[..., float] = c.grad_func
-        prog = grad_func(line_prog)
-        return prog
+    def _load_frag(self, loc, width, height):
+        """Returns frag.
 
-    def _gen_rand_frag_indices(self):
+        Reads the frag from the fragment store if enabled, or loads the frag and puts it into the store.
+        """
         c = self._context
 
-        idxs = [idx for idx in range(c.frag_count)]
-        _shuffle(idxs)
+        if c.frag_store is None:
+            frag = _load_frag(loc, width, height, c.draft_decoding)
+            return frag
 
-        result = idxs
-        return result
+        frag_store: _FragStore = c.frag_store
+        content_hash = c.frag_hashes.get(loc)
 
-    def _prep_matrices(self):
-        c = self._context
+        if content_hash is None:
+            content_hash = _hash_file(loc)
+            c.frag_hashes[loc] = content_hash
+        # end if
 
-        # Make index matrix
+        # Keep the draft decoded frags apart from the fully decoded ones
+        store_key = f"{content_hash}-draft" if c.draft_decoding else content_hash
+        frag = frag_store.get(store_key, width, height)
+
+        if frag is None:
+            frag = _load_frag(loc, width, height, c.draft_decoding)
+            frag_store.put(store_key, width, height, frag)
+        # end if
+
+        return frag
+
+    def _prep_frag_cache(self):
+        c = self._context
 
-        index_matrix = self._make_2d_matrix(c.y_frag_count, c.x_frag_count)
+        if c.frag_store_enabled:
+            frag_store = _FragStore(c.frag_store_path, c.frag_store_bytes)
+            removed_count = frag_store.prune()
+            self.logln(f"Pruned {removed_count} least recently used files from the fragment store", 1)
+            c.frag_store = frag_store
 
-        if c.avoid_rand_dups:
-            remain_indices = self._gen_rand_frag_indices()
-        else:  # elif not c.avoid_rand_dups:
-            remain_indices = None
+            # The content hashes come from the fragment index, if enabled; Otherwise, they are found on demand
+            c.frag_hashes = {info.loc: info.content_hash for info in c.frag_infos}
+        else:
+            c.frag_store = None
+            c.frag_hashes = None
         # end if
 
-        if c.rand_frags:
-            for iy in range(c.y_frag_count):
-                for ix in range(c.x_frag_count):
-                    if c.avoid_rand_dups:
-                        remain_indices_len = len(remain_indices)
+        frag_cache = _FragCache(c.frag_cache_bytes, self._load_frag)
+        c.frag_cache = frag_cache
+        self.logln("Prepared the fragment cache", 1)
 
-                        if remain_indices_len <= 0:
-                            remain_indices = self._gen_rand_frag_indices()
+    def _get_frag(self, index, flip, rot):
+        """Returns frag.
 
-                        index_matrix[iy][ix] = remain_indices.pop(0)
-                    else:  # elif not c.avoid_rand_dups:
-                        index_matrix[iy][ix] = _randint(0, c.frag_count - 1)
-                    # end if
-                # end for
-            # end for
-        else:  # elif not c.rand_frags:
-            index = 0
+        The frag is a read-only uint8 NumPy array with subscripts [y, x, c].
+        The flipping and the rotation are applied as views of the cached frag.
+        """
+        c = self._context
 
-            for iy in range(c.y_frag_count):
-                for ix in range(c.x_frag_count):
-                    index_matrix[iy][ix] = index
-                    index = (index + 1) % c.frag_count
-                # end for
-            # end for
+        loc = c.frag_locs[index]
+
+        if c.planned_frag_cache is not None:
+            frag_cache = c.planned_frag_cache
+        else:
+            frag_cache = c.frag_cache
         # end if
 
-        self.logln(f"index_matrix: {index_matrix}", 103)
+        frag = frag_cache.get(loc, c.frag_width, c.frag_height)
 
-        # End make index matrix
-        # Make flip matrix
+        # Equivalent to PIL FLIP_TOP_BOTTOM
+        if flip & flip_x:
+            frag = frag[::-1, :]
 
-        flip_matrix = self._make_2d_matrix(c.y_frag_count, c.x_frag_count)
+        # Equivalent to PIL FLIP_LEFT_RIGHT
+        if flip & flip_y:
+            frag = frag[:, ::-1]
 
-        if c.rand_flip:
-            for iy in range(c.y_frag_count):
-                for ix in range(c.x_frag_count):
-                    flip_x = _rand_bool()
-                    flip_y = _rand_bool()
-                    flip = ""
+        # Equivalent to PIL ROTATE_180
+        if rot & rot_180:
+            frag = frag[::-1, ::-1]
 
-                    if flip_x:
-                        flip += "x"
+        return frag
 
-                    if flip_y:
-                        flip += "y"
+    def _grad_progs(self, count):
+        """Returns progs.
 
-                    flip_matrix[iy][ix] = flip
-                # end for
-            # end for
+        Finds the gradient progresses of all the indices in [0, count).
+        """
+        count = int(count)
+        c = self._context
+
+        line_progs = _nplinspace(0, 1, count, dtype=_npdouble)
+        grad_func: _Callable[..., _np_ndarray] = c.grad_func
+        progs = grad_func(line_progs)
+        return progs
+
+    def _make_blend_matrices(self, width, height):
+        """Returns ulbm, urbm, llbm, lrbm.
+
+        Finds the blend factors with NumPy broadcasting. Subscripts [y, x].
+        """
+        width = int(width)
+        height = int(height)
+
+        x_progs = self._grad_progs(width)
+        y_progs = self._grad_progs(height)
+
+        # The remaining progress at index i is the progress at index count - 1 - i
+        x_remains = x_progs[::-1]
+        y_remains = y_progs[::-1]
+
+        # Broadcast y along axis 0 and x along axis 1
+        x_progs = x_progs[None, :]
+        y_progs = y_progs[:, None]
+        x_remains = x_remains[None, :]
+        y_remains = y_remains[:, None]
+
+        # Use normalized 2-d distances to find blend factors
+
+        ul_progs = _npsqrt(x_progs ** 2 + y_progs ** 2)
+        ur_progs = _npsqrt(x_remains ** 2 + y_progs ** 2)
+        ll_progs = _npsqrt(x_progs ** 2 + y_remains ** 2)
+        lr_progs = _npsqrt(x_remains ** 2 + y_remains ** 2)
+
+        max_prog = 1
+        ul_remains = _npclip(max_prog - ul_progs, 0, 1)
+        ur_remains = _npclip(max_prog - ur_progs, 0, 1)
+        ll_remains = _npclip(max_prog - ll_progs, 0, 1)
+        lr_remains = _npclip(max_prog - lr_progs, 0, 1)
+
+        remain_sums = ul_remains + ur_remains + ll_remains + lr_remains
+
+        ulbm = (ul_remains / remain_sums).astype(_npsingle)
+        urbm = (ur_remains / remain_sums).astype(_npsingle)
+        llbm = (ll_remains / remain_sums).astype(_npsingle)
+        lrbm = (lr_remains / remain_sums).astype(_npsingle)
+
+        # End use normalized 2-d distances to find blend factors
+
+        return ulbm, urbm, llbm, lrbm
+
+    def _gen_rand_frag_indices(self, count):
+        """Returns indices.
+
+        The indices are the first count items of a sequence of random permutations of the fragment indices.
+        Generates the permutations in chunks, so that the memory use does not depend on the count.
+        """
+        c = self._context
+
+        rng: _Generator = c.rng
+        indices = _np_ndarray((count,), dtype=_npintc)
+        perm_count = -(-count // c.frag_count)
+        chunk_perm_count = max(1, rand_perm_chunk_size // c.frag_count)
+        frag_indices = _nparange(c.frag_count, dtype=_npintc)
+        start = 0
+
+        for chunk_start in range(0, perm_count, chunk_perm_count):
+            chunk_size = min(chunk_perm_count, perm_count - chunk_start)
+            perms = rng.permuted(_nptile(frag_indices, (chunk_size, 1)), axis=1)
+            perms = perms.ravel()[:count - start]
+            indices[start: start + len(perms)] = perms
+            start += len(perms)
+        # end for
+
+        return indices
+
+    def _prep_layout(self):
+        """Prepares the index, flipping, and rotation matrices with the random generator.
+
+        Called once for each blend of a batch.
+        """
+        c = self._context
+
+        shape = c.y_frag_count, c.x_frag_count
+        count = c.y_frag_count * c.x_frag_count
+        rng: _Generator = c.rng
+
+        # Make index matrix
+
+        if c.rand_frags:
+            if c.avoid_rand_dups:
+                index_matrix = self._gen_rand_frag_indices(count).reshape(shape)
+            else:  # elif not c.avoid_rand_dups:
+                index_matrix = rng.integers(0, c.frag_count, size=shape, dtype=_npintc)
+            # end if
+        else:  # elif not c.rand_frags:
+            index_matrix = (_nparange(count, dtype=_npintc) % c.frag_count).reshape(shape)
+        # end if
+
+        self.logln(lambda: f"index_matrix: {index_matrix}", 103)
+
+        # End make index matrix
+        # Make flip matrix
+
+        if c.rand_flip:
+            flip_matrix = rng.integers(0, flip_x | flip_y, size=shape, dtype=_npubyte, endpoint=True)
         else:  # elif not c.rand_flip:
-            for iy in range(c.y_frag_count):
-                for ix in range(c.x_frag_count):
-                    flip_matrix[iy][ix] = ""
-                # end for
-            # end for
+            flip_matrix = _npzeros(shape, dtype=_npubyte)
         # end if
 
-        self.logln(f"flip_matrix: {flip_matrix}", 103)
+        self.logln(lambda: f"flip_matrix: {flip_matrix}", 103)
 
         # End make flip matrix
         # Make rotation matrix
 
-        rot_matrix = self._make_2d_matrix(c.y_frag_count, c.x_frag_count)
-
         if c.rand_rot:
-            for iy in range(c.y_frag_count):
-                for ix in range(c.x_frag_count):
-                    rot_180 = utils.rand_bool()
-
-                    if rot_180:
-                        rot = "180"
-                    else:
-                        rot = ""
-                    # end if
-
-                    rot_matrix[iy][ix] = rot
-                # end for
-            # end for
+            rot_matrix = rng.integers(0, rot_180, size=shape, dtype=_npubyte, endpoint=True)
         else:
-            for iy in range(c.y_frag_count):
-                for ix in range(c.x_frag_count):
-                    rot_matrix[iy][ix] = ""
-                # end for
-            # end for
+            rot_matrix = _npzeros(shape, dtype=_npubyte)
         # end if
 
-        self.logln(f"rot_matrix: {rot_matrix}", 103)
+        self.logln(lambda: f"rot_matrix: {rot_matrix}", 103)
 
         # End make rotation matrix
+
+        c.index_matrix = index_matrix
+        self.logln("Prepared the index matrix", 1)
+        c.flip_matrix = flip_matrix
+        self.logln("Prepared the flipping matrix", 1)
+        c.rot_matrix = rot_matrix
+        self.logln("Prepared the rotation matrix", 1)
+
+    def _prep_given_layout(self):
+        """Prepares the index, flipping, and rotation matrices from self.layout, without the random generator."""
+        c = self._context
+
+        layout: _Layout = self.layout
+        _verify_blendable_layout(layout, "The layout to render")
+        c.x_frag_count = layout.x_frag_count
+        c.y_frag_count = layout.y_frag_count
+        self.logln(f"Layout fragment count:  X: {c.x_frag_count}  Y: {c.y_frag_count}", 1)
+
+        if c.batch_count > 1:
+            # A batch would blend the same layout again
+            c.batch_count = 1
+            self.logln("Rendering a layout blends only 1 picture; Ignored the batch count", 1)
+        # end if
+
+        c.index_matrix = layout.index_matrix
+        c.flip_matrix = layout.flip_matrix
+        c.rot_matrix = layout.rot_matrix
+        self.logln("Prepared the index, flipping, and rotation matrices from the layout", 1)
+
+    def _prep_matrices(self):
+        c = self._context
+
         # Make blend matrices
 
         width = c.frag_width // 2
         height = c.frag_height // 2
-        ulbm = self._make_numpy_2d_matrix(width, height)
-        urbm = self._make_numpy_2d_matrix(width, height)
-        llbm = self._make_numpy_2d_matrix(width, height)
-        lrbm = self._make_numpy_2d_matrix(width, height)
-
-        for iy in range(height):
-            for ix in range(width):
-                x_prog = self._grad_prog(ix, width)
-                y_prog = self._grad_prog(iy, height)
-
-                # The pre-0.7.0 blend factor formulas
-                # ul_fac = (1 - y_prog) * (1 - x_prog)
-                # ur_fac = (1 - y_prog) * x_prog
-                # ll_fac = y_prog * (1 - x_prog)
-                # lr_fac = y_prog * x_prog
-
-                # Use normalized 2-d distances to find blend factors
-
-                last_ix = width - 1
-                last_iy = height - 1
-                x_remain = self._grad_prog(last_ix - ix, width)
-                y_remain = self._grad_prog(last_iy - iy, height)
-
-                ul_prog = (x_prog ** 2 + y_prog ** 2) ** 0.5
-                ur_prog = (x_remain ** 2 + y_prog ** 2) ** 0.5
-                ll_prog = (x_prog ** 2 + y_remain ** 2) ** 0.5
-                lr_prog = (x_remain ** 2 + y_remain ** 2) ** 0.5
-
-                max_prog = 1
-                ul_remain = max_prog - ul_prog
-                ur_remain = max_prog - ur_prog
-                ll_remain = max_prog - ll_prog
-                lr_remain = max_prog - lr_prog
-
-                ul_remain = _clamp(ul_remain, 0, 1)
-                ur_remain = _clamp(ur_remain, 0, 1)
-                ll_remain = _clamp(ll_remain, 0, 1)
-                lr_remain = _clamp(lr_remain, 0, 1)
-
-                remain_sum = ul_remain + ur_remain + ll_remain + lr_remain
-
-                ul_fac = ul_remain / remain_sum
-                ur_fac = ur_remain / remain_sum
-                ll_fac = ll_remain / remain_sum
-                lr_fac = lr_remain / remain_sum
-
-                # End use normalized 2-d distances to find blend factors
-
-                ulbm[ix, iy] = ul_fac
-                urbm[ix, iy] = ur_fac
-                llbm[ix, iy] = ll_fac
-                lrbm[ix, iy] = lr_fac
-            # end for
-        # end for
+        ulbm, urbm, llbm, lrbm = self._make_blend_matrices(width, height)
 
-        info = str(
-            f"Blend matrices:\n"
-            f"  ulbm:\n"
-            f"{ulbm}\n"
-            f"  urbm:\n"
-            f"{urbm}\n"
-            f"  llbm:\n"
-            f"{llbm}\n"
-            f"  lrbm:\n"
-            f"{lrbm}\n"
-        )
+        if self.enabled_for(103):
+            info = str(
+                f"Blend matrices:\n"
+                f"  ulbm:\n"
+                f"{ulbm}\n"
+                f"  urbm:\n"
+                f"{urbm}\n"
+                f"  llbm:\n"
+                f"{llbm}\n"
+                f"  lrbm:\n"
+                f"{lrbm}\n"
+            )
 
-        self.logstr(info, 103)
+            self.logstr(info, 103)
+        # end if
 
         # End make blend matrices
 
-        c.index_matrix = index_matrix
-        self.logln("Prepared the index matrix", 1)
-        c.flip_matrix = flip_matrix
-        self.logln("Prepared the flipping matrix", 1)
-        c.rot_matrix = rot_matrix
-        self.logln("Prepared the rotation matrix", 1)
         c.bm_width = width
         c.bm_height = height
         c.ulbm = ulbm
         c.urbm = urbm
         c.llbm = llbm
         c.lrbm = lrbm
+        c.bms = _npstack([ulbm, urbm, llbm, lrbm])[:, :, :, None]
         self.logln("Prepared 4 blend matrices:  Upper-left  Upper-right  Lower-left  Lower-right", 1)
         self.logln(f"Blend matrices:  Width: {width}  Height: {height}", 1)
 
-    def _make_numpy_3d_matrix(self, x_size, y_size, z_size):
-        matrix = _np_ndarray((x_size, y_size, z_size), dtype=_npsingle)
+    def _make_numpy_3d_matrix(self, y_size, x_size, z_size):
+        matrix = _np_ndarray((y_size, x_size, z_size), dtype=_npubyte)
         return matrix
 
+    def _make_scratch_3d_matrix(self, y_size, x_size, z_size, name_prefix):
+        """Returns matrix, loc.
+
+        Makes the uint8 matrix in RAM, or in a memory-mapped .npy scratch file if the canvas backend is memmap.
+        The loc is the scratch file location, or None if the matrix is in RAM.
+        """
+        c = self._context
+
+        if c.canvas_backend == "memmap":
+            _makedirs(c.scratch_path, exist_ok=True)
+            source = self._make_source_name()
+            timestamp = self._make_timestamp()
+            name = f"{name_prefix}-Scratch-From-{source}-Time-{timestamp}.npy"
+            loc = _join(c.scratch_path, name)
+            shape = y_size, x_size, z_size
+            matrix = _open_memmap(loc, mode="w+", dtype=_npubyte, shape=shape)
+            self.logln(f"Created the scratch file at: {loc}", 1)
+        else:
+            matrix = self._make_numpy_3d_matrix(y_size, x_size, z_size)
+            loc = None
+        # end if
+
+        return matrix, loc
+
+    def _remove_scratch(self, loc):
+        if loc is not None:
+            _remove(loc)
+            self.logln(f"Removed the scratch file at: {loc}", 1)
+        # end if
+
+    def _save_scratch_image(self, matrix, scratch_loc, name):
+        """Returns loc.
+
+        Saves a uint8 [y, x, c] matrix as an image in the project folder.
+        A matrix in RAM is saved as a JPEG image.
+        A memory-mapped matrix is saved in the streaming format, strip by strip, so that only 1 strip of rows is read
+        into RAM at a time. If the saving fails, the scratch file is kept and its location is logged.
+        """
+        c = self._context
+
+        if scratch_loc is None:
+            # The uint8 [y, x, c] matrix is already in the PIL image layout
+            image = _pil_image_fromarray(matrix, "RGB")
+            loc = _join(self._proj_path, f"{name}.jpg")
+            image.save(loc, quality=95)
+            return loc
+        # end if
+
+        height, width = matrix.shape[:2]
+        strip_rows = max(scratch_strip_size // (width * 3), 1)
+        loc = _join(self._proj_path, f"{name}.{c.stream_format}")
+
+        try:
+            with _make_writer(c.stream_format, loc, width, height) as writer:
+                for y in range(0, height, strip_rows):
+                    writer.write(matrix[y: y + strip_rows])
+            # end with
+        except BaseException as _:
+            self.logln(f"Failed to save the image at: {loc}  Kept the scratch file at: {scratch_loc}", 0)
+            raise
+        # end try
+
+        return loc
+
     def _prep_canvas(self):
         c = self._context
 
         width = c.bm_width * (c.x_frag_count - 1)
         height = c.bm_height * (c.y_frag_count - 1)
-        canvas = self._make_numpy_3d_matrix(width, height, 3)
+
+        if c.stream_canvas:
+            # Hold 1 band of block rows, 1 block row for each worker
+            block_rows = min(c.workers, c.y_frag_count - 1)
+        else:
+            block_rows = c.y_frag_count - 1
+        # end if
+
+        canvas, scratch_loc = self._make_scratch_3d_matrix(block_rows * c.bm_height, width, 3, "Canvas")
 
         c.canvas_width = width
         c.canvas_height = height
         c.canvas = canvas
+        c.canvas_block_y = 0
+        c.canvas_block_rows = block_rows
+        c.canvas_scratch_loc = scratch_loc
 
         self.logln(f"Prepared the canvas:  Width: {width}  Height: {height}", 1)
 
+        if c.stream_canvas:
+            self.logln(f"Canvas band:  Block rows: {block_rows}  Height: {block_rows * c.bm_height}", 1)
+
     def _prep_frags_grid(self):
         c = self._context
 
         if c.save_frags_grid:
             width = c.frags_grid_pad + c.x_frag_count * (c.frag_width + c.frags_grid_pad)
             height = c.frags_grid_pad + c.y_frag_count * (c.frag_height + c.frags_grid_pad)
-            frags_grid = self._make_numpy_3d_matrix(width, height, 3)
+            frags_grid, scratch_loc = self._make_scratch_3d_matrix(height, width, 3, "Frags-Grid")
 
             info = str(
                 f"width: {width}\n"
@@ -615,23 +1092,77 @@ class Blender:
 
             self.logstr(info, 101)
 
-            info = str(
-                f"frags_grid:\n"
-                f"{frags_grid}\n"
-            )
+            if self.enabled_for(104):
+                info = str(
+                    f"frags_grid:\n"
+                    f"{frags_grid}\n"
+                )
+
+                self.logstr(info, 104)
+            # end if
 
-            self.logstr(info, 104)
             c.frags_grid_width = width
             c.frags_grid_height = height
             c.frags_grid = frags_grid
+            c.frags_grid_scratch_loc = scratch_loc
             self.logln(f"Prepared the fragments grid:  Width: {width}  Height: {height}", 1)
         # end if
 
-    def _blend_block(self, block_y, block_x):
+    def _make_source_name(self):
+        """Returns source.
+
+        The source is the name of the fragments, tagged with self.result_tag if any,
+        with the 1-based blend number in a batch of 2 or more blends, and with "Preview" in a preview.
+        Used in the result file names.
+        """
         c = self._context
 
-        canvas_x1 = block_x * c.bm_width
-        canvas_y1 = block_y * c.bm_height
+        source = c.frags_name
+
+        if self.result_tag is not None:
+            source += f"-{self.result_tag}"
+
+        if c.batch_count > 1:
+            source += f"-Batch-{c.batch_index + 1}"
+
+        if c.is_preview:
+            source += "-Preview"
+
+        return source
+
+    def _make_timestamp(self):
+        now = _now()
+
+        timestamp = str(
+            f"{now.year:04}{now.month:02}{now.day:02}-{now.hour:02}{now.minute:02}{now.second:02}-"
+            f"{now.microsecond:06}"
+        )
+
+        return timestamp
+
+    def _get_block_scratches(self):
+        """Returns acc, tmp.
+
+        The scratches are float32 buffers with the shape of a canvas block. Each thread owns a pair.
+        """
+        c = self._context
+
+        shape = c.bm_height, c.bm_width, 3
+        scratches = getattr(self._thread_local, "block_scratches", None)
+
+        if scratches is None or scratches[0].shape != shape:
+            scratches = _np_ndarray(shape, dtype=_npsingle), _np_ndarray(shape, dtype=_npsingle)
+            self._thread_local.block_scratches = scratches
+        # end if
+
+        acc, tmp = scratches
+        return acc, tmp
+
+    def _blend_block(self, block_y, block_x):
+        c = self._context
+
+        canvas_x1 = block_x * c.bm_width
+        canvas_y1 = (block_y - c.canvas_block_y) * c.bm_height
         canvas_x2 = canvas_x1 + c.bm_width
         canvas_y2 = canvas_y1 + c.bm_height
 
@@ -645,153 +1176,354 @@ class Blender:
         lly, llx = uly + 1, ulx
         lry, lrx = uly + 1, ulx + 1
 
-        ul_index = c.index_matrix[uly][ulx]
-        ur_index = c.index_matrix[ury][urx]
-        ll_index = c.index_matrix[lly][llx]
-        lr_index = c.index_matrix[lry][lrx]
+        ul_index = c.index_matrix[uly, ulx]
+        ur_index = c.index_matrix[ury, urx]
+        ll_index = c.index_matrix[lly, llx]
+        lr_index = c.index_matrix[lry, lrx]
 
-        ul_flip = c.flip_matrix[uly][ulx]
-        ur_flip = c.flip_matrix[ury][urx]
-        ll_flip = c.flip_matrix[lly][llx]
-        lr_flip = c.flip_matrix[lry][lrx]
+        ul_flip = c.flip_matrix[uly, ulx]
+        ur_flip = c.flip_matrix[ury, urx]
+        ll_flip = c.flip_matrix[lly, llx]
+        lr_flip = c.flip_matrix[lry, lrx]
 
-        ul_rot = c.rot_matrix[uly][ulx]
-        ur_rot = c.rot_matrix[ury][urx]
-        ll_rot = c.rot_matrix[lly][llx]
-        lr_rot = c.rot_matrix[lry][lrx]
+        ul_rot = c.rot_matrix[uly, ulx]
+        ur_rot = c.rot_matrix[ury, urx]
+        ll_rot = c.rot_matrix[lly, llx]
+        lr_rot = c.rot_matrix[lry, lrx]
 
-        ul_loc = c.frag_locs[ul_index]
-        ur_loc = c.frag_locs[ur_index]
-        ll_loc = c.frag_locs[ll_index]
-        lr_loc = c.frag_locs[lr_index]
+        ul_frag = self._get_frag(ul_index, ul_flip, ul_rot)
+        ur_frag = self._get_frag(ur_index, ur_flip, ur_rot)
+        ll_frag = self._get_frag(ll_index, ll_flip, ll_rot)
+        lr_frag = self._get_frag(lr_index, lr_flip, lr_rot)
 
-        ul_image = _pil_image_open(ul_loc)
-        ur_image = _pil_image_open(ur_loc)
-        ll_image = _pil_image_open(ll_loc)
-        lr_image = _pil_image_open(lr_loc)
+        # The boxes are in the PIL (left, upper, right, lower) format
+        ul_frag = ul_frag[ul_box[1]: ul_box[3], ul_box[0]: ul_box[2]]
+        ur_frag = ur_frag[ur_box[1]: ur_box[3], ur_box[0]: ur_box[2]]
+        ll_frag = ll_frag[ll_box[1]: ll_box[3], ll_box[0]: ll_box[2]]
+        lr_frag = lr_frag[lr_box[1]: lr_box[3], lr_box[0]: lr_box[2]]
 
-        size = c.frag_width, c.frag_height
-        resample = pil_image.BICUBIC
-        ul_image = ul_image.resize(size=size, resample=resample)
-        ur_image = ur_image.resize(size=size, resample=resample)
-        ll_image = ll_image.resize(size=size, resample=resample)
-        lr_image = lr_image.resize(size=size, resample=resample)
+        # The uint8 quadrants are used as is; The kernel below casts them to float32 on the fly
+        ulnp, urnp, llnp, lrnp = ul_frag, ur_frag, ll_frag, lr_frag
 
-        x_flip = pil_image.FLIP_TOP_BOTTOM
-        y_flip = pil_image.FLIP_LEFT_RIGHT
+        if self.enabled_for(103):
+            info = str(
+                f"Image NumPy array shapes\n"
+                f"  ulnp shape: {ulnp.shape}\n"
+                f"  urnp shape: {urnp.shape}\n"
+                f"  llnp shape: {llnp.shape}\n"
+                f"  lrnp shape: {lrnp.shape}\n"
+            )
 
-        if "x" in ul_flip:
-            ul_image = ul_image.transpose(x_flip)
+            self.logstr(info, 103)
+        # end if
 
-        if "y" in ul_flip:
-            ul_image = ul_image.transpose(y_flip)
+        if self.enabled_for(105):
+            info = str(
+                f"Image NumPy arrays:\n"
+                f"  ulnp:\n"
+                f"{ulnp}\n"
+                f"  urnp:\n"
+                f"{urnp}\n"
+                f"  llnp:\n"
+                f"{llnp}\n"
+                f"  lrnp:\n"
+                f"{lrnp}\n"
+            )
 
-        if "x" in ur_flip:
-            ur_image = ur_image.transpose(x_flip)
+            self.logstr(info, 105)
+        # end if
 
-        if "y" in ur_flip:
-            ur_image = ur_image.transpose(y_flip)
+        # Fused RGB blending kernel
+        # block = clip(ulbm * ulnp + urbm * urnp + llbm * llnp + lrbm * lrnp, 0, 255), computed in float32 scratches
+        # The (y, x, 1) blend matrices broadcast against the (y, x, 3) quadrants
+        # The clipped result is truncated into the uint8 canvas slice
+
+        bms = c.bms
+        block = c.canvas[canvas_y1: canvas_y2, canvas_x1: canvas_x2]
+        acc, tmp = self._get_block_scratches()
+
+        _npmultiply(bms[0], ulnp, out=acc)
+        _npmultiply(bms[1], urnp, out=tmp)
+        _npadd(acc, tmp, out=acc)
+        _npmultiply(bms[2], llnp, out=tmp)
+        _npadd(acc, tmp, out=acc)
+        _npmultiply(bms[3], lrnp, out=tmp)
+        _npadd(acc, tmp, out=acc)
+        _npclip(acc, 0, 255, out=acc)
+        _npcopyto(block, acc, casting="unsafe")
+
+        if self.enabled_for(104):
+            info = str(
+                f"Image block:\n"
+                f"{block}\n"
+            )
 
-        if "x" in ll_flip:
-            ll_image = ll_image.transpose(x_flip)
+            self.logstr(info, 104)
+        # end if
 
-        if "y" in ll_flip:
-            ll_image = ll_image.transpose(y_flip)
+    def _map_rows(self, row_func, row_count):
+        """Calls row_func on each row index in [0, row_count) and yields the indices of the completed rows.
 
-        if "x" in lr_flip:
-            lr_image = lr_image.transpose(x_flip)
+        Uses c.workers threads. The rows complete in an arbitrary order when there is more than 1 worker.
+        Each row_func call needs to write to a region that no other row touches.
+        """
+        c = self._context
 
-        if "y" in lr_flip:
-            lr_image = lr_image.transpose(y_flip)
+        if c.workers <= 1:
+            for iy in range(row_count):
+                row_func(iy)
+                yield iy
+            # end for
+        else:
+            # NumPy and PIL release the GIL during the heavy array and image work
+            with _ThreadPoolExecutor(max_workers=c.workers) as executor:
+                future_to_iy = {executor.submit(row_func, iy): iy for iy in range(row_count)}
 
-        rot_180 = pil_image.ROTATE_180
+                for future in _as_completed(future_to_iy):
+                    future.result()
+                    yield future_to_iy[future]
+                # end for
+            # end with
+        # end if
 
-        if ul_rot == "180":
-            ul_image = ul_image.transpose(rot_180)
+    def _make_progress(self, task, label, total, unit):
+        """Returns reporter.
 
-        if ur_rot == "180":
-            ur_image = ur_image.transpose(rot_180)
+        The reporter logs at debug level 1 and writes the progress events if enabled.
+        """
+        c = self._context
 
-        if ll_rot == "180":
-            ll_image = ll_image.transpose(rot_180)
+        def log_progress(line):
+            self.logln(line, 1)
 
-        if lr_rot == "180":
-            lr_image = lr_image.transpose(rot_180)
+        reporter = _ProgressReporter(task, label, total, unit, c.progress_interval, log_progress, c.progress_events)
+        return reporter
 
-        ul_image = ul_image.crop(ul_box)
-        ur_image = ur_image.crop(ur_box)
-        ll_image = ll_image.crop(ll_box)
-        lr_image = lr_image.crop(lr_box)
+    def _blend_block_row(self, block_y):
+        c = self._context
 
-        ulnp = _nparray(ul_image, dtype=_npsingle)
-        urnp = _nparray(ur_image, dtype=_npsingle)
-        llnp = _nparray(ll_image, dtype=_npsingle)
-        lrnp = _nparray(lr_image, dtype=_npsingle)
+        for ix in range(c.x_frag_count - 1):
+            self._blend_block(block_y, ix)
 
-        axis_order = [1, 0, 2]
-        ulnp = _nptranspose(ulnp, axis_order)
-        urnp = _nptranspose(urnp, axis_order)
-        llnp = _nptranspose(llnp, axis_order)
-        lrnp = _nptranspose(lrnp, axis_order)
-        self.logln(f"Transposed the UL, UR, LL, LR images with axis order: {axis_order}", 103)
+        if c.frags_grid_interleaved:
+            # Render the fragments grid rows while their frags are held
+            self._render_frags_grid_row(block_y)
 
-        info = str(
-            f"Image NumPy arrays:\n"
-            f"  ulnp:\n"
-            f"{ulnp}\n"
-            f"  urnp:\n"
-            f"{urnp}\n"
-            f"  llnp:\n"
-            f"{llnp}\n"
-            f"  lrnp:\n"
-            f"{lrnp}\n"
-        )
+            if block_y == c.y_frag_count - 2:
+                self._render_frags_grid_row(block_y + 1)
+        # end if
 
-        self.logstr(info, 105)
+        if c.planned_frag_cache is not None:
+            c.planned_frag_cache.finish_step(block_y)
 
-        info = str(
-            f"Image NumPy array shapes\n"
-            f"  ulnp shape: {ulnp.shape}\n"
-            f"  urnp shape: {urnp.shape}\n"
-            f"  llnp shape: {llnp.shape}\n"
-            f"  lrnp shape: {lrnp.shape}\n"
+    def _start_frag_prefetch(self):
+        """Starts the planned fragment cache of a blend.
+
+        The steps are the block rows, each using the frags of 2 frag rows.
+        The fragments grid rows are rendered with the block rows, so that each frag is loaded once for both.
+        """
+        c = self._context
+
+        steps = [_npunique(c.index_matrix[block_y: block_y + 2]) for block_y in range(c.y_frag_count - 1)]
+
+        if c.save_frags_grid:
+            self._fill_frags_grid_pad()
+            c.frags_grid_interleaved = True
+        # end if
+
+        # Bypass the fragment cache, so that its budget does not hold the frags a second time
+        c.planned_frag_cache = _PlannedFragCache(
+            c.frag_locs, c.frag_width, c.frag_height, steps, c.frag_prefetch_rows, self._load_frag
         )
 
-        self.logstr(info, 103)
+    def _stop_frag_prefetch(self):
+        """Stops the planned fragment cache of a blend and logs its statistics."""
+        c = self._context
 
-        block_r = _npmultiply(c.ulbm, ulnp[:, :, 0]) + \
-            _npmultiply(c.urbm, urnp[:, :, 0]) + \
-            _npmultiply(c.llbm, llnp[:, :, 0]) + \
-            _npmultiply(c.lrbm, lrnp[:, :, 0])
+        planned_frag_cache: _PlannedFragCache = c.planned_frag_cache
+        planned_frag_cache.close()
+        c.planned_frag_cache = None
+        c.frags_grid_interleaved = False
+        self.logln(f"Fragment prefetch:  {planned_frag_cache.statstr()}", 1)
 
-        block_g = _npmultiply(c.ulbm, ulnp[:, :, 1]) + \
-            _npmultiply(c.urbm, urnp[:, :, 1]) + \
-            _npmultiply(c.llbm, llnp[:, :, 1]) + \
-            _npmultiply(c.lrbm, lrnp[:, :, 1])
+    def _start_pipeline(self):
+        """Starts the fragment loader pool, the encoder pool, and the stage timers of a blend."""
+        c = self._context
 
-        block_b = _npmultiply(c.ulbm, ulnp[:, :, 2]) + \
-            _npmultiply(c.urbm, urnp[:, :, 2]) + \
-            _npmultiply(c.llbm, llnp[:, :, 2]) + \
-            _npmultiply(c.lrbm, lrnp[:, :, 2])
+        c.loader_pool = _ThreadPoolExecutor(max_workers=c.pipeline_loaders)
+        c.encoder_pool = _ThreadPoolExecutor(max_workers=1)
+        c.prefetch_lock = _Lock()
+        # Lists, since the context converts the dicts to string keyed dicts
+        c.row_prefetch_futures = [None] * (c.y_frag_count - 1)
+        c.frag_prefetch_futures = [None] * c.frag_count
+        c.encode_futures = []
+        c.load_timer = _StageTimer("Load")
+        c.blend_timer = _StageTimer("Blend")
+        c.encode_timer = _StageTimer("Encode")
+
+    def _stop_pipeline(self):
+        """Waits for the submitted encodes, stops the pools, and logs the stage timers."""
+        c = self._context
 
-        _npclip(block_r, 0, 255, block_r)
-        _npclip(block_g, 0, 255, block_g)
-        _npclip(block_b, 0, 255, block_b)
+        try:
+            for future in c.encode_futures:
+                c.blend_timer.wait(future.result)
+        finally:
+            c.loader_pool.shutdown(wait=True, cancel_futures=True)
+            c.encoder_pool.shutdown(wait=True)
+            c.loader_pool = None
+            c.encoder_pool = None
+            c.row_prefetch_futures = None
+            c.frag_prefetch_futures = None
+            c.encode_futures = None
+        # end try
 
         info = str(
-            f"Image block RGB channels:\n"
-            f"  block_r: \n"
-            f"{block_r}\n"
-            f"  block_g: \n"
-            f"{block_g}\n"
-            f"  block_b: \n"
-            f"{block_b}\n"
+            f"Pipeline stages:\n"
+            f"  {c.load_timer.statstr()}\n"
+            f"  {c.blend_timer.statstr()}\n"
+            f"  {c.encode_timer.statstr()}"
         )
 
-        self.logstr(info, 104)
-        c.canvas[canvas_x1: canvas_x2, canvas_y1: canvas_y2, 0] = block_r
-        c.canvas[canvas_x1: canvas_x2, canvas_y1: canvas_y2, 1] = block_g
-        c.canvas[canvas_x1: canvas_x2, canvas_y1: canvas_y2, 2] = block_b
+        self.logln(info, 1)
+
+    def _encode(self, encode_func):
+        """Runs an encode, on the encoder thread if the pipeline is enabled."""
+        c = self._context
+
+        if c.pipeline_enabled:
+            future = c.encoder_pool.submit(c.encode_timer.run, encode_func)
+            c.encode_futures.append(future)
+        else:
+            encode_func()
+        # end if
+
+    def _encode_phase(self, phase_func, counts, labels):
+        """Runs a saving phase method as an encode.
+
+        On the encoder thread, records the phase as overlapped, since it runs alongside the phases that follow it.
+        """
+        c = self._context
+
+        overlapped = c.pipeline_enabled
+        self._encode(lambda: self._run_phase(phase_func, counts, labels, overlapped))
+
+    def _prefetch_frag(self, index):
+        """Loads a frag into the fragment cache. Returns None, so that the future does not hold the frag."""
+        c = self._context
+
+        frag_cache: _FragCache = c.frag_cache
+        frag_cache.get(c.frag_locs[index], c.frag_width, c.frag_height)
+
+    def _prefetch_block_row(self, block_y):
+        """Submits the loads of the frags of a block row to the loader pool, once for each row and frag."""
+        c = self._context
+
+        if block_y >= c.y_frag_count - 1:
+            return
+
+        with c.prefetch_lock:
+            if c.row_prefetch_futures[block_y] is not None:
+                return
+
+            # A block row blends the frags of 2 frag rows
+            indices = _npunique(c.index_matrix[block_y: block_y + 2]).tolist()
+            futures = []
+
+            for index in indices:
+                future = c.frag_prefetch_futures[index]
+
+                if future is None:
+                    future = c.loader_pool.submit(c.load_timer.run, self._prefetch_frag, index)
+                    c.frag_prefetch_futures[index] = future
+                # end if
+
+                futures.append(future)
+            # end for
+
+            c.row_prefetch_futures[block_y] = futures
+        # end with
+
+    def _blend_block_row_pipelined(self, block_y):
+        """Blends a block row after the loader pool loads its frags, and prefetches the rows ahead."""
+        c = self._context
+
+        if c.planned_frag_cache is None:
+            # Otherwise the planned fragment cache loads the frags
+            for ahead in range(c.prefetch_rows + 1):
+                self._prefetch_block_row(block_y + ahead)
+
+            with c.prefetch_lock:
+                futures = c.row_prefetch_futures[block_y]
+
+            for future in futures:
+                c.blend_timer.wait(future.result)
+        # end if
+
+        c.blend_timer.run(self._blend_block_row, block_y)
+
+    def _blend_blocks_streamed(self):
+        """Blends the blocks band by band and streams each band to the output file."""
+        c = self._context
+
+        source = self._make_source_name()
+        timestamp = self._make_timestamp()
+        name = f"Blended-From-{source}-Time-{timestamp}.{c.stream_format}"
+        loc = _join(self._proj_path, name)
+
+        y_block_count = c.y_frag_count - 1
+        row_block_count = c.x_frag_count - 1
+        progress = self._make_progress("blend_blocks", "Blended blocks", y_block_count * row_block_count, "blocks")
+
+        row_func = self._blend_block_row_pipelined if c.pipeline_enabled else self._blend_block_row
+        band_bufs = [c.canvas]
+
+        if c.pipeline_enabled:
+            # Blend a band while the encoder writes the previous one
+            band_bufs.append(self._make_numpy_3d_matrix(*c.canvas.shape))
+
+        band_futures = [None] * len(band_bufs)
+
+        with _make_writer(c.stream_format, loc, c.canvas_width, c.canvas_height) as writer:
+            for band_index, band_block_y in enumerate(range(0, y_block_count, c.canvas_block_rows)):
+                band_block_rows = min(c.canvas_block_rows, y_block_count - band_block_y)
+                buf_index = band_index % len(band_bufs)
+
+                if band_futures[buf_index] is not None:
+                    # Wait for the encoder to release the band buffer
+                    c.blend_timer.wait(band_futures[buf_index].result)
+
+                c.canvas = band_bufs[buf_index]
+                c.canvas_block_y = band_block_y
+
+                def blend_band_row(iy):
+                    row_func(band_block_y + iy)
+
+                for _ in self._map_rows(blend_band_row, band_block_rows):
+                    progress.update(row_block_count)
+
+                band: _np_ndarray = c.canvas[:band_block_rows * c.bm_height]
+
+                if c.pipeline_enabled:
+                    band_futures[buf_index] = c.encoder_pool.submit(c.encode_timer.run, writer.write, band)
+                else:
+                    writer.write(band)
+
+                band_info = f"Streamed canvas band:  Block rows: {band_block_rows}  First block row: {band_block_y}"
+                self.logln(band_info, 101)
+            # end for
+
+            for future in band_futures:
+                if future is not None:
+                    c.blend_timer.wait(future.result)
+            # end for
+        # end with
+
+        progress.finish()
+        c.canvas = band_bufs[0]
+        c.canvas_block_y = 0
+        c.blended_loc = loc
+        self.logln(f"Saved blended blocks at: {loc}", 1)
 
     def _blend_blocks(self):
         c = self._context
@@ -802,26 +1534,22 @@ class Blender:
         )
 
         self.logln(info, 1)
-        block_total = (c.y_frag_count - 1) * (c.x_frag_count - 1)
-        cur_block = 0
-
-        for iy in range(c.y_frag_count - 1):
-            for ix in range(c.x_frag_count - 1):
-                self._blend_block(iy, ix)
 
-                needs_log = \
-                    cur_block + 1 == 1 or \
-                    (cur_block + 1) % 180 == 0 or \
-                    cur_block + 1 == block_total
+        if c.stream_canvas:
+            self._blend_blocks_streamed()
+        else:
+            row_block_count = c.x_frag_count - 1
+            block_total = (c.y_frag_count - 1) * row_block_count
+            progress = self._make_progress("blend_blocks", "Blended blocks", block_total, "blocks")
+            row_func = self._blend_block_row_pipelined if c.pipeline_enabled else self._blend_block_row
 
-                if needs_log:
-                    self.logln(f"Blended block {cur_block + 1} / {block_total}", 1)
+            for _ in self._map_rows(row_func, c.y_frag_count - 1):
+                progress.update(row_block_count)
 
-                cur_block += 1
-            # end for
-        # end for
+            progress.finish()
+        # end if
 
-        self.logln(f"Canvas: {c.canvas}", 104)
+        self.logln(lambda: f"Canvas: {c.canvas}", 104)
 
         info = str(
             "-\n"
@@ -833,75 +1561,75 @@ class Blender:
     def _save_blended_blocks(self):
         c = self._context
 
-        axis_order = [1, 0, 2]
-        c.canvas = _nptranspose(c.canvas, axis_order)
-        self.logln(f"Transposed the canvas with axis order {axis_order}", 101)
-        canvas: _np_ndarray = c.canvas
-        canvas = canvas.astype(_npubyte)
-        image = _pil_image_fromarray(canvas, "RGB")
-        now = _now()
-
-        timestamp = str(
-            f"{now.year:04}{now.month:02}{now.day:02}-{now.hour:02}{now.minute:02}{now.second:02}-"
-            f"{now.microsecond:06}"
-        )
+        if not c.stream_canvas:
+            # Otherwise already saved band by band in self._blend_blocks_streamed
+            source = self._make_source_name()
+            timestamp = self._make_timestamp()
+            name = f"Blended-From-{source}-Time-{timestamp}"
+            loc = self._save_scratch_image(c.canvas, c.canvas_scratch_loc, name)
+            c.blended_loc = loc
+            self.logln(f"Saved blended blocks at: {loc}", 1)
+        # end if
 
-        name = f"Blended-From-{c.frags_name}-Time-{timestamp}.jpg"
-        loc = _join(self._proj_path, name)
-        image.save(loc, quality=95)
-        self.logln(f"Saved blended blocks at: {loc}", 1)
+        if c.canvas_scratch_loc is not None:
+            # Unmap the canvas before removing its scratch file
+            c.canvas = None
+            self._remove_scratch(c.canvas_scratch_loc)
+            c.canvas_scratch_loc = None
+        # end if
 
     def _render_frags_grid_block(self, block_y, block_x):
         c = self._context
 
-        index = c.index_matrix[block_y][block_x]
-        loc = c.frag_locs[index]
-        image = _pil_image_open(loc)
+        index = c.index_matrix[block_y, block_x]
+        flip = c.flip_matrix[block_y, block_x]
+        rot = c.rot_matrix[block_y, block_x]
+        image_np = self._get_frag(index, flip, rot)
 
-        size = c.frag_width, c.frag_height
-        resample = pil_image.BICUBIC
-        image = image.resize(size, resample=resample)
+        if self.enabled_for(105):
+            info = str(
+                f"image_np:\n"
+                f"{image_np}\n"
+            )
 
-        x_flip = pil_image.FLIP_TOP_BOTTOM
-        y_flip = pil_image.FLIP_LEFT_RIGHT
-        flip = c.flip_matrix[block_y][block_x]
+            self.logstr(info, 105)
+        # end if
 
-        if "x" in flip:
-            image = image.transpose(x_flip)
+        self.logln(lambda: f"image_np shape: {image_np.shape}", 103)
 
-        if "y" in flip:
-            image = image.transpose(y_flip)
+        x1 = c.frags_grid_pad + block_x * (c.frag_width + c.frags_grid_pad)
+        y1 = c.frags_grid_pad + block_y * (c.frag_height + c.frags_grid_pad)
+        x2 = x1 + c.frag_width
+        y2 = y1 + c.frag_height
 
-        rot_180 = pil_image.ROTATE_180
-        rot = c.rot_matrix[block_y][block_x]
+        c.frags_grid[y1: y2, x1: x2] = image_np
 
-        if rot == "180":
-            image = image.transpose(rot_180)
+    def _render_frags_grid_row(self, block_y):
+        c = self._context
 
-        image_np = _nparray(image, dtype=_npsingle)
-        axis_order = [1, 0, 2]
-        image_np = _nptranspose(image_np, axis_order)
-        self.logln(f"Transposed the image with axis order: {axis_order}", 103)
+        for ix in range(c.x_frag_count):
+            self._render_frags_grid_block(block_y, ix)
 
-        info = str(
-            f"image_np:\n"
-            f"{image_np}\n"
-        )
+    def _fill_frags_grid_pad(self):
+        c = self._context
 
-        self.logstr(info, 105)
-        self.logln(f"image_np shape: {image_np.shape}", 103)
+        frags_grid: _np_ndarray = c.frags_grid
 
-        x1 = c.frags_grid_pad + block_x * (c.frag_width + c.frags_grid_pad)
-        y1 = c.frags_grid_pad + block_y * (c.frag_height + c.frags_grid_pad)
-        x2 = x1 + c.frag_width
-        y2 = y1 + c.frag_height
+        frags_grid_red = frags_grid[:, :, 0]
+        frags_grid_green = frags_grid[:, :, 1]
+        frags_grid_blue = frags_grid[:, :, 2]
 
-        c.frags_grid[x1: x2, y1: y2] = image_np
+        frags_grid_red.fill(c.frags_grid_pad_red)
+        frags_grid_green.fill(c.frags_grid_pad_green)
+        frags_grid_blue.fill(c.frags_grid_pad_blue)
 
     def _render_frags_grid(self):
         c = self._context
 
-        if c.save_frags_grid:
+        if c.save_frags_grid and c.frags_grid_interleaved:
+            # Otherwise not rendered yet
+            self.logln("Rendered the fragments grid with the blocks", 1)
+        elif c.save_frags_grid:
             info = str(
                 "Started rendering fragments grid\n"
                 "-"
@@ -909,35 +1637,19 @@ class Blender:
 
             self.logln(info, 1)
             frags_grid: _np_ndarray = c.frags_grid
+            self._fill_frags_grid_pad()
 
-            frags_grid_red = frags_grid[:, :, 0]
-            frags_grid_green = frags_grid[:, :, 1]
-            frags_grid_blue = frags_grid[:, :, 2]
-
-            frags_grid_red.fill(c.frags_grid_pad_red)
-            frags_grid_green.fill(c.frags_grid_pad_green)
-            frags_grid_blue.fill(c.frags_grid_pad_blue)
-
-            block_total = c.y_frag_count * c.x_frag_count
-            cur_block = 0
-
-            for iy in range(c.y_frag_count):
-                for ix in range(c.x_frag_count):
-                    self._render_frags_grid_block(iy, ix)
-
-                    needs_log = \
-                        cur_block + 1 == 1 or \
-                        (cur_block + 1) % 360 == 0 or \
-                        cur_block + 1 == block_total
+            row_block_count = c.x_frag_count
+            block_total = c.y_frag_count * row_block_count
+            label = "Rendered fragments grid blocks"
+            progress = self._make_progress("render_frags_grid", label, block_total, "blocks")
 
-                    if needs_log:
-                        self.logln(f"Rendered fragments grid block: {cur_block + 1} / {block_total}", 1)
+            for _ in self._map_rows(self._render_frags_grid_row, c.y_frag_count):
+                progress.update(row_block_count)
 
-                    cur_block += 1
-                # end for
-            # end for
+            progress.finish()
 
-            self.logln(f"Fragments grid: {frags_grid}", 104)
+            self.logln(lambda: f"Fragments grid: {frags_grid}", 104)
 
             info = str(
                 "-\n"
@@ -951,112 +1663,203 @@ class Blender:
         c = self._context
 
         if c.save_frags_grid:
-            axis_order = [1, 0, 2]
-            c.frags_grid = _nptranspose(c.frags_grid, axis_order)
-            self.logln(f"Transposed the fragments grid with axis order {axis_order}", 101)
-            frags_grid: _np_ndarray = c.frags_grid
-            frags_grid = frags_grid.astype(_npubyte)
-            image = _pil_image_fromarray(frags_grid, "RGB")
-            now = _now()
-
-            timestamp = str(
-                f"{now.year:04}{now.month:02}{now.day:02}-{now.hour:02}{now.minute:02}{now.second:02}-"
-                f"{now.microsecond:06}"
-            )
-
-            name = f"Frags-From-{c.frags_name}-Time-{timestamp}.jpg"
-            loc = _join(self._proj_path, name)
-            image.save(loc, quality=95)
+            source = self._make_source_name()
+            timestamp = self._make_timestamp()
+            name = f"Frags-From-{source}-Time-{timestamp}"
+            loc = self._save_scratch_image(c.frags_grid, c.frags_grid_scratch_loc, name)
             self.logln(f"Saved fragments grid at: {loc}", 1)
+
+            if c.frags_grid_scratch_loc is not None:
+                # Unmap the fragments grid before removing its scratch file
+                c.frags_grid = None
+                self._remove_scratch(c.frags_grid_scratch_loc)
+                c.frags_grid_scratch_loc = None
+            # end if
         # end if
 
-    def _record_frag_locs(self):
+    def _make_frag_loc_block(self, ix, iy):
+        """Returns block."""
         c = self._context
 
-        if c.save_frag_locs:
-            info = str(
-                "Started recording fragment locations\n"
-                "-"
-            )
-
-            self.logln(info, 1)
-            block_total = c.y_frag_count * c.x_frag_count
-            frag_loc_blocks = []
-            cur_block = 0
+        index = c.index_matrix[iy, ix]
+        loc = c.frag_locs[index]
+        flip = flip_str(c.flip_matrix[iy, ix])
+        rotation = 180 if c.rot_matrix[iy, ix] & rot_180 else 0
+
+        block = str(
+            f"- Fragment\n"
+            f"\n"
+            f"(X, Y): ({ix}, {iy})\n"
+            f"Image: \"{repr(loc)[1: -1]}\"\n"
+            f"Flip: \"{repr(flip)[1: -1]}\"\n"
+            f"Rotation: \"{rotation}\"\n"
+            f"\n"
+            f"- End of fragment\n"
+        )
 
-            for iy in range(c.y_frag_count):
-                frag_loc_row = []
-
-                for ix in range(c.x_frag_count):
-                    index = c.index_matrix[iy][ix]
-                    loc = c.frag_locs[index]
-                    flip = c.flip_matrix[iy][ix]
-
-                    block = str(
-                        f"- Fragment\n"
-                        f"\n"
-                        f"(X, Y): ({ix}, {iy})\n"
-                        f"Image: \"{repr(loc)[1: -1]}\"\n"
-                        f"Flip: \"{repr(flip)[1: -1]}\"\n"
-                        f"\n"
-                        f"- End of fragment\n"
-                    )
-
-                    frag_loc_row.append(block)
-
-                    needs_log = \
-                        cur_block + 1 == 1 or \
-                        (cur_block + 1) % 720 == 0 or \
-                        cur_block + 1 == block_total
-
-                    if needs_log:
-                        self.logln(f"Recorded fragment locations block: {cur_block + 1} / {block_total}", 1)
-
-                    cur_block += 1
-                # end for
+        return block
 
-                frag_loc_blocks.append(frag_loc_row)
-            # end for
+    def _write_frag_locs_text(self, loc):
+        c = self._context
 
-            c.frag_locs_text = ""
+        block_total = c.y_frag_count * c.x_frag_count
+        progress = self._make_progress("save_frag_locs", "Saved fragment locations blocks", block_total, "blocks")
 
+        with open(loc, "w", buffering=frag_locs_buffer_size) as file:
             for ix in range(c.x_frag_count):
                 for iy in range(c.y_frag_count):
-                    c.frag_locs_text += frag_loc_blocks[iy][ix]
+                    block = self._make_frag_loc_block(ix, iy)
+                    file.write(block)
+                    self.logln(lambda: f"Fragment locations block: {block}", 103)
                 # end for
+
+                # Update once per column, since the blocks are small
+                progress.update(c.y_frag_count)
             # end for
+        # end with
 
-            self.logln(f"Fragment locations: {c.frag_locs_text}", 103)
+        progress.finish()
 
-            info = str(
-                "-\n"
-                "Completed recording fragment locations"
-            )
+    def _write_frag_locs_data(self, loc):
+        """Writes the CSV or JSON Lines fragment locations data file, one row per fragment, in the row-major order."""
+        c = self._context
 
-            self.logln(info, 1)
-        # end if
+        flip_strs = [flip_str(flip) for flip in range((flip_x | flip_y) + 1)]
+
+        with open(loc, "w", buffering=frag_locs_buffer_size, encoding="utf-8", newline="") as file:
+            if c.frag_locs_data_format == "csv":
+                writer = _csv_writer(file)
+                writer.writerow(["x", "y", "index", "image", "flip", "rotation"])
+            # end if
+
+            for iy in range(c.y_frag_count):
+                indices = c.index_matrix[iy].tolist()
+                flips = c.flip_matrix[iy].tolist()
+                rots = c.rot_matrix[iy].tolist()
+
+                if c.frag_locs_data_format == "csv":
+                    rows = [
+                        [ix, iy, index, c.frag_locs[index], flip_strs[flip], 180 if rot & rot_180 else 0]
+                        for ix, (index, flip, rot) in enumerate(zip(indices, flips, rots))
+                    ]
+
+                    writer.writerows(rows)
+                else:  # elif c.frag_locs_data_format == "jsonl":
+                    lines = [
+                        _dumps_json({
+                            "x": ix, "y": iy, "index": index, "image": c.frag_locs[index],
+                            "flip": flip_strs[flip], "rotation": 180 if rot & rot_180 else 0
+                        }) + "\n"
+                        for ix, (index, flip, rot) in enumerate(zip(indices, flips, rots))
+                    ]
+
+                    file.writelines(lines)
+                # end if
+            # end for
+        # end with
+
+    def make_layout(self):
+        """Makes the layout of the picture blended last.
+
+        Returns:
+            result: the layout
+        """
+        c = self._context
+        result = _Layout(c.frag_locs, c.index_matrix, c.flip_matrix, c.rot_matrix)
+        return result
 
     def _save_frag_locs(self):
+        """Streams the fragment locations to the result files as they are generated."""
         c = self._context
 
-        if c.save_frag_locs:
-            now = _now()
+        if not c.save_frag_locs and c.frag_locs_data_format == "none":
+            return
 
-            timestamp = str(
-                f"{now.year:04}{now.month:02}{now.day:02}-{now.hour:02}{now.minute:02}{now.second:02}-"
-                f"{now.microsecond:06}"
+        source = self._make_source_name()
+        timestamp = self._make_timestamp()
+
+        if c.save_frag_locs:
+            info = str(
+                "Started saving fragment locations\n"
+                "-"
             )
 
-            name = f"Frag-Locations-From-{c.frags_name}-Time-{timestamp}.txt"
+            self.logln(info, 1)
+            name = f"Frag-Locations-From-{source}-Time-{timestamp}.txt"
             loc = _join(self._proj_path, name)
-            _save_text(c.frag_locs_text, loc)
+            self._write_frag_locs_text(loc)
+
+            info = str(
+                "-\n"
+                "Completed saving fragment locations"
+            )
+
+            self.logln(info, 1)
             self.logln(f"Saved fragment locations at {loc}", 1)
         # end if
 
-    def prep(self):
-        """Prepares for blending."""
+        if c.frag_locs_data_format != "none":
+            name = f"Frag-Locations-From-{source}-Time-{timestamp}.{c.frag_locs_data_format}"
+            loc = _join(self._proj_path, name)
+
+            if c.frag_locs_data_format == "npz":
+                _save_layout_npz(self.make_layout(), loc)
+            else:
+                self._write_frag_locs_data(loc)
+
+            self.logln(f"Saved fragment locations data at {loc}", 1)
+        # end if
+
+    def _prep_shared_frags(self, shared_frags):
+        """Prepares the fragments, the fragment cache, and the blend matrices from some shared fragments."""
+        c = self._context
+
+        shared_frags: _SharedFrags = shared_frags
+        frag_shape = c.frag_height, c.frag_width, 3
+
+        if shared_frags.frag_shape != frag_shape:
+            raise ValueError(f"Shared fragment shape {shared_frags.frag_shape} does not match {frag_shape}")
+
+        c.frags_path = shared_frags.frags_path
+        c.frags_name = shared_frags.frags_name
+        c.frag_count = len(shared_frags.frag_locs)
+        c.frag_locs = shared_frags.frag_locs
+        c.frag_infos = None
+        self.logln(f"Shared fragments:  Path: {c.frags_path}  Count: {c.frag_count}", 1)
+
+        loc_to_index = {loc: index for index, loc in enumerate(c.frag_locs)}
+
+        def load_shared_frag(loc, width, height):
+            return shared_frags.frags[loc_to_index[loc]]
+
+        c.frag_store = None
+        c.frag_hashes = None
+        # The shared fragments are already in memory; There is nothing to prefetch
+        c.frag_prefetch_enabled = False
+        # The shared fragments are views; Budget them all, so that none of them is evicted
+        c.frag_cache = _FragCache(shared_frags.frags.nbytes, load_shared_frag)
+        self.logln("Prepared the fragment cache from the shared fragments", 1)
+
+        bms = shared_frags.bms
+        c.bm_width = bms.shape[2]
+        c.bm_height = bms.shape[1]
+        c.ulbm = bms[0, :, :, 0]
+        c.urbm = bms[1, :, :, 0]
+        c.llbm = bms[2, :, :, 0]
+        c.lrbm = bms[3, :, :, 0]
+        c.bms = bms
+        self.logln("Prepared 4 blend matrices from the shared blend matrices", 1)
+
+    def prep_shared(self):
+        """Prepares the fragments and the blend matrices to share with other processes.
+
+        Loads every fragment once, through the fragment cache and store.
+
+        Returns:
+            result: the shared fragments. The caller needs to close it.
+        """
         info = str(
-            "Blender started preparation\n"
+            "Blender started preparing shared fragments\n"
             "-"
         )
 
@@ -1065,9 +1868,75 @@ class Blender:
         self._parse_config()
         self._tweak_pil_safety()
         self._prep_frags()
+        self._prep_frag_cache()
         self._prep_matrices()
-        self._prep_canvas()
-        self._prep_frags_grid()
+
+        c = self._context
+        frag_shape = c.frag_height, c.frag_width, 3
+        result = _SharedFrags(c.frags_path, c.frags_name, c.frag_locs, frag_shape, c.bms.shape, create=True)
+
+        try:
+            frag_cache: _FragCache = c.frag_cache
+
+            for index, loc in enumerate(c.frag_locs):
+                result.frags[index] = frag_cache.get(loc, c.frag_width, c.frag_height)
+
+            result.bms[...] = c.bms
+        except BaseException as base_exception:
+            result.close()
+            raise base_exception
+        # end try
+
+        info = str(
+            "-\n"
+            "Blender completed preparing shared fragments"
+        )
+
+        self.logln(info)
+        return result
+
+    def prep(self, shared_frags=None):
+        """Prepares for blending.
+
+        With self.layout set, renders the layout instead of a random one, and ignores the fragments path.
+
+        Args:
+            shared_frags: the shared fragments from the prep_shared method, or None to prepare the fragments
+        """
+        info = str(
+            "Blender started preparation\n"
+            "-"
+        )
+
+        self.logln(info)
+        self._run_phase(self._read_config)
+        self._parse_config()
+        self._tweak_pil_safety()
+
+        c = self._context
+
+        def count_frags():
+            return {"frags": c.frag_count}
+
+        if self.layout is not None:
+            self._run_phase(self._prep_layout_frags, count_frags)
+            self._run_phase(self._prep_frag_cache)
+            self._run_phase(self._prep_given_layout)
+            self._run_phase(self._prep_matrices)
+        elif shared_frags is None:
+            self._run_phase(self._prep_frags, count_frags)
+            self._run_phase(self._prep_frag_cache)
+            self._run_phase(self._prep_layout)
+            self._run_phase(self._prep_matrices)
+        else:
+            self._prep_shared_frags(shared_frags)
+            self._run_phase(self._prep_layout)
+        # end if
+
+        if not self._is_preview_only():
+            self._run_phase(self._prep_canvas)
+            self._run_phase(self._prep_frags_grid)
+        # end if
 
         info = str(
             "-\n"
@@ -1076,23 +1945,232 @@ class Blender:
 
         self.logln(info)
 
+    def _prep_batch_blend(self, batch_index):
+        """Prepares for a blend of a batch.
+
+        Reuses the prepared frags, frag cache, and blend matrices.
+        Makes a new layout for each blend after the first one.
+        Makes a new canvas and fragments grid if the previous ones are released.
+        """
+        c = self._context
+
+        c.batch_index = batch_index
+
+        if c.batch_count > 1:
+            self.logln(f"Started batch blend {batch_index + 1} / {c.batch_count}", 1)
+
+        if batch_index > 0:
+            self._prep_layout()
+
+        if self._is_preview_only():
+            return
+
+        if c.canvas is None:
+            self._prep_canvas()
+
+        if c.save_frags_grid and c.frags_grid is None:
+            self._prep_frags_grid()
+
+    def _is_preview_only(self):
+        """Returns result.
+
+        The result is whether to blend the previews only, without continuing to the full resolution.
+        """
+        c = self._context
+        result = c.preview_enabled and not c.preview_continue
+        return result
+
+    def _make_preview_context(self):
+        """Returns preview_c.
+
+        The preview context is a copy of the context with the preview fragment size, an in-memory canvas, and draft
+        decoding. Shares the layout, the fragment store, and the known content hashes with the context.
+        Has its own fragment cache, so that the draft decoded fragments stay apart from the full ones.
+        """
+        c = self._context
+
+        preview_c = _BlenderContext()
+
+        for key in c:
+            preview_c[key] = c[key]
+
+        preview_c.is_preview = True
+        preview_c.frag_width = c.preview_res
+        preview_c.frag_height = c.preview_res
+        preview_c.draft_decoding = True
+        preview_c.frag_cache = _FragCache(c.frag_cache_bytes, self._load_frag)
+        preview_c.save_frags_grid = False
+        preview_c.frags_grid_interleaved = False
+        preview_c.stream_canvas = False
+        preview_c.canvas_backend = "memory"
+        preview_c.pipeline_enabled = False
+        preview_c.frag_prefetch_enabled = False
+        preview_c.planned_frag_cache = None
+        preview_c.progress_events = None
+        return preview_c
+
+    def _blend_preview(self):
+        """Blends a preview of the current layout at the preview fragment resolution.
+
+        Runs the blend matrix, canvas, blending, and saving phase methods on a preview context, then switches back to
+        the context. Saves no other result files.
+        """
+        c = self._context
+
+        start_time = _perf_counter()
+        preview_c = self._make_preview_context()
+        self._context = preview_c
+
+        try:
+            self._prep_matrices()
+            self._prep_canvas()
+            self._blend_blocks()
+            self._save_blended_blocks()
+        finally:
+            self._context = c
+        # end try
+
+        exe_secs = _perf_counter() - start_time
+        self.logln(f"Saved the preview in {exe_secs:.2f} seconds at: {preview_c.blended_loc}")
+
+    def _count_blended(self):
+        """Returns counts."""
+        c = self._context
+
+        counts = {
+            "blocks": (c.x_frag_count - 1) * (c.y_frag_count - 1),
+            "megapixels": c.canvas_width * c.canvas_height / 1e6
+        }
+
+        return counts
+
+    def _count_saved_blended(self):
+        """Returns counts.
+
+        The streamed canvas is already saved in self._blend_blocks_streamed.
+        """
+        c = self._context
+
+        if c.stream_canvas:
+            counts = {}
+        else:
+            counts = {"megapixels": c.canvas_width * c.canvas_height / 1e6}
+
+        return counts
+
+    def _count_frags_grid(self):
+        """Returns counts."""
+        c = self._context
+
+        if c.save_frags_grid:
+            counts = {
+                "blocks": c.x_frag_count * c.y_frag_count,
+                "megapixels": c.frags_grid_width * c.frags_grid_height / 1e6
+            }
+        else:
+            counts = {}
+        # end if
+
+        return counts
+
+    def _count_saved_frag_locs(self):
+        """Returns counts."""
+        c = self._context
+
+        if c.save_frag_locs or c.frag_locs_data_format != "none":
+            counts = {"frags": c.x_frag_count * c.y_frag_count}
+        else:
+            counts = {}
+
+        return counts
+
+    def _save_metrics(self):
+        c = self._context
+
+        if c.save_metrics:
+            # Not tagged with a batch number, since the metrics cover all the batches
+            source = c.frags_name
+
+            if self.result_tag is not None:
+                source += f"-{self.result_tag}"
+
+            timestamp = self._make_timestamp()
+            name = f"Metrics-From-{source}-Time-{timestamp}.json"
+            loc = _join(self._proj_path, name)
+            self.metrics.save(loc)
+            self.logln(f"Saved the metrics at: {loc}", 1)
+        # end if
+
     def blend(self):
         """Blends the frags into a large picture.
 
         Blends the frags in self.frags_path into a large picture in self.project_path.
+        With a batch count of N, blends N pictures with different layouts from the same preparation.
+        With the preview enabled, blends a low resolution preview of each picture first.
         """
+        c = self._context
+
         info = str(
             "Started blending\n"
             "-"
         )
 
         self.logln(info)
-        self._blend_blocks()
-        self._save_blended_blocks()
-        self._render_frags_grid()
-        self._save_frags_grid()
-        self._record_frag_locs()
-        self._save_frag_locs()
+
+        for batch_index in range(c.batch_count):
+            self._prep_batch_blend(batch_index)
+            labels = {"batch_index": batch_index}
+
+            if c.preview_enabled:
+                self._blend_preview()
+
+            if self._is_preview_only():
+                # Keep the layout, so that a chosen preview can be rendered later
+                self._run_phase(self._save_frag_locs, self._count_saved_frag_locs, labels)
+                continue
+            # end if
+
+            if c.pipeline_enabled:
+                self._start_pipeline()
+
+            if c.frag_prefetch_enabled:
+                self._start_frag_prefetch()
+
+            try:
+                self._run_phase(self._blend_blocks, self._count_blended, labels)
+                self._encode_phase(self._save_blended_blocks, self._count_saved_blended, labels)
+                self._run_phase(self._render_frags_grid, self._count_frags_grid, labels)
+
+                if c.frag_prefetch_enabled:
+                    self._stop_frag_prefetch()
+
+                self._encode_phase(self._save_frags_grid, self._count_frags_grid, labels)
+                self._run_phase(self._save_frag_locs, self._count_saved_frag_locs, labels)
+            finally:
+                if c.planned_frag_cache is not None:
+                    self._stop_frag_prefetch()
+
+                if c.pipeline_enabled:
+                    self._stop_pipeline()
+            # end try
+        # end for
+
+        self.logln(f"Fragment cache:  {c.frag_cache.statstr()}", 1)
+
+        if c.frag_store is not None:
+            frag_store: _FragStore = c.frag_store
+            self.logln(f"Fragment store:  {frag_store.statstr()}", 1)
+            frag_store.prune()
+        # end if
+
+        self.logln(self.metrics.totals_str(), 1)
+        self._save_metrics()
+
+        if c.progress_events is not None:
+            progress_events: _ProgressEvents = c.progress_events
+            progress_events.emit("completed")
+            progress_events.close()
+        # end if
 
         info = str(
             "-\n"
@@ -1100,3 +2178,59 @@ class Blender:
         )
 
         self.logln(info)
+
+    def time_stages(self, time_stage):
+        """Prepares for blending and times the blending stages one by one.
+
+        Loads every fragment into the fragment cache before the blocks are blended, so that the _blend_block timing
+        does not include the fragment decoding. Saves no metrics. Each saving stage saves its result file once per
+        time_stage call of its stage function.
+
+        Args:
+            time_stage: a callable that takes a stage name from timed_stage_names, a stage function, and the count of
+                the stage method calls that each stage function call makes, calls the stage function, and returns the
+                stage timing
+
+        Returns:
+            result: a dict with the "frag_count", "canvas_width", "canvas_height", and "timings" items. The timings map
+                the stage names to the time_stage results.
+        """
+        self._read_config()
+        self._parse_config()
+        self._tweak_pil_safety()
+
+        c = self._context
+        timings = {}
+
+        timings["_read_frags_path"] = time_stage("_read_frags_path", lambda: self._read_frags_path(self._frags_path), 1)
+        self._prep_frags()
+        self._prep_frag_cache()
+        self._prep_layout()
+        timings["_prep_matrices"] = time_stage("_prep_matrices", self._prep_matrices, 1)
+        self._prep_canvas()
+        self._prep_frags_grid()
+
+        frag_cache: _FragCache = c.frag_cache
+
+        for loc in c.frag_locs:
+            frag_cache.get(loc, c.frag_width, c.frag_height)
+
+        def blend_blocks():
+            for iy in range(c.y_frag_count - 1):
+                for ix in range(c.x_frag_count - 1):
+                    self._blend_block(iy, ix)
+            # end for
+
+        block_count = (c.x_frag_count - 1) * (c.y_frag_count - 1)
+        timings["_blend_block"] = time_stage("_blend_block", blend_blocks, block_count)
+        timings["_render_frags_grid"] = time_stage("_render_frags_grid", self._render_frags_grid, 1)
+        timings["_save_blended_blocks"] = time_stage("_save_blended_blocks", self._save_blended_blocks, 1)
+
+        result = {
+            "frag_count": c.frag_count,
+            "canvas_width": c.canvas_width,
+            "canvas_height": c.canvas_height,
+            "timings": timings
+        }
+
+        return result
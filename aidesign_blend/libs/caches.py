@@ -0,0 +1,739 @@
+"""Caches.
+
+The in-memory fragment cache of a session, the planned fragment cache of a blend, the on-disk fragment store shared
+by the sessions, and the shared memory fragments shared by the processes of a seed sweep.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import collections
+import numpy
+import os
+import threading
+
+from multiprocessing import shared_memory
+from os import path as ospath
+from PIL import Image as pil_image
+
+# Aliases
+
+_Condition = threading.Condition
+_exists = ospath.exists
+_getpid = os.getpid
+_get_ident = threading.get_ident
+_join = ospath.join
+_Lock = threading.Lock
+_makedirs = os.makedirs
+_nparray = numpy.array
+_npload = numpy.load
+_npprod = numpy.prod
+_npsave = numpy.save
+_npsingle = numpy.single
+_npubyte = numpy.ubyte
+_np_ndarray = numpy.ndarray
+_OrderedDict = collections.OrderedDict
+_pil_image_open = pil_image.open
+_remove = os.remove
+_replace = os.replace
+_scandir = os.scandir
+_SharedMemory = shared_memory.SharedMemory
+_Thread = threading.Thread
+_utime = os.utime
+
+# End
+
+
+def load_frag(loc, width, height, draft=False):
+    """Loads a fragment image and resizes it to the given size.
+
+    Args:
+        loc: the fragment location
+        width: the target width
+        height: the target height
+        draft: whether to decode a JPEG image at a reduced scale.
+            The decoder picks the smallest 1/1, 1/2, 1/4, or 1/8 scale that is still at least the target size.
+            Other image formats are decoded as usual.
+
+    Returns:
+        result: the resized fragment. NumPy array. Type uint8. Subscripts [y, x, c].
+    """
+    loc = str(loc)
+    width = int(width)
+    height = int(height)
+    draft = bool(draft)
+
+    size = width, height
+    resample = pil_image.BICUBIC
+
+    with _pil_image_open(loc) as image:
+        if draft:
+            # No-op for the formats other than JPEG
+            image.draft("RGB", size)
+
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+        image = image.resize(size=size, resample=resample)
+    # end with
+
+    result = _nparray(image, dtype=_npubyte)
+    return result
+
+
+class FragCache:
+    """Fragment cache.
+
+    Holds the resized fragments of a session, keyed by (location, width, height).
+    Evicts the least recently used fragments when the held bytes exceed the byte budget.
+    Safe to use from multiple threads.
+    """
+
+    def __init__(self, max_bytes, loader=None):
+        """Inits self with the given args.
+
+        Args:
+            max_bytes: the byte budget
+            loader: the fragment loader, a function with the load_frag signature, or None for load_frag
+        """
+        max_bytes = int(max_bytes)
+
+        if loader is None:
+            loader = load_frag
+
+        self.max_bytes = max_bytes
+        """Byte budget."""
+        self.held_bytes = 0
+        """Held bytes."""
+        self.hit_count = 0
+        """Hit count."""
+        self.miss_count = 0
+        """Miss count."""
+        self.evict_count = 0
+        """Eviction count."""
+        self._entries = _OrderedDict()
+        """Entries. Ordered from the least to the most recently used."""
+        self._lock = _Lock()
+        """Lock."""
+        self._loader = loader
+        """Fragment loader."""
+
+    def __len__(self):
+        """Finds the entry count of self.
+
+        Returns:
+            result: the result
+        """
+        result = len(self._entries)
+        return result
+
+    def _evict(self):
+        while self.held_bytes > self.max_bytes and len(self._entries) > 0:
+            _, frag = self._entries.popitem(last=False)
+            self.held_bytes -= frag.nbytes
+            self.evict_count += 1
+        # end while
+
+    def get(self, loc, width, height):
+        """Gets a resized fragment, loading it on a cache miss.
+
+        Args:
+            loc: the fragment location
+            width: the fragment width
+            height: the fragment height
+
+        Returns:
+            result: the resized fragment. NumPy array. Type uint8. Subscripts [y, x, c]. Read-only.
+        """
+        key = str(loc), int(width), int(height)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hit_count += 1
+                result = self._entries[key]
+                return result
+            # end if
+
+            self.miss_count += 1
+        # end with
+
+        # Load outside the lock so that multiple threads can decode at the same time
+        frag = self._loader(*key)
+        frag.flags.writeable = False
+
+        with self._lock:
+            if key not in self._entries and frag.nbytes <= self.max_bytes:
+                self._entries[key] = frag
+                self.held_bytes += frag.nbytes
+                self._evict()
+            # end if
+        # end with
+
+        result = frag
+        return result
+
+    def clear(self):
+        """Clears self."""
+        with self._lock:
+            self._entries.clear()
+            self.held_bytes = 0
+        # end with
+
+    def statstr(self):
+        """Finds the string representation of the statistics of self.
+
+        Returns:
+            result: the result
+        """
+        result = str(
+            f"Entries: {len(self._entries)}  Held bytes: {self.held_bytes}  Budget bytes: {self.max_bytes}  "
+            f"Hits: {self.hit_count}  Misses: {self.miss_count}  Evictions: {self.evict_count}"
+        )
+
+        return result
+
+
+class FragStore:
+    """Fragment store.
+
+    Holds resized fragments on disk as .npy files, keyed by (source content hash, width, height).
+    Reading a stored fragment skips both the image decode and the resize.
+    Evicts the least recently used files when the held bytes exceed the byte budget.
+    A file modification time is its last use time.
+    Safe to share between threads and processes.
+    """
+
+    ext = ".npy"
+    """Stored file extension."""
+
+    def __init__(self, path, max_bytes):
+        """Inits self with the given args.
+
+        Args:
+            path: the store path
+            max_bytes: the byte budget
+        """
+        path = str(path)
+        max_bytes = int(max_bytes)
+
+        self.path = path
+        """Store path."""
+        self.max_bytes = max_bytes
+        """Byte budget."""
+        self.hit_count = 0
+        """Hit count."""
+        self.miss_count = 0
+        """Miss count."""
+        self.put_count = 0
+        """Put count."""
+        self._lock = _Lock()
+        """Lock. Guards the counts."""
+
+    def find_loc(self, content_hash, width, height):
+        """Finds the file location of a stored fragment.
+
+        Args:
+            content_hash: the source content hash
+            width: the fragment width
+            height: the fragment height
+
+        Returns:
+            result: the result
+        """
+        name = f"{content_hash}-{int(width)}x{int(height)}{self.ext}"
+        result = _join(self.path, name)
+        return result
+
+    def get(self, content_hash, width, height):
+        """Gets a stored fragment.
+
+        Args:
+            content_hash: the source content hash
+            width: the fragment width
+            height: the fragment height
+
+        Returns:
+            result: the fragment, or None if not stored. NumPy array. Type uint8. Subscripts [y, x, c].
+        """
+        loc = self.find_loc(content_hash, width, height)
+        result = None
+
+        try:
+            frag = _npload(loc)
+
+            if frag.dtype == _npubyte and frag.shape == (int(height), int(width), 3):
+                result = frag
+                # Mark the file as recently used
+                _utime(loc)
+            # end if
+        except FileNotFoundError as _:
+            pass
+        except Exception as _:
+            # A damaged file is a miss
+            self._remove_quietly(loc)
+        # end try
+
+        with self._lock:
+            if result is None:
+                self.miss_count += 1
+            else:
+                self.hit_count += 1
+            # end if
+        # end with
+
+        return result
+
+    def put(self, content_hash, width, height, frag):
+        """Puts a fragment into self.
+
+        Writes a temporary file first, so that the other readers never see a partial file.
+
+        Args:
+            content_hash: the source content hash
+            width: the fragment width
+            height: the fragment height
+            frag: the fragment. NumPy array. Type uint8. Subscripts [y, x, c].
+        """
+        loc = self.find_loc(content_hash, width, height)
+        temp_loc = f"{loc}.{_getpid()}-{_get_ident()}.temp"
+        _makedirs(self.path, exist_ok=True)
+
+        with open(temp_loc, "wb") as file:
+            _npsave(file, frag)
+
+        _replace(temp_loc, loc)
+
+        with self._lock:
+            self.put_count += 1
+
+    def _remove_quietly(self, loc):
+        try:
+            _remove(loc)
+        except OSError as _:
+            pass
+        # end try
+
+    def _list_entries(self):
+        """Returns entries.
+
+        The entries are the os.DirEntry objects of the stored files.
+        """
+        entries = []
+
+        if _exists(self.path):
+            with _scandir(self.path) as dir_entries:
+                for entry in dir_entries:
+                    if entry.name.endswith(self.ext) and entry.is_file():
+                        entries.append(entry)
+                # end for
+            # end with
+        # end if
+
+        return entries
+
+    def find_usage(self):
+        """Finds the usage of self.
+
+        Returns:
+            file_count: the stored file count
+            held_bytes: the held bytes
+        """
+        entries = self._list_entries()
+        file_count = len(entries)
+        held_bytes = sum(entry.stat().st_size for entry in entries)
+        return file_count, held_bytes
+
+    def prune(self):
+        """Removes the least recently used files until the held bytes fit the byte budget.
+
+        Returns:
+            result: the removed file count
+        """
+        entries = self._list_entries()
+        stats = [(entry.stat(), entry.path) for entry in entries]
+        stats.sort(key=lambda stat_loc: stat_loc[0].st_mtime_ns)
+        held_bytes = sum(stat.st_size for stat, _ in stats)
+        result = 0
+
+        for stat, loc in stats:
+            if held_bytes <= self.max_bytes:
+                break
+
+            self._remove_quietly(loc)
+            held_bytes -= stat.st_size
+            result += 1
+        # end for
+
+        return result
+
+    def clear(self):
+        """Removes all the stored files.
+
+        Returns:
+            result: the removed file count
+        """
+        entries = self._list_entries()
+
+        for entry in entries:
+            self._remove_quietly(entry.path)
+
+        result = len(entries)
+        return result
+
+    def statstr(self):
+        """Finds the string representation of the statistics of self.
+
+        Returns:
+            result: the result
+        """
+        result = str(
+            f"Hits: {self.hit_count}  Misses: {self.miss_count}  Puts: {self.put_count}  "
+            f"Budget bytes: {self.max_bytes}"
+        )
+
+        return result
+
+
+class PlannedFragCache:
+    """Planned fragment cache.
+
+    Holds the resized fragments of a known sequence of steps, such as the block rows of a blend.
+    Each step uses a known set of fragments.
+    A background thread loads the fragments of the steps at most ahead_count steps after the first unfinished step.
+    When a step finishes, evicts its fragments that no step in that window uses next.
+    This is the optimal (Belady) eviction for a cache that holds the fragments of the window,
+    so the held fragments are bounded by the distinct fragments of the window and the steps in progress.
+    Has the FragCache get signature. Safe to use from multiple threads.
+    """
+
+    def __init__(self, frag_locs, width, height, steps, ahead_count, loader=None):
+        """Inits self with the given args.
+
+        Args:
+            frag_locs: the fragment locations
+            width: the fragment width
+            height: the fragment height
+            steps: the steps, each a sequence of the indices of the fragments that the step uses
+            ahead_count: the count of the steps to load ahead of the first unfinished step
+            loader: the fragment loader, a function with the load_frag signature, or None for load_frag
+        """
+        ahead_count = int(ahead_count)
+
+        if loader is None:
+            loader = load_frag
+
+        self.width = int(width)
+        """Fragment width."""
+        self.height = int(height)
+        """Fragment height."""
+        self.ahead_count = max(ahead_count, 0)
+        """Count of the steps to load ahead of the first unfinished step."""
+        self.held_bytes = 0
+        """Held bytes."""
+        self.peak_bytes = 0
+        """Peak held bytes."""
+        self.peak_count = 0
+        """Peak held fragment count."""
+        self.load_count = 0
+        """Count of the fragments loaded by the background thread."""
+        self.hit_count = 0
+        """Hit count."""
+        self.miss_count = 0
+        """Miss count. The fragments that the background thread has not loaded in time."""
+        self.evict_count = 0
+        """Eviction count."""
+        self._frag_locs = [str(loc) for loc in frag_locs]
+        """Fragment locations."""
+        self._loc_to_index = {loc: index for index, loc in enumerate(self._frag_locs)}
+        """Maps a fragment location to its index."""
+        self._steps = [sorted(set(int(index) for index in step)) for step in steps]
+        """Steps. The sorted distinct fragment indices of each step."""
+        self._uses = [[] for _ in self._frag_locs]
+        """Uses. The indices of the steps that use each fragment, in order."""
+        self._use_ptrs = [0] * len(self._frag_locs)
+        """Use pointers. The position in the uses of each fragment before which all the steps are finished."""
+        self._finished = [False] * len(self._steps)
+        """Whether each step is finished."""
+        self._first_unfinished = 0
+        """Index of the first unfinished step."""
+        self._entries = {}
+        """Entries. Maps a fragment index to the fragment."""
+        self._loading = set()
+        """Indices of the fragments being loaded."""
+        self._closed = False
+        """Whether self is closed."""
+        self._cond = _Condition()
+        """Condition. Guards the above mutable states."""
+        self._loader = loader
+        """Fragment loader."""
+
+        for step_index, step in enumerate(self._steps):
+            for index in step:
+                self._uses[index].append(step_index)
+        # end for
+
+        self._thread = _Thread(target=self._run, name="PlannedFragCache", daemon=True)
+        """Background loader thread."""
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _find_next_use(self, index):
+        """Returns next_use.
+
+        The next use is the index of the first unfinished step that uses the fragment, or None. Needs the condition.
+        """
+        uses = self._uses[index]
+        ptr = self._use_ptrs[index]
+
+        while ptr < len(uses) and self._finished[uses[ptr]]:
+            ptr += 1
+
+        self._use_ptrs[index] = ptr
+        next_use = uses[ptr] if ptr < len(uses) else None
+        return next_use
+
+    def _load(self, index, by_thread):
+        """Returns frag.
+
+        Loads a fragment that is not held and not being loaded, outside the condition. Needs the condition.
+        """
+        self._loading.add(index)
+        self._cond.release()
+
+        try:
+            frag = self._loader(self._frag_locs[index], self.width, self.height)
+            frag.flags.writeable = False
+        finally:
+            self._cond.acquire()
+            self._loading.discard(index)
+            self._cond.notify_all()
+        # end try
+
+        self._entries[index] = frag
+        self.held_bytes += frag.nbytes
+        self.peak_bytes = max(self.peak_bytes, self.held_bytes)
+        self.peak_count = max(self.peak_count, len(self._entries))
+
+        if by_thread:
+            self.load_count += 1
+        else:
+            self.miss_count += 1
+        # end if
+
+        return frag
+
+    def _run(self):
+        with self._cond:
+            for step_index, step in enumerate(self._steps):
+                while not self._closed and step_index > self._first_unfinished + self.ahead_count:
+                    self._cond.wait()
+
+                for index in step:
+                    if self._closed:
+                        return
+
+                    while index in self._loading:
+                        self._cond.wait()
+
+                    if self._finished[step_index]:
+                        # The step has got its frags without the thread
+                        break
+
+                    if index not in self._entries:
+                        try:
+                            self._load(index, True)
+                        except Exception as _:
+                            # Leave the fragment to the get caller, which raises the error in the blending thread
+                            pass
+                        # end try
+                    # end if
+                # end for
+            # end for
+        # end with
+
+    def get(self, loc, width, height):
+        """Gets a resized fragment, loading it if the background thread has not loaded it.
+
+        Args:
+            loc: the fragment location
+            width: the fragment width
+            height: the fragment height
+
+        Returns:
+            result: the resized fragment. NumPy array. Type uint8. Subscripts [y, x, c]. Read-only.
+        """
+        loc = str(loc)
+        index = self._loc_to_index.get(loc)
+
+        if index is None or int(width) != self.width or int(height) != self.height:
+            # Not in the plan
+            result = self._loader(loc, width, height)
+            return result
+        # end if
+
+        with self._cond:
+            while index in self._loading:
+                self._cond.wait()
+
+            if index in self._entries:
+                self.hit_count += 1
+                result = self._entries[index]
+            else:
+                result = self._load(index, False)
+            # end if
+        # end with
+
+        return result
+
+    def finish_step(self, step_index):
+        """Marks a step as finished, and evicts its fragments that no step in the loading window uses next.
+
+        Args:
+            step_index: the step index
+        """
+        step_index = int(step_index)
+
+        with self._cond:
+            self._finished[step_index] = True
+
+            while self._first_unfinished < len(self._steps) and self._finished[self._first_unfinished]:
+                self._first_unfinished += 1
+
+            window_end = self._first_unfinished + self.ahead_count
+
+            for index in self._steps[step_index]:
+                next_use = self._find_next_use(index)
+
+                if index in self._entries and (next_use is None or next_use > window_end):
+                    frag = self._entries.pop(index)
+                    self.held_bytes -= frag.nbytes
+                    self.evict_count += 1
+                # end if
+            # end for
+
+            self._cond.notify_all()
+        # end with
+
+    def close(self):
+        """Stops the background thread and clears self."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        # end with
+
+        self._thread.join()
+
+        with self._cond:
+            self._entries.clear()
+            self.held_bytes = 0
+        # end with
+
+    def statstr(self):
+        """Finds the string representation of the statistics of self.
+
+        Returns:
+            result: the result
+        """
+        result = str(
+            f"Steps: {len(self._steps)}  Ahead: {self.ahead_count}  Loads: {self.load_count}  Hits: {self.hit_count}  "
+            f"Misses: {self.miss_count}  Evictions: {self.evict_count}  Peak fragments: {self.peak_count}  "
+            f"Peak bytes: {self.peak_bytes}"
+        )
+
+        return result
+
+
+class SharedFrags:
+    """Shared fragments.
+
+    The resized fragments and the blend matrices of a blender, in shared memory.
+    Pickling self passes the shared memory names, so that unpickling self in another process attaches to the memory.
+    The arrays are read-only in the attached copies.
+    """
+
+    def __init__(self, frags_path, frags_name, frag_locs, frag_shape, bms_shape, create=False, names=None):
+        """Inits self with the given args.
+
+        Args:
+            frags_path: the fragments path
+            frags_name: the fragments name
+            frag_locs: the fragment locations
+            frag_shape: the (height, width, 3) shape of a resized fragment
+            bms_shape: the (4, height, width, 1) shape of the blend matrix stack
+            create: whether to create the shared memory, or to attach to the existing shared memory
+            names: the (frags memory name, blend matrices memory name) if attaching, or None if creating
+        """
+        self.frags_path = str(frags_path)
+        """Fragments path."""
+        self.frags_name = str(frags_name)
+        """Fragments name."""
+        self.frag_locs = [str(loc) for loc in frag_locs]
+        """Fragment locations."""
+        self.frag_shape = tuple(int(size) for size in frag_shape)
+        """Resized fragment shape."""
+        self.bms_shape = tuple(int(size) for size in bms_shape)
+        """Blend matrix stack shape."""
+        self.owner = bool(create)
+        """Whether self created the shared memory and needs to unlink it."""
+
+        frags_shape = (len(self.frag_locs),) + self.frag_shape
+        frags_bytes = int(_npprod(frags_shape)) * _npubyte().itemsize
+        bms_bytes = int(_npprod(self.bms_shape)) * _npsingle().itemsize
+
+        if create:
+            # Zero sized shared memory is not allowed
+            self._frags_memory = _SharedMemory(create=True, size=max(frags_bytes, 1))
+            self._bms_memory = _SharedMemory(create=True, size=max(bms_bytes, 1))
+        else:
+            self._frags_memory = _SharedMemory(name=names[0])
+            self._bms_memory = _SharedMemory(name=names[1])
+        # end if
+
+        self.frags = _np_ndarray(frags_shape, dtype=_npubyte, buffer=self._frags_memory.buf)
+        """Resized fragments. NumPy array. Type uint8. Subscripts [i, y, x, c]. i in the fragment location order."""
+        self.bms = _np_ndarray(self.bms_shape, dtype=_npsingle, buffer=self._bms_memory.buf)
+        """Blend matrix stack. NumPy array. Type float32. Subscripts [i, y, x, 0]."""
+
+        if not create:
+            self.frags.flags.writeable = False
+            self.bms.flags.writeable = False
+        # end if
+
+    def __getstate__(self):
+        state = {
+            "frags_path": self.frags_path,
+            "frags_name": self.frags_name,
+            "frag_locs": self.frag_locs,
+            "frag_shape": self.frag_shape,
+            "bms_shape": self.bms_shape,
+            "names": (self._frags_memory.name, self._bms_memory.name),
+        }
+
+        return state
+
+    def __setstate__(self, state):
+        self.__init__(
+            state["frags_path"], state["frags_name"], state["frag_locs"], state["frag_shape"], state["bms_shape"],
+            create=False, names=state["names"]
+        )
+
+    def close(self):
+        """Closes self. Unlinks the shared memory if self is the owner."""
+        # Release the array views before closing the memory
+        self.frags = None
+        self.bms = None
+        self._frags_memory.close()
+        self._bms_memory.close()
+
+        if self.owner:
+            self._frags_memory.unlink()
+            self._bms_memory.unlink()
+        # end if
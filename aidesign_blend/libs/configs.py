@@ -9,6 +9,7 @@ from os import path as ospath
 
 from aidesign_blend.libs import defaults
 from aidesign_blend.libs import utils
+from aidesign_blend.libs import writers
 
 _join = ospath.join
 _load_json = utils.load_json
@@ -117,6 +118,15 @@ class BlendersConfig(Config):
 
         from_dict[key] = val
 
+    @classmethod
+    def _verify_str_nonable(cls, from_dict, key):
+        val = from_dict[key]
+
+        if val is not None:
+            val = str(val)
+
+        from_dict[key] = val
+
     @classmethod
     def _verify_bool(cls, from_dict, key):
         val = from_dict[key]
@@ -152,6 +162,19 @@ class BlendersConfig(Config):
 
         from_dict[key] = val
 
+    @classmethod
+    def _verify_int_ge_1(cls, from_dict, key):
+        val = from_dict[key]
+        val = int(val)
+
+        if val < 0:
+            val *= -1
+
+        if val < 1:
+            val = 1
+
+        from_dict[key] = val
+
     @classmethod
     def _verify_int_ge_0(cls, from_dict, key):
         val = from_dict[key]
@@ -175,6 +198,16 @@ class BlendersConfig(Config):
 
         from_dict[key] = val
 
+    @classmethod
+    def _verify_str_choice(cls, from_dict, key, choices, default):
+        val = from_dict[key]
+        val = str(val).lower()
+
+        if val not in choices:
+            val = default
+
+        from_dict[key] = val
+
     @classmethod
     def _verify_float_list(cls, from_dict, key):
         val = from_dict[key]
@@ -216,6 +249,38 @@ class BlendersConfig(Config):
             from_dict[save_frag_locs_key] = False
         # end if
 
+        frag_locs_data_format_key = "frag_locations_data_format"
+        frag_locs_data_formats = ["none", "csv", "jsonl", "npz"]
+
+        if frag_locs_data_format_key in from_dict:
+            cls._verify_str_choice(from_dict, frag_locs_data_format_key, frag_locs_data_formats, "none")
+        else:
+            from_dict[frag_locs_data_format_key] = "none"
+        # end if
+
+        save_metrics_key = "save_metrics"
+
+        if save_metrics_key in from_dict:
+            cls._verify_bool(from_dict, save_metrics_key)
+        else:
+            from_dict[save_metrics_key] = False
+        # end if
+
+        progress_key = "progress"
+        interval_seconds_key = "interval_seconds"
+        events_path_key = "events_path"
+
+        if progress_key in from_dict:
+            subdict = from_dict[progress_key]
+            cls._verify_int_ge_0(subdict, interval_seconds_key)
+            cls._verify_str_nonable(subdict, events_path_key)
+        else:
+            from_dict[progress_key] = {}
+            subdict = from_dict[progress_key]
+            subdict[interval_seconds_key] = 10
+            subdict[events_path_key] = None
+        # end if
+
         frag_res_overrides_key = "frag_resolution_overrides"
         apply_key = "apply"
         x_res_key = "x_resolution"
@@ -274,6 +339,157 @@ class BlendersConfig(Config):
             subdict2[blue_key] = 255
         # end if
 
+        frag_cache_key = "frag_cache_megabytes"
+
+        if frag_cache_key in from_dict:
+            cls._verify_int_ge_0(from_dict, frag_cache_key)
+        else:
+            from_dict[frag_cache_key] = 1024
+        # end if
+
+        workers_key = "workers"
+
+        if workers_key in from_dict:
+            cls._verify_int_ge_1(from_dict, workers_key)
+        else:
+            from_dict[workers_key] = 1
+        # end if
+
+        streaming_key = "streaming"
+        enabled_key = "enabled"
+        format_key = "format"
+        stream_formats = list(writers.formats)
+
+        if streaming_key in from_dict:
+            subdict = from_dict[streaming_key]
+            cls._verify_bool(subdict, enabled_key)
+            cls._verify_str_choice(subdict, format_key, stream_formats, "png")
+        else:
+            from_dict[streaming_key] = {}
+            subdict = from_dict[streaming_key]
+            subdict[enabled_key] = False
+            subdict[format_key] = "png"
+        # end if
+
+        pipeline_key = "pipeline"
+        enabled_key = "enabled"
+        loaders_key = "loaders"
+        prefetch_rows_key = "prefetch_rows"
+
+        if pipeline_key in from_dict:
+            subdict = from_dict[pipeline_key]
+            cls._verify_bool(subdict, enabled_key)
+            cls._verify_int_ge_1(subdict, loaders_key)
+            cls._verify_int_ge_1(subdict, prefetch_rows_key)
+        else:
+            from_dict[pipeline_key] = {}
+            subdict = from_dict[pipeline_key]
+            subdict[enabled_key] = False
+            subdict[loaders_key] = 4
+            subdict[prefetch_rows_key] = 2
+        # end if
+
+        frag_prefetch_key = "frag_prefetch"
+        enabled_key = "enabled"
+        rows_ahead_key = "rows_ahead"
+
+        if frag_prefetch_key in from_dict:
+            subdict = from_dict[frag_prefetch_key]
+            cls._verify_bool(subdict, enabled_key)
+            cls._verify_int_ge_0(subdict, rows_ahead_key)
+        else:
+            from_dict[frag_prefetch_key] = {}
+            subdict = from_dict[frag_prefetch_key]
+            subdict[enabled_key] = False
+            subdict[rows_ahead_key] = 2
+        # end if
+
+        canvas_backend_key = "canvas_backend"
+        scratch_path_key = "scratch_path"
+
+        if canvas_backend_key in from_dict:
+            cls._verify_str_choice(from_dict, canvas_backend_key, ["memory", "memmap"], "memory")
+        else:
+            from_dict[canvas_backend_key] = "memory"
+        # end if
+
+        if scratch_path_key in from_dict:
+            cls._verify_str_nonable(from_dict, scratch_path_key)
+        else:
+            from_dict[scratch_path_key] = None
+        # end if
+
+        frag_index_key = "frag_index"
+        enabled_key = "enabled"
+        path_key = "path"
+
+        if frag_index_key in from_dict:
+            subdict = from_dict[frag_index_key]
+            cls._verify_bool(subdict, enabled_key)
+            cls._verify_str_nonable(subdict, path_key)
+        else:
+            from_dict[frag_index_key] = {}
+            subdict = from_dict[frag_index_key]
+            subdict[enabled_key] = False
+            subdict[path_key] = None
+        # end if
+
+        batch_key = "batch"
+        count_key = "count"
+
+        if batch_key in from_dict:
+            subdict = from_dict[batch_key]
+            cls._verify_int_ge_1(subdict, count_key)
+        else:
+            from_dict[batch_key] = {}
+            subdict = from_dict[batch_key]
+            subdict[count_key] = 1
+        # end if
+
+        draft_decoding_key = "draft_decoding"
+
+        if draft_decoding_key in from_dict:
+            cls._verify_bool(from_dict, draft_decoding_key)
+        else:
+            from_dict[draft_decoding_key] = False
+        # end if
+
+        frag_store_key = "frag_store"
+        enabled_key = "enabled"
+        max_megabytes_key = "max_megabytes"
+        path_key = "path"
+
+        if frag_store_key in from_dict:
+            subdict = from_dict[frag_store_key]
+            cls._verify_bool(subdict, enabled_key)
+            cls._verify_int_ge_0(subdict, max_megabytes_key)
+            cls._verify_str_nonable(subdict, path_key)
+        else:
+            from_dict[frag_store_key] = {}
+            subdict = from_dict[frag_store_key]
+            subdict[enabled_key] = False
+            subdict[max_megabytes_key] = 2048
+            subdict[path_key] = None
+        # end if
+
+        preview_key = "preview"
+        enabled_key = "enabled"
+        res_key = "resolution"
+        continue_key = "continue"
+
+        if preview_key in from_dict:
+            subdict = from_dict[preview_key]
+            cls._verify_bool(subdict, enabled_key)
+            cls._verify_int_ge_2_even(subdict, res_key)
+            cls._verify_bool(subdict, continue_key)
+        else:
+            from_dict[preview_key] = {}
+            subdict = from_dict[preview_key]
+            subdict[enabled_key] = False
+            subdict[res_key] = 16
+            subdict[continue_key] = True
+        # end if
+
         cust_grad_key = "custom_gradient"
         enabled_key = "enabled"
         coefs_key = "coefficients"
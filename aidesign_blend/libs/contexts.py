@@ -27,6 +27,8 @@ class BlenderContext(Context):
     """Random mode."""
     rand_seed: int = None
     """Random seed."""
+    rng = None
+    """Random generator. A numpy.random.Generator seeded with the random seed. Generates the layouts."""
     rand_frags: bool = None
     """Random fragments."""
     avoid_rand_dups: bool = None
@@ -45,6 +47,14 @@ class BlenderContext(Context):
     """Y fragment count."""
     save_frag_locs: bool = None
     """Save fragment locations."""
+    frag_locs_data_format: str = None
+    """Fragment locations data format. "none", "csv", "jsonl", or "npz"."""
+    save_metrics: bool = None
+    """Whether to save the phase metrics to a JSON file."""
+    progress_interval: int = None
+    """Minimum seconds between 2 progress log lines of a task."""
+    progress_events = None
+    """Progress events. Writes the structured progress events to a file or a named pipe. None if disabled."""
 
     save_frags_grid: bool = None
     """Save fragments grid."""
@@ -57,6 +67,48 @@ class BlenderContext(Context):
     frags_grid_pad_blue = None
     """Fragments grid padding blue."""
 
+    frag_cache_bytes: int = None
+    """Fragment cache byte budget."""
+    workers: int = None
+    """Worker thread count."""
+    stream_canvas: bool = None
+    """Stream the canvas to the output file band by band."""
+    stream_format: str = None
+    """Streaming output format."""
+    pipeline_enabled: bool = None
+    """Whether to pipeline the fragment loading, the blending, and the encoding."""
+    pipeline_loaders: int = None
+    """Pipeline fragment loader thread count."""
+    prefetch_rows: int = None
+    """Count of the block rows ahead of the blending whose fragments the pipeline loads."""
+    frag_prefetch_enabled: bool = None
+    """Whether to load and evict the fragments in the order that the index matrix uses them."""
+    frag_prefetch_rows: int = None
+    """Count of the block rows ahead of the first unfinished block row whose fragments the planned cache loads."""
+    canvas_backend: str = None
+    """Canvas backend. "memory" or "memmap"."""
+    scratch_path: str = None
+    """Scratch path. Holds the memmap scratch files."""
+    frag_index_enabled: bool = None
+    """Whether to keep a persistent index of the fragments folder."""
+    frag_index_path: str = None
+    """Fragment index path. Holds the fragment index files."""
+    batch_count: int = None
+    """Batch count. Count of the pictures to blend in a session."""
+    draft_decoding: bool = None
+    """Whether to decode the JPEG fragments at a reduced scale."""
+    frag_store_enabled: bool = None
+    """Whether to keep the resized fragments on disk for later sessions."""
+    frag_store_bytes: int = None
+    """Fragment store byte budget."""
+    frag_store_path: str = None
+    """Fragment store path. Holds the stored fragments."""
+    preview_enabled: bool = None
+    """Whether to blend a low resolution preview of each picture first."""
+    preview_res: int = None
+    """Preview fragment resolution."""
+    preview_continue: bool = None
+    """Whether to continue to the full resolution after each preview."""
     custom_grad_enabled: bool = None
     """Custom gradient function enabled."""
 
@@ -76,29 +128,57 @@ class BlenderContext(Context):
     """Fragment count."""
     frag_locs = None
     """Fragment locations."""
+    frag_infos = None
+    """Fragment infos. The widths, heights, and modes of the fragments, in the order of the fragment locations."""
 
     # End
+
+    # The batch index item
+    batch_index = None
+    """Batch index. 0-based index of the current blend in the batch."""
+    blended_loc = None
+    """Location of the blended picture saved last."""
+    is_preview: bool = None
+    """Whether this is the derived context of a preview. The result file names are tagged with -Preview."""
+
+    # Frag cache related items
+
+    frag_cache = None
+    """Fragment cache. Holds the resized fragments of the session."""
+    frag_store = None
+    """Fragment store. Holds the resized fragments on disk. None if disabled."""
+    frag_hashes = None
+    """Fragment content hashes. Maps a fragment location to its content hash."""
+    planned_frag_cache = None
+    """Planned fragment cache. Holds the fragments of the upcoming rows during a blend. None if not blending."""
+    frags_grid_interleaved: bool = None
+    """Whether the fragments grid rows are rendered with the block rows."""
+
+    # End
+
     # Helper matrix items
 
     index_matrix = None
-    """Index matrix. Subscripts [y][x]."""
+    """Index matrix. NumPy array. Type intc. Subscripts [y, x]."""
     flip_matrix = None
-    """Flipping matrix. Subscripts [y][x]."""
+    """Flipping matrix. NumPy array. Type uint8. Subscripts [y, x]. Items are blenders.flip_x and flip_y bit flags."""
     rot_matrix = None
-    """Rotation matrix. Subscripts [y][x]."""
+    """Rotation matrix. NumPy array. Type uint8. Subscripts [y, x]. Items are blenders.rot_180 bit flags."""
 
     bm_width = None
     """Blend matrix width."""
     bm_height = None
     """Blend matrix height."""
     ulbm = None
-    """Upper left blend matrix. Numpy array. Subscript [x, y]."""
+    """Upper left blend matrix. Numpy array. Subscript [y, x]."""
     urbm = None
-    """Upper right blend matrix. Numpy array. Subscript [x, y]."""
+    """Upper right blend matrix. Numpy array. Subscript [y, x]."""
     llbm = None
-    """Lower left blend matrix.Numpy array. Subscript [x, y]."""
+    """Lower left blend matrix.Numpy array. Subscript [y, x]."""
     lrbm = None
-    """Lower right blend matrix. Numpy array. Subscript [x, y]."""
+    """Lower right blend matrix. Numpy array. Subscript [y, x]."""
+    bms = None
+    """Blend matrix stack. Numpy array. Subscript [i, y, x, 0]. i in the UL, UR, LL, LR order."""
 
     # End
     # Canvas related items
@@ -108,7 +188,13 @@ class BlenderContext(Context):
     canvas_height = None
     """Canvas height."""
     canvas = None
-    """Canvas. Numpy array. Subscript [x, y]."""
+    """Canvas. Numpy array. Type uint8. Subscript [y, x, c]."""
+    canvas_block_y = None
+    """Index of the first block row that the canvas holds. Always 0 unless streaming."""
+    canvas_block_rows = None
+    """Count of the block rows that the canvas holds."""
+    canvas_scratch_loc = None
+    """Canvas scratch file location. None unless the canvas backend is memmap."""
 
     # End
     # Frags grid related items
@@ -118,10 +204,30 @@ class BlenderContext(Context):
     frags_grid_height = None
     """Fragments grid height."""
     frags_grid = None
-    """Fragments grid. Numpy array. Subscript [x, y]."""
+    """Fragments grid. Numpy array. Type uint8. Subscript [y, x, c]."""
+    frags_grid_scratch_loc = None
+    """Fragments grid scratch file location. None unless the canvas backend is memmap."""
 
     # End
+    # Pipeline related items
+
+    loader_pool = None
+    """Pipeline fragment loader thread pool."""
+    encoder_pool = None
+    """Pipeline encoder thread pool. Has 1 thread, so that the encodes run in their submission order."""
+    prefetch_lock = None
+    """Lock of the prefetch futures."""
+    row_prefetch_futures = None
+    """Row prefetch futures. The fragment load futures of each block row, or None if not submitted."""
+    frag_prefetch_futures = None
+    """Fragment prefetch futures. The load future of each fragment, or None if not submitted."""
+    encode_futures = None
+    """Futures of the submitted encodes."""
+    load_timer = None
+    """Load stage timer."""
+    blend_timer = None
+    """Blend stage timer."""
+    encode_timer = None
+    """Encode stage timer."""
 
-    # The frag locs item
-    frag_locs_text = None
-    """Fragment locations text."""
+    # End
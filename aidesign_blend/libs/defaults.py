@@ -33,5 +33,9 @@ app_data_path = _join(_repo_path, ".aidesign_blend_app_data")
 """App data path."""
 blend_start_status_loc = _join(app_data_path, "blend_start_status.json")
 """Blend start status location."""
+frag_indexes_path = _join(app_data_path, "frag_indexes")
+"""Fragment indexes path. Holds a fragment index file for each fragments folder."""
+frag_store_path = _join(app_data_path, "frag_store")
+"""Fragment store path. Holds the resized fragments shared by the sessions."""
 blenders_config_name = "blenders_config.json"
 """Blenders config name."""
@@ -0,0 +1,417 @@
+"""Fragments.
+
+Discovers the fragment images in a folder and probes their headers.
+Keeps a persistent index of the probed headers for each fragments folder.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import concurrent.futures
+import hashlib
+import os
+import threading
+
+from os import path as ospath
+from PIL import Image as pil_image
+
+from aidesign_blend.libs import utils
+
+# Aliases
+
+_abspath = ospath.abspath
+_basename = ospath.basename
+_blake2b = hashlib.blake2b
+_dirname = ospath.dirname
+_exists = ospath.exists
+_getpid = os.getpid
+_get_ident = threading.get_ident
+_join = ospath.join
+_load_json = utils.load_json
+_makedirs = os.makedirs
+_pil_image_open = pil_image.open
+_replace = os.replace
+_save_json = utils.save_json
+_scandir = os.scandir
+_sha1 = hashlib.sha1
+_splitext = ospath.splitext
+_ThreadPoolExecutor = concurrent.futures.ThreadPoolExecutor
+
+# End
+
+default_probe_workers = 8
+"""Default prober thread count. Probing is I/O bound, so this does not depend on the CPU count."""
+
+
+def _find_image_exts():
+    pil_image.init()
+    result = frozenset(ext.lower() for ext in pil_image.registered_extensions())
+    return result
+
+
+image_exts = _find_image_exts()
+"""Image file extensions, including the leading dots. The extensions that PIL can open."""
+
+
+class FragInfo:
+    """Fragment info.
+
+    The info found in the header of a fragment image.
+    """
+
+    def __init__(self, loc, width, height, mode, format_name, content_hash=None):
+        """Inits self with the given args.
+
+        Args:
+            loc: the fragment location
+            width: the image width
+            height: the image height
+            mode: the PIL image mode
+            format_name: the PIL image format name
+            content_hash: the content hash, or None if not known
+        """
+        self.loc = str(loc)
+        """Fragment location."""
+        self.width = int(width)
+        """Image width."""
+        self.height = int(height)
+        """Image height."""
+        self.mode = str(mode)
+        """PIL image mode."""
+        self.format_name = str(format_name)
+        """PIL image format name."""
+        self.content_hash = content_hash
+        """Content hash. A hex string, or None if not known."""
+
+    def __repr__(self):
+        result = f"FragInfo({self.loc!r}, {self.width}, {self.height}, {self.mode!r}, {self.format_name!r})"
+        return result
+
+
+def _scan_image_entries(frags_path):
+    """Returns entries.
+
+    The entries are the os.DirEntry objects of the files with image extensions, sorted by name.
+    """
+    frags_path = str(frags_path)
+    entries = []
+
+    with _scandir(frags_path) as dir_entries:
+        for entry in dir_entries:
+            ext = _splitext(entry.name)[1].lower()
+
+            if ext in image_exts and entry.is_file():
+                entries.append(entry)
+        # end for
+    # end with
+
+    entries.sort(key=lambda entry: entry.name)
+    return entries
+
+
+def scan_image_locs(frags_path):
+    """Scans a folder for the files with image extensions.
+
+    Uses the directory entry types, so that no file needs to be opened or stat-ed on most file systems.
+
+    Args:
+        frags_path: the fragments path
+
+    Returns:
+        result: the file locations, sorted by name
+    """
+    entries = _scan_image_entries(frags_path)
+    result = [entry.path for entry in entries]
+    return result
+
+
+def hash_file(loc):
+    """Finds the content hash of a file.
+
+    Args:
+        loc: the file location
+
+    Returns:
+        result: the BLAKE2b hash, a 32 character hex string
+    """
+    loc = str(loc)
+    hasher = _blake2b(digest_size=16)
+
+    with open(loc, "rb") as file:
+        chunk = file.read(1024 * 1024)
+
+        while len(chunk) > 0:
+            hasher.update(chunk)
+            chunk = file.read(1024 * 1024)
+        # end while
+    # end with
+
+    result = hasher.hexdigest()
+    return result
+
+
+def probe_frag(loc, with_hash=False):
+    """Probes the header of a fragment image.
+
+    PIL checks the magic bytes and reads the header only. The file is closed before returning.
+
+    Args:
+        loc: the fragment location
+        with_hash: whether to also find the content hash, which reads the whole file
+
+    Returns:
+        result: the fragment info, or None if the file is not an image PIL can open
+    """
+    loc = str(loc)
+    with_hash = bool(with_hash)
+
+    try:
+        with _pil_image_open(loc) as image:
+            result = FragInfo(loc, image.width, image.height, image.mode, image.format)
+        # end with
+
+        if with_hash:
+            result.content_hash = hash_file(loc)
+    except Exception as _:
+        result = None
+    # end try
+
+    return result
+
+
+def _probe_frag_with_hash(loc):
+    result = probe_frag(loc, with_hash=True)
+    return result
+
+
+def probe_frags(locs, max_workers=default_probe_workers, with_hash=False):
+    """Probes the headers of some fragment images with a bounded prober thread pool.
+
+    Submits at most 4 * max_workers probes at a time, so that a large folder does not queue up all its probes.
+
+    Args:
+        locs: the fragment locations
+        max_workers: the prober thread count
+        with_hash: whether to also find the content hashes
+
+    Returns:
+        result: the fragment infos, or Nones for the files that are not images, in the order of locs
+    """
+    locs = list(locs)
+    max_workers = int(max_workers)
+    max_workers = max(max_workers, 1)
+    with_hash = bool(with_hash)
+
+    probe = _probe_frag_with_hash if with_hash else probe_frag
+    window = 4 * max_workers
+    result = []
+
+    if max_workers <= 1 or len(locs) <= 1:
+        result = [probe(loc) for loc in locs]
+    else:
+        with _ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for start in range(0, len(locs), window):
+                window_locs = locs[start: start + window]
+                result.extend(executor.map(probe, window_locs))
+            # end for
+        # end with
+    # end if
+
+    return result
+
+
+def discover_frags(frags_path, max_workers=default_probe_workers):
+    """Discovers the fragment images in a folder.
+
+    Args:
+        frags_path: the fragments path
+        max_workers: the prober thread count
+
+    Returns:
+        result: the fragment infos of the images, sorted by name
+    """
+    locs = scan_image_locs(frags_path)
+    infos = probe_frags(locs, max_workers)
+    result = [info for info in infos if info is not None]
+    return result
+
+
+def find_index_loc(index_path, frags_path):
+    """Finds the index file location of a fragments folder.
+
+    Args:
+        index_path: the folder that holds the index files
+        frags_path: the fragments path
+
+    Returns:
+        result: the index file location
+    """
+    index_path = str(index_path)
+    frags_path = _abspath(str(frags_path))
+
+    path_hash = _sha1(frags_path.encode("utf-8")).hexdigest()[:16]
+    name = _basename(frags_path.rstrip(os.sep))
+    result = _join(index_path, f"{name}-{path_hash}.json")
+    return result
+
+
+class FragIndex:
+    """Fragment index.
+
+    Persists the fragment infos of a fragments folder in a JSON file.
+    Each entry records the modification time, the size, the header, and the content hash of a file.
+    An update only probes the files that are new or whose modification time or size changed,
+    and drops the entries of the removed files.
+    """
+
+    version = 1
+    """Index file format version. Files of other versions are rebuilt."""
+
+    def __init__(self, loc, frags_path):
+        """Inits self with the given args.
+
+        Args:
+            loc: the index file location
+            frags_path: the fragments path
+        """
+        self.loc = str(loc)
+        """Index file location."""
+        self.frags_path = _abspath(str(frags_path))
+        """Fragments path. An absolute path that identifies the fragments folder in the index file."""
+        self._locs_path = str(frags_path)
+        """Fragments path as given. The fragment locations are joined to it, the same as in discover_frags."""
+        self.entries = {}
+        """Entries. Maps a file name to its entry dict."""
+        self.reused_count = 0
+        """Count of the entries reused by the last update."""
+        self.probed_count = 0
+        """Count of the files probed by the last update."""
+        self.removed_count = 0
+        """Count of the entries removed by the last update."""
+
+    def load(self):
+        """Loads self from the index file, if the file exists and matches the fragments path and the version."""
+        self.entries = {}
+
+        if not _exists(self.loc):
+            return
+
+        try:
+            index_dict = _load_json(self.loc)
+        except Exception as _:
+            index_dict = None
+        # end try
+
+        if not isinstance(index_dict, dict):
+            return
+
+        if index_dict.get("version") != self.version or index_dict.get("frags_path") != self.frags_path:
+            return
+
+        entries = index_dict.get("entries")
+
+        if isinstance(entries, dict):
+            self.entries = entries
+
+    def save(self):
+        """Saves self to the index file.
+
+        Writes a temporary file first, so that a stopped session never leaves a partial index file.
+        The temporary file name is unique to the process and the thread, so that the concurrent sessions on the same
+        fragments folder never replace each other's partial files.
+        """
+        index_dict = {
+            "version": self.version,
+            "frags_path": self.frags_path,
+            "entries": self.entries,
+        }
+
+        _makedirs(_dirname(self.loc), exist_ok=True)
+        temp_loc = f"{self.loc}.{_getpid()}-{_get_ident()}.temp"
+        _save_json(index_dict, temp_loc)
+        _replace(temp_loc, self.loc)
+
+    def needs_save(self):
+        """Finds if the last update changed self.
+
+        Returns:
+            result: the result
+        """
+        result = self.probed_count > 0 or self.removed_count > 0
+        return result
+
+    def update(self, max_workers=default_probe_workers):
+        """Updates self with the current files of the fragments folder.
+
+        Args:
+            max_workers: the prober thread count
+
+        Returns:
+            result: the fragment infos of the images, sorted by name
+        """
+        entries = _scan_image_entries(self._locs_path)
+        new_entries = {}
+        probe_names = []
+        probe_locs = []
+        probe_stats = []
+
+        for entry in entries:
+            stat = entry.stat()
+            old_entry = self.entries.get(entry.name)
+
+            if (
+                isinstance(old_entry, dict)
+                and old_entry.get("mtime_ns") == stat.st_mtime_ns
+                and old_entry.get("size") == stat.st_size
+            ):
+                new_entries[entry.name] = old_entry
+            else:
+                probe_names.append(entry.name)
+                probe_locs.append(entry.path)
+                probe_stats.append(stat)
+            # end if
+        # end for
+
+        infos = probe_frags(probe_locs, max_workers, with_hash=True)
+
+        for name, stat, info in zip(probe_names, probe_stats, infos):
+            new_entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+            if info is None:
+                # Keep the non-images too, so that they are not probed again
+                new_entry["image"] = False
+            else:
+                new_entry["image"] = True
+                new_entry["width"] = info.width
+                new_entry["height"] = info.height
+                new_entry["mode"] = info.mode
+                new_entry["format"] = info.format_name
+                new_entry["hash"] = info.content_hash
+            # end if
+
+            new_entries[name] = new_entry
+        # end for
+
+        self.probed_count = len(probe_names)
+        self.reused_count = len(new_entries) - self.probed_count
+        self.removed_count = len([name for name in self.entries if name not in new_entries])
+        self.entries = new_entries
+
+        result = []
+
+        for entry in entries:
+            index_entry = new_entries[entry.name]
+
+            if index_entry["image"]:
+                info = FragInfo(
+                    entry.path, index_entry["width"], index_entry["height"], index_entry["mode"],
+                    index_entry["format"], index_entry["hash"]
+                )
+
+                result.append(info)
+            # end if
+        # end for
+
+        return result
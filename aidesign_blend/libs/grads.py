@@ -5,9 +5,22 @@
 # First added by username: liu-yucheng
 # Last updated by username: liu-yucheng
 
+import numpy
+
 from aidesign_blend.libs import utils
 
 _clamp = utils.clamp_float
+_np_ndarray = numpy.ndarray
+_npasarray = numpy.asarray
+_npclip = numpy.clip
+_npdot = numpy.dot
+_npdouble = numpy.double
+_nppower = numpy.power
+
+
+def _is_array(inval):
+    result = isinstance(inval, _np_ndarray)
+    return result
 
 
 class GradFunc:
@@ -17,16 +30,27 @@ class GradFunc:
         """Clamps the input value to the range bounded by bounds 1 and 2.
 
         All variables are casted to float type.
+        A NumPy array input value is clamped element-wise.
 
         Args:
-            inval: the input value
+            inval: the input value, a scalar or a NumPy array
             bound1: bound 1
             bound2: bound 2
 
         Returns:
-            result: the clamped result
+            result: the clamped result, a float or a NumPy array
         """
-        result = _clamp(inval, bound1, bound2)
+        if _is_array(inval):
+            bound1 = float(bound1)
+            bound2 = float(bound2)
+            floor = min(bound1, bound2)
+            ceil = max(bound1, bound2)
+            inval = _npasarray(inval, dtype=_npdouble)
+            result = _npclip(inval, floor, ceil)
+        else:
+            result = _clamp(inval, bound1, bound2)
+        # end if
+
         return result
 
     def __init__(self):
@@ -72,12 +96,17 @@ class GradFunc:
         The default behavior is the linear unity function: f(x) = x.
 
         Args:
-            inval: the input value
+            inval: the input value, a scalar or a NumPy array
 
         Returns:
-            result: the result
+            result: the result, a float or a NumPy array
         """
-        inval = float(inval)
+        if _is_array(inval):
+            inval = _npasarray(inval, dtype=_npdouble)
+        else:
+            inval = float(inval)
+        # end if
+
         clamped_inval = self.inval_clamp(inval)
 
         outval = clamped_inval
@@ -166,26 +195,37 @@ class Poly1V(GradFunc):
         """Exponents of the polynomial terms."""
         self.term_count = term_count
         """Count of the polynomial terms."""
+        self._np_coefs = _npasarray(coefs, dtype=_npdouble)
+        """Coefficients. NumPy array."""
+        self._np_exps = _npasarray(exps, dtype=_npdouble)
+        """Exponents. NumPy array."""
 
     def __call__(self, inval):
         """Calls self as a function.
 
         Args:
-            inval: the input value
+            inval: the input value, a scalar or a NumPy array
 
         Returns:
-            result: the result
+            result: the result, a float or a NumPy array
         """
         inval = self.inval_clamp(inval)
-        outval = float(0)
 
-        for idx in range(self.term_count):
-            coef = self.coefs[idx]
-            exp = self.exps[idx]
+        if _is_array(inval):
+            # Evaluate all the terms at once along a new last axis, then sum the terms with their coefficients
+            term_vals = _nppower(inval[..., None], self._np_exps)
+            outval = _npdot(term_vals, self._np_coefs)
+        else:
+            outval = float(0)
 
-            term_val = coef * (inval ** exp)
-            outval += term_val
-        # end for
+            for idx in range(self.term_count):
+                coef = self.coefs[idx]
+                exp = self.exps[idx]
+
+                term_val = coef * (inval ** exp)
+                outval += term_val
+            # end for
+        # end if
 
         outval = self.outval_clamp(outval)
         result = outval
@@ -0,0 +1,421 @@
+"""Layouts.
+
+Saves and loads the fragment layouts of the blended pictures.
+A layout has a table of the fragment locations, and the index, flipping, and rotation matrices.
+Loads the layouts from the .npz, .csv, .jsonl, and .txt fragment locations files.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import csv
+import json
+import numpy
+import re
+
+from os import path as ospath
+
+# Aliases
+
+_csv_reader = csv.reader
+_loads_json = json.loads
+_npasarray = numpy.asarray
+_npfull = numpy.full
+_npintc = numpy.intc
+_npload = numpy.load
+_npsavez_compressed = numpy.savez_compressed
+_npstr = numpy.str_
+_npubyte = numpy.ubyte
+_npunique = numpy.unique
+_npzeros = numpy.zeros
+_re_compile = re.compile
+_splitext = ospath.splitext
+
+# End
+
+flip_x = 1
+"""Flipping matrix bit flag of the flip named "x". Flips the fragment upside down."""
+flip_y = 2
+"""Flipping matrix bit flag of the flip named "y". Flips the fragment left to right."""
+rot_180 = 1
+"""Rotation matrix bit flag of the 180 degree rotation."""
+npz_version = 1
+"""Layout .npz file format version."""
+exts = [".npz", ".csv", ".jsonl", ".txt"]
+"""Layout file extensions, including the leading dots."""
+min_frag_count = 2
+"""Minimum X and Y fragment counts of a layout to blend. Same as the minimums of x_frag_count and y_frag_count."""
+
+_text_block_pattern = _re_compile(
+    r"\(X, Y\): \((\d+), (\d+)\)\n"
+    r"Image: \"(.*)\"\n"
+    r"Flip: \"(.*)\"\n"
+    r"(?:Rotation: \"(\d+)\"\n)?"
+)
+"""Pattern of the fragment blocks of a .txt fragment locations file. The files before the rotation line have no
+rotation group."""
+
+
+def flip_str(flip):
+    """Finds the name of a flipping matrix item.
+
+    Args:
+        flip: the flipping matrix item, a combination of the flip_x and flip_y bit flags
+
+    Returns:
+        result: the name, "", "x", "y", or "xy"
+    """
+    flip = int(flip)
+    result = ""
+
+    if flip & flip_x:
+        result += "x"
+
+    if flip & flip_y:
+        result += "y"
+
+    return result
+
+
+def parse_flip_str(name):
+    """Parses the name of a flipping matrix item.
+
+    Args:
+        name: the name, "", "x", "y", or "xy"
+
+    Returns:
+        result: the flipping matrix item, a combination of the flip_x and flip_y bit flags
+
+    Raises:
+        ValueError: if the name is not a valid name
+    """
+    name = str(name)
+
+    if name not in ["", "x", "y", "xy"]:
+        raise ValueError(f"Unknown flip name: {name!r}")
+
+    result = 0
+
+    if "x" in name:
+        result |= flip_x
+
+    if "y" in name:
+        result |= flip_y
+
+    return result
+
+
+class Layout:
+    """Fragment layout."""
+
+    def __init__(self, frag_locs, index_matrix, flip_matrix, rot_matrix):
+        """Inits self with the given args.
+
+        Args:
+            frag_locs: the fragment locations
+            index_matrix: the fragment index matrix, indices into frag_locs, subscript [y, x]
+            flip_matrix: the flipping matrix, combinations of the flip_x and flip_y bit flags, subscript [y, x]
+            rot_matrix: the rotation matrix, combinations of the rot_180 bit flag, subscript [y, x]
+        """
+        self.frag_locs = [str(loc) for loc in frag_locs]
+        """Fragment locations."""
+        self.index_matrix = _npasarray(index_matrix, dtype=_npintc)
+        """Fragment index matrix. Numpy array. Type intc. Subscript [y, x]."""
+        self.flip_matrix = _npasarray(flip_matrix, dtype=_npubyte)
+        """Flipping matrix. Numpy array. Type uint8. Subscript [y, x]."""
+        self.rot_matrix = _npasarray(rot_matrix, dtype=_npubyte)
+        """Rotation matrix. Numpy array. Type uint8. Subscript [y, x]."""
+
+        shape = self.index_matrix.shape
+
+        if len(shape) != 2 or self.flip_matrix.shape != shape or self.rot_matrix.shape != shape:
+            raise ValueError("Layout matrices must be 2D and of the same shape")
+
+        if self.index_matrix.size > 0 and (
+            self.index_matrix.min() < 0 or self.index_matrix.max() >= len(self.frag_locs)
+        ):
+            raise ValueError("Layout fragment indices must be valid indices of the fragment locations")
+
+        self.y_frag_count = shape[0]
+        """Y fragment count."""
+        self.x_frag_count = shape[1]
+        """X fragment count."""
+
+    def dedup(self):
+        """Finds a copy of self with only the fragment locations in use, in the order of their old indices.
+
+        Returns:
+            result: the copy
+        """
+        used_indices, index_matrix = _npunique(self.index_matrix, return_inverse=True)
+        frag_locs = [self.frag_locs[index] for index in used_indices.tolist()]
+        index_matrix = index_matrix.reshape(self.index_matrix.shape)
+        result = Layout(frag_locs, index_matrix, self.flip_matrix, self.rot_matrix)
+        return result
+
+
+def verify_blendable(layout, name):
+    """Verifies that a layout can be blended.
+
+    Args:
+        layout: the layout
+        name: the layout name used in the error info, such as the file location
+
+    Raises:
+        ValueError: if the grid is smaller than min_frag_count x min_frag_count, or a fragment index is not a valid
+            index of the fragment locations
+    """
+    layout: Layout = layout
+    name = str(name)
+
+    if layout.x_frag_count < min_frag_count or layout.y_frag_count < min_frag_count:
+        raise ValueError(
+            f"{name} has a {layout.x_frag_count} x {layout.y_frag_count} fragment grid; "
+            f"Expects at least {min_frag_count} x {min_frag_count}"
+        )
+    # end if
+
+    if layout.index_matrix.min() < 0 or layout.index_matrix.max() >= len(layout.frag_locs):
+        raise ValueError(
+            f"{name} has fragment indices out of the range [0, {len(layout.frag_locs)}) of its fragment locations"
+        )
+    # end if
+
+
+def save_npz(layout, loc):
+    """Saves a layout to a compressed .npz file.
+
+    Saves the deduplicated fragment location table, so that each location is saved once.
+
+    Args:
+        layout: the layout
+        loc: the file location
+    """
+    layout: Layout = layout.dedup()
+    loc = str(loc)
+
+    # Write through a file object, so that numpy does not append .npz to the location
+    with open(loc, "wb") as file:
+        _npsavez_compressed(
+            file,
+            version=npz_version,
+            frag_locs=_npasarray(layout.frag_locs, dtype=_npstr),
+            index_matrix=layout.index_matrix,
+            flip_matrix=layout.flip_matrix,
+            rot_matrix=layout.rot_matrix
+        )
+    # end with
+
+
+def load_npz(loc):
+    """Loads a layout from a .npz file.
+
+    Args:
+        loc: the file location
+
+    Returns:
+        result: the layout
+
+    Raises:
+        ValueError: if the file is not a layout .npz file of a known version
+    """
+    loc = str(loc)
+
+    with _npload(loc, allow_pickle=False) as npz:
+        keys = ["version", "frag_locs", "index_matrix", "flip_matrix", "rot_matrix"]
+
+        if any(key not in npz for key in keys):
+            raise ValueError(f"{loc} is not a layout .npz file")
+
+        version = int(npz["version"])
+
+        if version != npz_version:
+            raise ValueError(f"{loc} has the unknown layout version {version}")
+
+        frag_locs = npz["frag_locs"].tolist()
+        result = Layout(frag_locs, npz["index_matrix"], npz["flip_matrix"], npz["rot_matrix"])
+    # end with
+
+    return result
+
+
+def _make_layout_from_cells(cells, loc):
+    """Returns result.
+
+    The cells are (x, y, frag_loc, flip, rot) tuples. Each (x, y) position of the grid needs exactly one cell.
+    """
+    if len(cells) <= 0:
+        raise ValueError(f"{loc} has no fragments")
+
+    if any(cell[0] < 0 or cell[1] < 0 for cell in cells):
+        raise ValueError(f"{loc} has negative fragment positions")
+
+    x_frag_count = max(cell[0] for cell in cells) + 1
+    y_frag_count = max(cell[1] for cell in cells) + 1
+
+    if len(cells) != x_frag_count * y_frag_count:
+        raise ValueError(f"{loc} has {len(cells)} fragments but a {x_frag_count} x {y_frag_count} grid")
+
+    shape = y_frag_count, x_frag_count
+    index_matrix = _npfull(shape, -1, dtype=_npintc)
+    flip_matrix = _npzeros(shape, dtype=_npubyte)
+    rot_matrix = _npzeros(shape, dtype=_npubyte)
+    loc_indices = {}
+
+    for x, y, frag_loc, flip, rot in cells:
+        if index_matrix[y, x] >= 0:
+            raise ValueError(f"{loc} has more than 1 fragment at (X, Y): ({x}, {y})")
+
+        index_matrix[y, x] = loc_indices.setdefault(frag_loc, len(loc_indices))
+        flip_matrix[y, x] = flip
+        rot_matrix[y, x] = rot
+    # end for
+
+    result = Layout(list(loc_indices), index_matrix, flip_matrix, rot_matrix)
+    return result
+
+
+def _parse_rot(rotation):
+    """Returns rot."""
+    rotation = int(rotation)
+
+    if rotation not in [0, 180]:
+        raise ValueError(f"Unknown rotation: {rotation}")
+
+    rot = rot_180 if rotation == 180 else 0
+    return rot
+
+
+def load_csv(loc):
+    """Loads a layout from a .csv fragment locations file.
+
+    Args:
+        loc: the file location
+
+    Returns:
+        result: the layout
+
+    Raises:
+        ValueError: if the file is not a valid .csv fragment locations file
+    """
+    loc = str(loc)
+
+    with open(loc, "r", encoding="utf-8", newline="") as file:
+        reader = _csv_reader(file)
+        header = next(reader, None)
+
+        if header != ["x", "y", "index", "image", "flip", "rotation"]:
+            raise ValueError(f"{loc} is not a .csv fragment locations file")
+
+        cells = [(int(row[0]), int(row[1]), row[3], parse_flip_str(row[4]), _parse_rot(row[5])) for row in reader]
+    # end with
+
+    result = _make_layout_from_cells(cells, loc)
+    return result
+
+
+def load_jsonl(loc):
+    """Loads a layout from a .jsonl fragment locations file.
+
+    Args:
+        loc: the file location
+
+    Returns:
+        result: the layout
+
+    Raises:
+        ValueError: if the file is not a valid .jsonl fragment locations file
+    """
+    loc = str(loc)
+    cells = []
+
+    with open(loc, "r", encoding="utf-8") as file:
+        for line in file:
+            if len(line.strip()) <= 0:
+                continue
+
+            row = _loads_json(line)
+            flip = parse_flip_str(row["flip"])
+            rot = _parse_rot(row["rotation"])
+            cell = int(row["x"]), int(row["y"]), str(row["image"]), flip, rot
+            cells.append(cell)
+        # end for
+    # end with
+
+    result = _make_layout_from_cells(cells, loc)
+    return result
+
+
+def _unescape_repr(string):
+    """Returns result.
+
+    Reverses the escapes of a string repr without its quotes.
+    """
+    result = string.encode("latin-1", "backslashreplace").decode("unicode_escape")
+    return result
+
+
+def load_text(loc):
+    """Loads a layout from a .txt fragment locations file.
+
+    The blocks without a rotation line, from the files saved before the rotations were recorded, have no rotation.
+
+    Args:
+        loc: the file location
+
+    Returns:
+        result: the layout
+
+    Raises:
+        ValueError: if the file is not a valid .txt fragment locations file
+    """
+    loc = str(loc)
+
+    with open(loc, "r") as file:
+        text = file.read()
+
+    cells = []
+
+    for match in _text_block_pattern.finditer(text):
+        x, y, image, flip, rotation = match.groups()
+        rot = 0 if rotation is None else _parse_rot(rotation)
+        cell = int(x), int(y), _unescape_repr(image), parse_flip_str(_unescape_repr(flip)), rot
+        cells.append(cell)
+    # end for
+
+    result = _make_layout_from_cells(cells, loc)
+    return result
+
+
+def load(loc):
+    """Loads a layout from a fragment locations file of any of the layout file extensions.
+
+    Args:
+        loc: the file location
+
+    Returns:
+        result: the layout
+
+    Raises:
+        ValueError: if the file extension is not a layout file extension, the file is not a valid layout file, or the
+            layout cannot be blended
+    """
+    loc = str(loc)
+    ext = _splitext(loc)[1].lower()
+
+    if ext == ".npz":
+        result = load_npz(loc)
+    elif ext == ".csv":
+        result = load_csv(loc)
+    elif ext == ".jsonl":
+        result = load_jsonl(loc)
+    elif ext == ".txt":
+        result = load_text(loc)
+    else:
+        raise ValueError(f"{loc} does not have any of the layout file extensions {exts}")
+    # end if
+
+    verify_blendable(result, loc)
+    return result
@@ -0,0 +1,345 @@
+"""Metrics.
+
+Records the wall time, the CPU time, the peak resident set size (RSS), and the throughput of the phases of a session.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import json
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError as _:
+    # Not available on Windows
+    resource = None
+# end try
+
+# Aliases
+
+_dump_json = json.dump
+_Event = threading.Event
+_Lock = threading.Lock
+_perf_counter = time.perf_counter
+_platform = sys.platform
+_process_time = time.process_time
+_Thread = threading.Thread
+_thread_time = time.thread_time
+
+# End
+
+metrics_version = 1
+"""Metrics file format version."""
+rss_sample_secs = 0.05
+"""Seconds between 2 RSS samples of a phase."""
+
+
+def find_peak_rss():
+    """Finds the peak resident set size (RSS) of this process so far.
+
+    Returns:
+        result: the peak RSS in bytes, or None if unknown on this platform
+    """
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # In bytes on macOS, in kilobytes on the other platforms
+    if _platform == "darwin":
+        result = int(max_rss)
+    else:
+        result = int(max_rss) * 1024
+    # end if
+
+    return result
+
+
+def find_rss():
+    """Finds the current resident set size (RSS) of this process.
+
+    Returns:
+        result: the RSS in bytes, or None if unknown on this platform
+    """
+    try:
+        with open("/proc/self/statm", "r") as statm_file:
+            resident_pages = int(statm_file.read().split()[1])
+        # end with
+    except (OSError, ValueError, IndexError) as _:
+        return None
+    # end try
+
+    if resource is None:
+        return None
+
+    result = resident_pages * resource.getpagesize()
+    return result
+
+
+def format_rss(rss):
+    """Formats an RSS.
+
+    Args:
+        rss: the RSS in bytes, or None if unknown
+
+    Returns:
+        result: the formatted RSS, in megabytes, or "unknown"
+    """
+    if rss is None:
+        result = "unknown"
+    else:
+        result = f"{rss / (1024 * 1024):.1f} MB"
+
+    return result
+
+
+class _RSSSampler:
+    """RSS sampler.
+
+    Samples the current RSS on a thread from its creation to its stop, and keeps the peak of the samples.
+    Where the current RSS is unknown, such as on macOS, falls back to the peak RSS of the process so far at the start
+    and the stop. The peak at the stop is the peak of the sampled span if the span raised it, or an upper bound of it.
+    """
+
+    def __init__(self):
+        """Inits self and starts sampling."""
+        self.start_rss = find_rss()
+        """RSS at the start, or None if unknown on this platform."""
+        self.end_rss = None
+        """RSS at the stop, or None if not stopped or unknown on this platform."""
+        self.peak_rss = self.start_rss
+        """Peak RSS of the samples, or None if unknown on this platform."""
+        self._stop_event = _Event()
+        """Stop event."""
+        self._thread = None
+        """Sampling thread, or None if the current RSS is unknown on this platform."""
+
+        if self.start_rss is not None:
+            self._thread = _Thread(target=self._sample_loop, daemon=True)
+            self._thread.start()
+        else:
+            self.start_rss = find_peak_rss()
+            self.peak_rss = self.start_rss
+        # end if
+
+    def _sample(self):
+        rss = find_rss()
+
+        if rss is not None and rss > self.peak_rss:
+            self.peak_rss = rss
+
+        return rss
+
+    def _sample_loop(self):
+        while not self._stop_event.wait(rss_sample_secs):
+            self._sample()
+
+    def stop(self):
+        """Stops sampling and takes the last sample."""
+        if self._thread is None:
+            self.end_rss = find_peak_rss()
+            self.peak_rss = self.end_rss
+            return
+        # end if
+
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self.end_rss = self._sample()
+
+
+class PhaseMetrics:
+    """Phase metrics.
+
+    Records the metrics of each phase that it runs.
+    The CPU time is the CPU time of the whole process, including the other threads that run during the phase.
+    The CPU time of an overlapped phase, which runs on its own thread alongside the other phases, is the CPU time of
+    its thread.
+    The RSS items are the RSS of the whole process, sampled from the start to the end of the phase.
+    Safe to use from multiple threads.
+    """
+
+    def __init__(self):
+        """Inits self with the given args."""
+        self.phases = []
+        """Phase records. Dicts of the name, the start time, the wall and CPU times, the RSS items, and the rates."""
+        self._start_time = _perf_counter()
+        """Start time."""
+        self._first_process_time = None
+        """Process CPU time at the first phase start, or None if no phase is recorded."""
+        self._last_process_time = None
+        """Process CPU time at the last phase end, or None if no phase is recorded."""
+        self._lock = _Lock()
+        """Lock."""
+
+    def run(self, name, func, *args, counts=None, labels=None, overlapped=False):
+        """Runs a function as a phase and records its metrics.
+
+        Args:
+            name: the phase name
+            func: the function
+            *args: the function args
+            counts: a callable that returns the counts of the items the phase processes, a dict from the unit names to
+                the counts, called after the function; Or None for no counts
+            labels: the labels to add to the phase record, a dict; Or None for no labels
+            overlapped: whether the phase runs on its own thread alongside the other phases
+
+        Returns:
+            result: the function result
+            record: the phase record
+        """
+        rss_sampler = _RSSSampler()
+        start_time = _perf_counter()
+        start_process_time = _process_time()
+        start_thread_time = _thread_time()
+
+        try:
+            result = func(*args)
+        finally:
+            rss_sampler.stop()
+        # end try
+
+        wall_secs = _perf_counter() - start_time
+        end_process_time = _process_time()
+
+        if overlapped:
+            cpu_secs = _thread_time() - start_thread_time
+        else:
+            cpu_secs = end_process_time - start_process_time
+        # end if
+
+        counts = {} if counts is None else dict(counts())
+        rates = {}
+
+        for unit, count in counts.items():
+            rates[f"{unit}_per_sec"] = count / wall_secs if wall_secs > 0 else None
+
+        record = {
+            "name": str(name),
+            "start_secs": start_time - self._start_time,
+            "wall_secs": wall_secs,
+            "cpu_secs": cpu_secs,
+            "start_rss_bytes": rss_sampler.start_rss,
+            "end_rss_bytes": rss_sampler.end_rss,
+            "peak_rss_bytes": rss_sampler.peak_rss,
+            "overlapped": bool(overlapped),
+            "counts": counts,
+            "rates": rates
+        }
+
+        if labels is not None:
+            record.update(labels)
+
+        with self._lock:
+            self.phases.append(record)
+
+            if self._first_process_time is None or start_process_time < self._first_process_time:
+                self._first_process_time = start_process_time
+
+            if self._last_process_time is None or end_process_time > self._last_process_time:
+                self._last_process_time = end_process_time
+        # end with
+
+        return result, record
+
+    def phase_str(self, record):
+        """Finds the string representation of a phase record.
+
+        Args:
+            record: the phase record
+
+        Returns:
+            result: the result
+        """
+        result = str(
+            f"Phase {record['name']}:  Wall: {record['wall_secs']:.3f} s  CPU: {record['cpu_secs']:.3f} s  "
+            f"Peak RSS: {format_rss(record['peak_rss_bytes'])}"
+        )
+
+        for unit, rate in record["rates"].items():
+            if rate is not None:
+                result += f"  {unit.replace('_per_sec', '').capitalize()}/s: {rate:.2f}"
+        # end for
+
+        if record["overlapped"]:
+            result += "  Overlapped"
+
+        return result
+
+    def totals(self):
+        """Finds the total wall time, CPU time, and the peak RSS of the recorded phases.
+
+        The total wall time and CPU time are the times of the whole process from the first phase start to the last
+        phase end, so that the overlapped phases are not counted twice.
+
+        Returns:
+            result: a dict with the "wall_secs", "cpu_secs", and "peak_rss_bytes" items
+        """
+        with self._lock:
+            phases = list(self.phases)
+
+            if self._first_process_time is None:
+                cpu_secs = float(0)
+            else:
+                cpu_secs = self._last_process_time - self._first_process_time
+        # end with
+
+        if len(phases) > 0:
+            start_secs = min(phase["start_secs"] for phase in phases)
+            end_secs = max(phase["start_secs"] + phase["wall_secs"] for phase in phases)
+            wall_secs = end_secs - start_secs
+        else:
+            wall_secs = float(0)
+        # end if
+
+        peak_rsses = [phase["peak_rss_bytes"] for phase in phases if phase["peak_rss_bytes"] is not None]
+
+        result = {
+            "wall_secs": wall_secs,
+            "cpu_secs": cpu_secs,
+            "peak_rss_bytes": max(peak_rsses) if len(peak_rsses) > 0 else None
+        }
+
+        return result
+
+    def totals_str(self):
+        """Finds the string representation of the totals.
+
+        Returns:
+            result: the result
+        """
+        totals = self.totals()
+
+        result = str(
+            f"Phase totals:  Wall: {totals['wall_secs']:.3f} s  CPU: {totals['cpu_secs']:.3f} s  "
+            f"Peak RSS: {format_rss(totals['peak_rss_bytes'])}"
+        )
+
+        return result
+
+    def save(self, loc):
+        """Saves the metrics to a JSON file.
+
+        Args:
+            loc: the file location
+        """
+        loc = str(loc)
+
+        with self._lock:
+            phases = list(self.phases)
+
+        metrics = {
+            "version": metrics_version,
+            "phases": phases,
+            "totals": self.totals()
+        }
+
+        with open(loc, "w") as file:
+            _dump_json(metrics, file, indent=4)
+            file.write("\n")
+        # end with
@@ -0,0 +1,106 @@
+"""Pipelines.
+
+Timing counters of the stages of a blending pipeline.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import threading
+import time
+
+# Aliases
+
+_Lock = threading.Lock
+_perf_counter = time.perf_counter
+
+# End
+
+
+class StageTimer:
+    """Stage timer.
+
+    Counts the items, the busy time, and the waiting time of a pipeline stage.
+    The busy time of a stage with multiple threads is the sum of the busy times of the threads.
+    Safe to use from multiple threads.
+    """
+
+    def __init__(self, name):
+        """Inits self with the given args.
+
+        Args:
+            name: the stage name
+        """
+        self.name = str(name)
+        """Stage name."""
+        self.item_count = 0
+        """Item count."""
+        self.busy_secs = float(0)
+        """Busy time in seconds."""
+        self.wait_secs = float(0)
+        """Waiting time in seconds. The time the stage waits for its inputs or for its output space."""
+        self._lock = _Lock()
+        """Lock."""
+
+    def run(self, func, *args):
+        """Runs a function as an item of the stage and counts its busy time.
+
+        Args:
+            func: the function
+            *args: the function args
+
+        Returns:
+            result: the function result
+        """
+        start_time = _perf_counter()
+
+        try:
+            result = func(*args)
+        finally:
+            busy_secs = _perf_counter() - start_time
+
+            with self._lock:
+                self.item_count += 1
+                self.busy_secs += busy_secs
+            # end with
+        # end try
+
+        return result
+
+    def wait(self, func, *args):
+        """Runs a function that waits for the stage inputs or output space and counts its waiting time.
+
+        Args:
+            func: the function
+            *args: the function args
+
+        Returns:
+            result: the function result
+        """
+        start_time = _perf_counter()
+
+        try:
+            result = func(*args)
+        finally:
+            wait_secs = _perf_counter() - start_time
+
+            with self._lock:
+                self.wait_secs += wait_secs
+            # end with
+        # end try
+
+        return result
+
+    def statstr(self):
+        """Finds the string representation of the statistics of self.
+
+        Returns:
+            result: the result
+        """
+        result = str(
+            f"{self.name}:  Items: {self.item_count}  Busy: {self.busy_secs:.3f} s  Waited: {self.wait_secs:.3f} s"
+        )
+
+        return result
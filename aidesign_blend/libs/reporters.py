@@ -0,0 +1,215 @@
+"""Reporters.
+
+Reports the progress of the long blending tasks at time intervals, as log lines and as structured events.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import datetime
+import json
+import threading
+import time
+
+from aidesign_blend.libs import metrics
+
+# Aliases
+
+_dumps_json = json.dumps
+_find_peak_rss = metrics.find_peak_rss
+_find_rss = metrics.find_rss
+_format_rss = metrics.format_rss
+_Lock = threading.Lock
+_monotonic = time.monotonic
+_time = time.time
+_timedelta = datetime.timedelta
+
+# End
+
+events_version = 1
+"""Progress events format version."""
+
+
+def _find_memory():
+    """Returns rss.
+
+    The current RSS if known, otherwise the peak RSS.
+    """
+    rss = _find_rss()
+
+    if rss is None:
+        rss = _find_peak_rss()
+
+    return rss
+
+
+class ProgressEvents:
+    """Progress events.
+
+    Writes the structured progress events as JSON lines to a file or a named pipe.
+    Opens the file for appending at the first event, so that a reader can be attached to a named pipe before that.
+    Safe to use from multiple threads.
+    """
+
+    def __init__(self, loc, source=None):
+        """Inits self with the given args.
+
+        Args:
+            loc: the events file location
+            source: the source added to each event, such as the result tag of a blender, or None
+        """
+        self.loc = str(loc)
+        """Events file location."""
+        self.source = source
+        """Source added to each event, or None."""
+        self._file = None
+        """Events file, or None if not opened."""
+        self._lock = _Lock()
+        """Lock."""
+
+    def emit(self, event, **items):
+        """Writes an event.
+
+        Each event is a JSON object on a line, with the "version", "event", "time", and "source" items and the given
+        items. The "time" item is the UNIX time in seconds.
+
+        Args:
+            event: the event name
+            **items: the event items
+        """
+        record = {"version": events_version, "event": str(event), "time": _time(), "source": self.source}
+        record.update(items)
+        line = _dumps_json(record) + "\n"
+
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.loc, "a", buffering=1)
+
+            self._file.write(line)
+        # end with
+
+    def close(self):
+        """Closes the events file if opened."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            # end if
+        # end with
+
+
+class ProgressReporter:
+    """Progress reporter.
+
+    Reports the progress of a task at the first update, then at most once per interval, and at the completion.
+    Each report has the percent done, the rate, the estimated time of arrival (ETA), and the memory in use.
+    Safe to use from multiple threads.
+    """
+
+    def __init__(self, task, label, total, unit, interval_secs, log_func, events=None):
+        """Inits self with the given args.
+
+        Args:
+            task: the task name used in the events, such as "blend_blocks"
+            label: the label used in the log lines, such as "Blended blocks"
+            total: the total item count
+            unit: the item unit, such as "blocks"
+            interval_secs: the minimum seconds between 2 reports
+            log_func: the function that logs a line
+            events: the progress events, or None for no events
+        """
+        self.task = str(task)
+        """Task name."""
+        self.label = str(label)
+        """Log line label."""
+        self.total = int(total)
+        """Total item count."""
+        self.unit = str(unit)
+        """Item unit."""
+        self.interval_secs = float(interval_secs)
+        """Minimum seconds between 2 reports."""
+        self.done = 0
+        """Done item count."""
+        self.report_count = 0
+        """Report count."""
+        self._log_func = log_func
+        """Log function."""
+        self._events: ProgressEvents = events
+        """Progress events, or None."""
+        self._start_time = _monotonic()
+        """Start time."""
+        self._last_report_time = None
+        """Last report time, or None if not reported."""
+        self._lock = _Lock()
+        """Lock."""
+
+        if self._events is not None:
+            self._events.emit("start", task=self.task, total=self.total, unit=self.unit)
+
+    def update(self, count):
+        """Adds some done items and reports the progress if needed.
+
+        Args:
+            count: the count of the newly done items
+        """
+        count = int(count)
+
+        with self._lock:
+            self.done += count
+            now = _monotonic()
+
+            needs_report = \
+                self._last_report_time is None or \
+                now - self._last_report_time >= self.interval_secs or \
+                self.done >= self.total
+
+            if not needs_report:
+                return
+
+            self._last_report_time = now
+            self.report_count += 1
+            self._report(now)
+        # end with
+
+    def _report(self, now):
+        elapsed_secs = now - self._start_time
+        percent = 100 * self.done / self.total if self.total > 0 else float(100)
+        rate = self.done / elapsed_secs if elapsed_secs > 0 else None
+        remaining = max(self.total - self.done, 0)
+
+        if remaining == 0:
+            eta_secs = float(0)
+        elif rate is not None and rate > 0:
+            eta_secs = remaining / rate
+        else:
+            eta_secs = None
+        # end if
+
+        rss = _find_memory()
+        rate_str = "unknown" if rate is None else f"{rate:.1f} {self.unit}/s"
+        eta_str = "unknown" if eta_secs is None else str(_timedelta(seconds=round(eta_secs)))
+
+        line = str(
+            f"{self.label}: {self.done} / {self.total} ({percent:.1f}%)  Rate: {rate_str}  ETA: {eta_str}  "
+            f"Memory: {_format_rss(rss)}"
+        )
+
+        self._log_func(line)
+
+        if self._events is not None:
+            self._events.emit(
+                "progress", task=self.task, done=self.done, total=self.total, unit=self.unit, percent=percent,
+                rate=rate, elapsed_secs=elapsed_secs, eta_secs=eta_secs, rss_bytes=rss
+            )
+        # end if
+
+    def finish(self):
+        """Finishes the task and writes the end event."""
+        if self._events is not None:
+            with self._lock:
+                elapsed_secs = _monotonic() - self._start_time
+                self._events.emit("end", task=self.task, done=self.done, total=self.total, elapsed_secs=elapsed_secs)
+            # end with
+        # end if
@@ -0,0 +1,140 @@
+"""Seed sweeps.
+
+Runs the blender once for each seed of a sweep in a process pool.
+The processes share the resized fragments and the blend matrices read-only through shared memory.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import concurrent.futures
+import io
+import multiprocessing
+
+from aidesign_blend.libs import blenders
+from aidesign_blend.libs import caches
+from aidesign_blend.libs import utils
+
+# Aliases
+
+_as_completed = concurrent.futures.as_completed
+_Blender = blenders.Blender
+_get_context = multiprocessing.get_context
+_logln = utils.logln
+_ProcessPoolExecutor = concurrent.futures.ProcessPoolExecutor
+_SharedFrags = caches.SharedFrags
+_StringIO = io.StringIO
+
+# End
+
+
+def parse_seeds(seeds_str):
+    """Parses a seeds string.
+
+    The string is a comma separated list of seeds and inclusive seed ranges. For example: "1..4,9,12..13".
+
+    Args:
+        seeds_str: the seeds string
+
+    Returns:
+        result: the seeds, in the order of the string, without duplicates
+
+    Raises:
+        ValueError: if the string is not a valid seeds string
+    """
+    seeds_str = str(seeds_str)
+    result = []
+
+    for part in seeds_str.split(","):
+        part = part.strip()
+
+        if ".." in part:
+            first_str, last_str = part.split("..", 1)
+            first = int(first_str)
+            last = int(last_str)
+
+            if last < first:
+                raise ValueError(f"Seed range {part} ends before it starts")
+
+            part_seeds = range(first, last + 1)
+        else:
+            part_seeds = [int(part)]
+        # end if
+
+        for seed in part_seeds:
+            if seed < 0:
+                raise ValueError(f"Seed {seed} is negative")
+
+            if seed not in result:
+                result.append(seed)
+        # end for
+    # end for
+
+    return result
+
+
+_worker_state = None
+"""Worker process state. A (frags_path, proj_path, shared_frags, debug_level) tuple."""
+
+
+def _init_worker(frags_path, proj_path, shared_frags, debug_level):
+    global _worker_state
+    _worker_state = frags_path, proj_path, shared_frags, debug_level
+
+
+def _blend_seed(seed):
+    """Returns seed, log_text."""
+    frags_path, proj_path, shared_frags, debug_level = _worker_state
+    log = _StringIO()
+    blender = _Blender(frags_path, proj_path, [log], debug_level)
+    blender.config_overrides["manual_seed"] = seed
+    blender.result_tag = f"Seed-{seed}"
+    blender.prep(shared_frags)
+    blender.blend()
+    log_text = log.getvalue()
+    return seed, log_text
+
+
+def run_sweep(frags_path, proj_path, seeds, jobs, logs, debug_level=0):
+    """Runs a seed sweep.
+
+    Blends a picture for each seed, as a "blend start" session with the seed as the manual_seed would.
+    The result files are tagged with "-Seed-<seed>".
+
+    Args:
+        frags_path: the fragments path
+        proj_path: the project path
+        seeds: the seeds
+        jobs: the process count
+        logs: the logs
+        debug_level: the debug level
+    """
+    seeds = [int(seed) for seed in seeds]
+    jobs = int(jobs)
+    jobs = max(jobs, 1)
+
+    _logln(logs, f"Seed sweep:  Seeds: {len(seeds)}  Jobs: {jobs}")
+    blender = _Blender(frags_path, proj_path, logs, debug_level)
+    shared_frags: _SharedFrags = blender.prep_shared()
+
+    try:
+        # Spawn the workers, so that they do not inherit the threads and the locks of this process
+        mp_context = _get_context("spawn")
+        initargs = frags_path, proj_path, shared_frags, debug_level
+        done_count = 0
+
+        with _ProcessPoolExecutor(jobs, mp_context, _init_worker, initargs) as executor:
+            futures = [executor.submit(_blend_seed, seed) for seed in seeds]
+
+            for future in _as_completed(futures):
+                seed, log_text = future.result()
+                done_count += 1
+                _logln(logs, f"-\nSeed {seed} log:\n{log_text.rstrip()}\n-")
+                _logln(logs, f"Completed seed {seed} ({done_count} / {len(seeds)})")
+            # end for
+        # end with
+    finally:
+        shared_frags.close()
+    # end try
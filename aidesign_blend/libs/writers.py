@@ -0,0 +1,220 @@
+"""Image writers.
+
+Writers that stream an image to a file in bands of rows, so that the whole image never needs to be in memory.
+"""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import abc
+import numpy
+import struct
+import typing
+import zlib
+
+# Aliases
+
+_ABC = abc.ABC
+_abstractmethod = abc.abstractmethod
+_compressobj = zlib.compressobj
+_crc32 = zlib.crc32
+_IO = typing.IO
+_npascontiguousarray = numpy.ascontiguousarray
+_npconcatenate = numpy.concatenate
+_npubyte = numpy.ubyte
+_npzeros = numpy.zeros
+_pack = struct.pack
+
+# End
+
+
+class BandWriter(_ABC):
+    """Band writer base class.
+
+    Writes an RGB image of a known size, band by band, from the top to the bottom.
+    The subclasses implement _write_band, and optionally _write_header and _write_trailer.
+    """
+
+    ext = None
+    """File extension."""
+
+    def __init__(self, loc, width, height):
+        """Inits self with the given args.
+
+        Args:
+            loc: the file location
+            width: the image width
+            height: the image height
+        """
+        self.loc = str(loc)
+        """File location."""
+        self.width = int(width)
+        """Image width."""
+        self.height = int(height)
+        """Image height."""
+        self.written_rows = 0
+        """Count of the written rows."""
+        self._file: _IO = open(self.loc, "wb")
+        """File."""
+        self._write_header()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # Leave the partially written file for inspection
+            self._file.close()
+        # end if
+
+    def _write_header(self):
+        pass
+
+    @_abstractmethod
+    def _write_band(self, band):
+        """Writes a contiguous uint8 band of rows with subscripts [y, x, c]."""
+
+    def _write_trailer(self):
+        pass
+
+    def write(self, band):
+        """Writes a band of rows.
+
+        Args:
+            band: the band. NumPy array. Type uint8. Subscripts [y, x, c].
+
+        Raises:
+            ValueError: if the band does not fit the image
+        """
+        band_height = band.shape[0]
+
+        if band.shape[1:] != (self.width, 3):
+            raise ValueError(f"Band shape {band.shape} does not match the image width {self.width}")
+
+        if self.written_rows + band_height > self.height:
+            raise ValueError(f"Band of {band_height} rows exceeds the image height {self.height}")
+
+        band = _npascontiguousarray(band, dtype=_npubyte)
+        self._write_band(band)
+        self.written_rows += band_height
+
+    def close(self):
+        """Completes the image and closes the file.
+
+        Raises:
+            ValueError: if the written rows do not fill the image
+        """
+        if self._file.closed:
+            return
+
+        try:
+            if self.written_rows != self.height:
+                raise ValueError(f"Wrote {self.written_rows} rows but the image height is {self.height}")
+
+            self._write_trailer()
+        finally:
+            self._file.close()
+        # end try
+
+
+class PPMWriter(BandWriter):
+    """Binary PPM (P6) band writer."""
+
+    ext = "ppm"
+
+    def _write_header(self):
+        header = f"P6\n{self.width} {self.height}\n255\n"
+        self._file.write(header.encode("ascii"))
+
+    def _write_band(self, band):
+        self._file.write(band.tobytes())
+
+
+class PNGWriter(BandWriter):
+    """PNG band writer.
+
+    Compresses the rows with a single zlib stream and flushes them as IDAT chunks.
+    """
+
+    ext = "png"
+
+    chunk_size = 1024 * 1024
+    """Pending compressed byte count that triggers an IDAT chunk."""
+
+    def _write_chunk(self, chunk_type, data):
+        chunk_type = bytes(chunk_type)
+        data = bytes(data)
+
+        self._file.write(_pack(">I", len(data)))
+        self._file.write(chunk_type)
+        self._file.write(data)
+        self._file.write(_pack(">I", _crc32(data, _crc32(chunk_type)) & 0xFFFFFFFF))
+
+    def _write_header(self):
+        self._compressor = _compressobj(6)
+        self._pending = []
+        self._pending_size = 0
+
+        signature = b"\x89PNG\r\n\x1a\n"
+        self._file.write(signature)
+
+        # Bit depth 8, color type 2 (RGB), compression 0, filter 0, interlace 0
+        ihdr = _pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0)
+        self._write_chunk(b"IHDR", ihdr)
+
+    def _flush_pending(self):
+        if self._pending_size > 0:
+            self._write_chunk(b"IDAT", b"".join(self._pending))
+            self._pending = []
+            self._pending_size = 0
+        # end if
+
+    def _write_band(self, band):
+        # Prepend the filter type byte 0 (None) to each row
+        filter_bytes = _npzeros((band.shape[0], 1), dtype=_npubyte)
+        rows = _npconcatenate([filter_bytes, band.reshape(band.shape[0], -1)], axis=1)
+
+        data = self._compressor.compress(rows.tobytes())
+
+        if len(data) > 0:
+            self._pending.append(data)
+            self._pending_size += len(data)
+
+        if self._pending_size >= self.chunk_size:
+            self._flush_pending()
+
+    def _write_trailer(self):
+        data = self._compressor.flush()
+        self._pending.append(data)
+        self._pending_size += len(data)
+        self._flush_pending()
+        self._write_chunk(b"IEND", b"")
+
+
+formats = {
+    "png": PNGWriter,
+    "ppm": PPMWriter,
+}
+"""Supported formats. Maps a format name to its writer class."""
+
+
+def make_writer(format_name, loc, width, height):
+    """Makes a band writer.
+
+    Args:
+        format_name: the format name, a key of formats
+        loc: the file location
+        width: the image width
+        height: the image height
+
+    Returns:
+        result: the writer
+    """
+    format_name = str(format_name)
+    writer_class = formats[format_name]
+    result = writer_class(loc, width, height)
+    return result
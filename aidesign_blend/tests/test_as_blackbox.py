@@ -345,6 +345,81 @@ class TestBlendInfo(_TestSimpleCmd):
         self._log_method_end(method_name)
 
 
+class TestBlendCache(_TestSimpleCmd):
+    """Tests for the "blend cache" command."""
+
+    def setUp(self):
+        """Sets up before the tests."""
+        super().setUp()
+        self._backup_app_data()
+        _rmtree(_proj_path, ignore_errors=True)
+
+    def tearDown(self):
+        """Tears down after the tests."""
+        super().tearDown()
+        self._restore_app_data()
+        _rmtree(_proj_path, ignore_errors=True)
+
+    def test_norm(self):
+        """Tests the normal use case."""
+        method_name = self.test_norm.__name__
+        cmd = "blend cache"
+        instr = ""
+        self._log_method_start(method_name)
+        self._test_cmd_norm(cmd, instr)
+        self._log_method_end(method_name)
+
+    def test_custom_path(self):
+        """Tests the use case where the selected project has a custom relative frag_store.path."""
+        method_name = self.test_custom_path.__name__
+        self._log_method_start(method_name)
+
+        _copytree(_default_proj_path, _proj_path)
+        config_loc = _join(_proj_path, "blenders_config.json")
+        config = _load_json(config_loc)
+        config["frag_store"] = {"enabled": True, "max_megabytes": 0, "path": "custom_frag_store"}
+        _save_json(config, config_loc)
+
+        start_status = _load_json(_start_status_loc)
+        start_status["project_path"] = _proj_path
+        _save_json(start_status, _start_status_loc)
+
+        cmd = "blend cache"
+        instr = ""
+        thread = _FuncThread(target=_run_cmd, args=[cmd, instr])
+        thread.start()
+        exit_code, out, err = thread.join(_timeout)
+        timed_out = thread.is_alive()
+
+        self._log_cmdout(cmd, "stdout", out)
+        self._log_cmdout(cmd, "stderr", err)
+
+        fail_msg = "Running \"{}\" results in a timeout".format(cmd)
+        self.assertTrue(timed_out is False, fail_msg)
+
+        fail_msg = "Running \"{}\" results in an unexpected exit code: {}".format(cmd, exit_code)
+        self.assertTrue(exit_code == 0, fail_msg)
+
+        store_path = _join(_proj_path, "custom_frag_store")
+        fail_msg = "Running \"{}\" does not report the custom fragment store path {}".format(cmd, store_path)
+        self.assertTrue(store_path in out, fail_msg)
+
+        self._log_method_end(method_name)
+
+
+class TestBlendBench(_TestSimpleCmd):
+    """Tests for the "blend bench" command."""
+
+    def test_norm(self):
+        """Tests the normal use case."""
+        method_name = self.test_norm.__name__
+        cmd = "blend bench --quick"
+        instr = ""
+        self._log_method_start(method_name)
+        self._test_cmd_norm(cmd, instr)
+        self._log_method_end(method_name)
+
+
 class TestBlendCreate(_TestCmd):
     """Tests for the "blend create" command."""
 
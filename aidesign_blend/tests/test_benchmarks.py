@@ -0,0 +1,84 @@
+"""Executable that tests the benchmarks sub-package."""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import json
+import os
+import tempfile
+import unittest
+
+from PIL import Image as pil_image
+
+from aidesign_blend.benchmarks import frag_sets
+from aidesign_blend.benchmarks import suites
+
+_dumps_json = json.dumps
+_listdir = os.listdir
+_loads_json = json.loads
+_make_cases = suites.make_cases
+_make_frag_set = frag_sets.make_frag_set
+_pil_image_open = pil_image.open
+_run_suite = suites.run_suite
+_TemporaryDirectory = tempfile.TemporaryDirectory
+_TestCase = unittest.TestCase
+
+
+class TestMakeFragSet(_TestCase):
+    """Tests for the make_frag_set function."""
+
+    def test_norm(self):
+        """Tests making a fragment set."""
+        with _TemporaryDirectory() as frags_path:
+            locs = _make_frag_set(frags_path, 3, 8)
+            self.assertEqual(sorted(_listdir(frags_path)), ["Frag-1.jpg", "Frag-2.jpg", "Frag-3.jpg"])
+
+            with _pil_image_open(locs[0]) as image:
+                self.assertEqual(image.size, (16, 12))
+            # end with
+        # end with
+
+
+class TestRunSuite(_TestCase):
+    """Tests for the run_suite function."""
+
+    def test_norm(self):
+        """Tests that the results time each stage of each case and are JSON serializable."""
+        cases = _make_cases([8, 16], [4], [(3, 2)])
+        results = _run_suite(cases, 2)
+        results = _loads_json(_dumps_json(results))
+
+        self.assertEqual(results["version"], suites.results_version)
+        self.assertEqual(results["repeats"], 2)
+        self.assertEqual(len(results["cases"]), 2)
+
+        for case, case_result in zip(cases, results["cases"]):
+            for key, val in case.items():
+                self.assertEqual(case_result[key], val)
+
+            timings = case_result["timings"]
+            self.assertEqual(sorted(timings), sorted(suites.stage_names))
+            self.assertEqual(timings["_blend_block"]["calls_per_repeat"], 2)
+
+            for timing in timings.values():
+                self.assertGreaterEqual(timing["median_secs"], timing["min_secs"])
+
+            debug_logging = case_result["debug_logging"]
+            modes = ["eager", "lazy"]
+            keys = [f"{mode}_level_{level}" for mode in modes for level in suites.debug_logging_levels]
+            self.assertEqual(sorted(debug_logging), sorted(keys))
+
+            for key in keys:
+                self.assertEqual(debug_logging[key]["calls_per_repeat"], 2)
+        # end for
+
+
+def main():
+    """Runs this module as an executable."""
+    unittest.main(verbosity=1)
+
+
+if __name__ == "__main__":
+    main()
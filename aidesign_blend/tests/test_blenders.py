@@ -0,0 +1,1154 @@
+"""Executable that tests the blenders module."""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import csv
+import json
+import numpy
+import os
+import pathlib
+import tempfile
+import time
+import unittest
+
+from os import path as ospath
+from PIL import Image as pil_image
+
+from aidesign_blend.libs import blenders
+from aidesign_blend.libs import configs
+from aidesign_blend.libs import grads
+from aidesign_blend.libs import layouts
+from aidesign_blend.libs import metrics
+from aidesign_blend.libs import utils
+
+_Blender = blenders.Blender
+_BlendersConfig = configs.BlendersConfig
+_clamp = utils.clamp_float
+_csv_reader = csv.reader
+_default_rng = numpy.random.default_rng
+_exists = ospath.exists
+_flip_str = blenders.flip_str
+_flip_x = blenders.flip_x
+_flip_y = blenders.flip_y
+_join = ospath.join
+_Layout = layouts.Layout
+_listdir = os.listdir
+_loads_json = json.loads
+_load_layout = layouts.load
+_load_layout_npz = layouts.load_npz
+_LU = grads.LU
+_npallclose = numpy.allclose
+_nparray = numpy.array
+_nparray_equal = numpy.array_equal
+_npclip = numpy.clip
+_npmemmap = numpy.memmap
+_npmultiply = numpy.multiply
+_npsingle = numpy.single
+_npubyte = numpy.ubyte
+_npunique = numpy.unique
+_npzeros = numpy.zeros
+_Path = pathlib.Path
+_PhaseMetrics = metrics.PhaseMetrics
+_pil_image_open = pil_image.open
+_Poly1V = grads.Poly1V
+_rot_180 = blenders.rot_180
+_sleep = time.sleep
+_TemporaryDirectory = tempfile.TemporaryDirectory
+_TestCase = unittest.TestCase
+
+_tests_path = str(_Path(__file__).parent)
+_repo_path = str(_Path(_tests_path).parent.parent)
+_default_test_data_path = _join(_repo_path, "aidesign_blend_default_configs", "test_data")
+_default_proj_path = _join(_default_test_data_path, "test_project")
+_default_frags_path = _join(_default_test_data_path, "test_frags")
+
+_bm_sizes = [(2, 2), (2, 7), (16, 16), (36, 12), (33, 65)]
+"""Blend matrix (width, height) sizes to test."""
+
+
+class _ListLog:
+    def __init__(self, list_):
+        self._list = list_
+
+    def write(self, string):
+        self._list.append(string)
+
+
+def _make_blender(grad_func):
+    blender = _Blender(None, None, [], 0)
+    blender._context.grad_func = grad_func
+    return blender
+
+
+def _make_proj(proj_path, **config_items):
+    config = _BlendersConfig.load_from_path(_default_proj_path)
+    config["manual_seed"] = 0
+    config["x_frag_count"] = 7
+    config["y_frag_count"] = 5
+
+    for key in config_items:
+        config[key] = config_items[key]
+
+    _BlendersConfig.save_to_path(config, proj_path)
+
+
+def _prep_blender(proj_path):
+    blender = _Blender(_default_frags_path, proj_path, [], 0)
+    blender.prep()
+    return blender
+
+
+class TestBlendMatrices(_TestCase):
+    """Tests for the blend matrices of the Blender class."""
+
+    def _make_blend_matrices_loop(self, grad_func, width, height):
+        """Returns ulbm, urbm, llbm, lrbm.
+
+        Finds the blend factors pixel by pixel, the way the blender did before it used NumPy broadcasting.
+        """
+        def grad_prog(index, count):
+            line_prog = float(index) / float(count - 1)
+            prog = grad_func(line_prog)
+            return prog
+
+        ulbm = _npzeros((height, width), dtype=_npsingle)
+        urbm = _npzeros((height, width), dtype=_npsingle)
+        llbm = _npzeros((height, width), dtype=_npsingle)
+        lrbm = _npzeros((height, width), dtype=_npsingle)
+
+        for iy in range(height):
+            for ix in range(width):
+                x_prog = grad_prog(ix, width)
+                y_prog = grad_prog(iy, height)
+                x_remain = grad_prog(width - 1 - ix, width)
+                y_remain = grad_prog(height - 1 - iy, height)
+
+                ul_remain = _clamp(1 - (x_prog ** 2 + y_prog ** 2) ** 0.5, 0, 1)
+                ur_remain = _clamp(1 - (x_remain ** 2 + y_prog ** 2) ** 0.5, 0, 1)
+                ll_remain = _clamp(1 - (x_prog ** 2 + y_remain ** 2) ** 0.5, 0, 1)
+                lr_remain = _clamp(1 - (x_remain ** 2 + y_remain ** 2) ** 0.5, 0, 1)
+                remain_sum = ul_remain + ur_remain + ll_remain + lr_remain
+
+                ulbm[iy, ix] = ul_remain / remain_sum
+                urbm[iy, ix] = ur_remain / remain_sum
+                llbm[iy, ix] = ll_remain / remain_sum
+                lrbm[iy, ix] = lr_remain / remain_sum
+            # end for
+        # end for
+
+        return ulbm, urbm, llbm, lrbm
+
+    def _test_match_loop(self, grad_func):
+        blender = _make_blender(grad_func)
+
+        for width, height in _bm_sizes:
+            bms = blender._make_blend_matrices(width, height)
+            loop_bms = self._make_blend_matrices_loop(grad_func, width, height)
+
+            for bm, loop_bm in zip(bms, loop_bms):
+                self.assertEqual(bm.shape, (height, width))
+                self.assertEqual(bm.dtype, loop_bm.dtype)
+                fail_msg = f"Blend matrices of size {width} x {height} do not match"
+                self.assertTrue(_npallclose(bm, loop_bm, rtol=1e-5, atol=1e-6), fail_msg)
+            # end for
+        # end for
+
+    def test_match_loop_lu(self):
+        """Tests matching the loop implementation with the default gradient function."""
+        self._test_match_loop(_LU())
+
+    def test_match_loop_poly1v(self):
+        """Tests matching the loop implementation with a custom gradient function."""
+        grad_func = _Poly1V([0.2, 0.2, 0.2, 0.2, 0.2], [0.25, 0.5, 1, 2, 4])
+        self._test_match_loop(grad_func)
+
+    def test_factor_sums(self):
+        """Tests that the 4 blend factors of each pixel sum to 1."""
+        blender = _make_blender(_LU())
+        ulbm, urbm, llbm, lrbm = blender._make_blend_matrices(36, 12)
+        sums = ulbm + urbm + llbm + lrbm
+        self.assertTrue(_npallclose(sums, 1, atol=1e-6))
+
+
+class TestLayout(_TestCase):
+    """Tests for the layout matrices of the Blender class."""
+
+    def _make_layout_blender(self, frag_count, seed):
+        blender = _make_blender(_LU())
+        c = blender._context
+        c.frag_count = frag_count
+        c.y_frag_count = 13
+        c.x_frag_count = 11
+        c.rand_frags = True
+        c.avoid_rand_dups = True
+        c.rand_flip = True
+        c.rand_rot = True
+        c.rng = _default_rng(seed)
+        return blender
+
+    def test_avoid_dups(self):
+        """Tests that each run of frag_count indices is a permutation when avoiding duplicates."""
+        blender = self._make_layout_blender(10, 0)
+        blender._prep_layout()
+        indices = blender._context.index_matrix.ravel()
+        self.assertEqual(indices.shape, (13 * 11,))
+
+        for start in range(0, len(indices) - 10, 10):
+            self.assertEqual(sorted(indices[start: start + 10]), list(range(10)))
+
+        last_run = indices[len(indices) // 10 * 10:]
+        self.assertEqual(len(set(last_run)), len(last_run))
+
+    def test_chunks(self):
+        """Tests that the permutation chunk size does not change the indices."""
+        blender = self._make_layout_blender(7, 1)
+        indices = blender._gen_rand_frag_indices(500)
+        orig_chunk_size = blenders.rand_perm_chunk_size
+
+        try:
+            blenders.rand_perm_chunk_size = 15
+            blender._context.rng = _default_rng(1)
+            chunked_indices = blender._gen_rand_frag_indices(500)
+        finally:
+            blenders.rand_perm_chunk_size = orig_chunk_size
+        # end try
+
+        self.assertTrue(_nparray_equal(indices, chunked_indices))
+
+    def test_flags(self):
+        """Tests the flipping and rotation bit flags."""
+        blender = self._make_layout_blender(10, 2)
+        blender._prep_layout()
+        c = blender._context
+        self.assertEqual(set(c.flip_matrix.ravel()), {0, _flip_x, _flip_y, _flip_x | _flip_y})
+        self.assertEqual(set(c.rot_matrix.ravel()), {0, _rot_180})
+        self.assertEqual([_flip_str(flip) for flip in range(4)], ["", "x", "y", "xy"])
+
+
+class TestBlendBlock(_TestCase):
+    """Tests for the fused blending kernel of the Blender class."""
+
+    def _blend_block_baseline(self, blender, block_y, block_x):
+        """Returns block.
+
+        Blends a block with the per-image and per-channel steps of the original implementation.
+        """
+        c = blender._context
+        size = c.frag_width, c.frag_height
+        quads = []
+
+        boxes = [
+            (c.bm_width, c.bm_height, c.frag_width, c.frag_height),
+            (0, c.bm_height, c.bm_width, c.frag_height),
+            (c.bm_width, 0, c.frag_width, c.bm_height),
+            (0, 0, c.bm_width, c.bm_height)
+        ]
+
+        coords = [(block_y, block_x), (block_y, block_x + 1), (block_y + 1, block_x), (block_y + 1, block_x + 1)]
+
+        for (iy, ix), box in zip(coords, boxes):
+            image = _pil_image_open(c.frag_locs[c.index_matrix[iy, ix]])
+            image = image.resize(size=size, resample=pil_image.BICUBIC)
+            flip = c.flip_matrix[iy, ix]
+            rot = c.rot_matrix[iy, ix]
+
+            if flip & _flip_x:
+                image = image.transpose(pil_image.FLIP_TOP_BOTTOM)
+
+            if flip & _flip_y:
+                image = image.transpose(pil_image.FLIP_LEFT_RIGHT)
+
+            if rot & _rot_180:
+                image = image.transpose(pil_image.ROTATE_180)
+
+            image = image.crop(box)
+            quads.append(_nparray(image, dtype=_npsingle))
+        # end for
+
+        ulnp, urnp, llnp, lrnp = quads
+        block = _npzeros((c.bm_height, c.bm_width, 3), dtype=_npubyte)
+
+        for channel in range(3):
+            block_c = _npmultiply(c.ulbm, ulnp[:, :, channel]) + \
+                _npmultiply(c.urbm, urnp[:, :, channel]) + \
+                _npmultiply(c.llbm, llnp[:, :, channel]) + \
+                _npmultiply(c.lrbm, lrnp[:, :, channel])
+
+            _npclip(block_c, 0, 255, block_c)
+            block[:, :, channel] = block_c
+        # end for
+
+        return block
+
+    def test_match_baseline(self):
+        """Tests that the fused kernel matches the per-channel blending with all the flips and rotations."""
+        with _TemporaryDirectory() as proj_path:
+            _make_proj(proj_path)
+            blender = _prep_blender(proj_path)
+            c = blender._context
+            flips = [0, _flip_x, _flip_y, _flip_x | _flip_y]
+            rots = [0, _rot_180]
+
+            # Cycle the 8 flip and rotation combinations over the grid, so that each quadrant position sees each one
+            for iy in range(c.y_frag_count):
+                for ix in range(c.x_frag_count):
+                    combo = (iy * c.x_frag_count + ix) % (len(flips) * len(rots))
+                    c.flip_matrix[iy, ix] = flips[combo % len(flips)]
+                    c.rot_matrix[iy, ix] = rots[combo // len(flips)]
+                # end for
+            # end for
+
+            for block_y in range(c.y_frag_count - 1):
+                for block_x in range(c.x_frag_count - 1):
+                    blender._blend_block(block_y, block_x)
+
+                    y1 = block_y * c.bm_height
+                    x1 = block_x * c.bm_width
+                    block = c.canvas[y1: y1 + c.bm_height, x1: x1 + c.bm_width]
+                    baseline_block = self._blend_block_baseline(blender, block_y, block_x)
+                    fail_msg = f"Block ({block_y}, {block_x}) does not match the baseline"
+                    self.assertTrue(_nparray_equal(block, baseline_block), fail_msg)
+                # end for
+            # end for
+        # end with
+
+
+class TestLogging(_TestCase):
+    """Tests for the logging methods of the Blender class."""
+
+    def test_lazy(self):
+        """Tests that lazy log messages are only built at enabled debug levels."""
+        logs = []
+        blender = _Blender(None, None, [], 1)
+        blender._logs = [_ListLog(logs)]
+
+        def make_line():
+            logs.append("called")
+            return "line"
+
+        blender.logln(make_line, 2)
+        self.assertEqual(logs, [])
+        self.assertFalse(blender.enabled_for(2))
+
+        blender.logln(make_line, 1)
+        self.assertEqual(logs, ["called", "line\n"])
+        self.assertTrue(blender.enabled_for(1))
+
+
+class TestWorkers(_TestCase):
+    """Tests for the workers config item."""
+
+    def test_match_serial(self):
+        """Tests that blending with multiple workers matches blending with 1 worker."""
+        results = []
+
+        for workers in [1, 3]:
+            with _TemporaryDirectory() as proj_path:
+                _make_proj(proj_path, workers=workers)
+                blender = _prep_blender(proj_path)
+                blender._blend_blocks()
+                blender._render_frags_grid()
+                c = blender._context
+                results.append((c.canvas.copy(), c.frags_grid.copy()))
+            # end with
+        # end for
+
+        serial_canvas, serial_frags_grid = results[0]
+        parallel_canvas, parallel_frags_grid = results[1]
+        self.assertTrue(_nparray_equal(serial_canvas, parallel_canvas))
+        self.assertTrue(_nparray_equal(serial_frags_grid, parallel_frags_grid))
+
+
+class TestFragStore(_TestCase):
+    """Tests for the frag_store config item."""
+
+    def test_match_no_store(self):
+        """Tests that blending with a cold and a warm fragment store matches blending without the store."""
+        results = []
+
+        with _TemporaryDirectory() as store_path:
+            for enabled in [False, True, True]:
+                with _TemporaryDirectory() as proj_path:
+                    _make_proj(proj_path, frag_store={"enabled": enabled, "max_megabytes": 16, "path": store_path})
+                    blender = _prep_blender(proj_path)
+                    blender._blend_blocks()
+                    c = blender._context
+                    results.append(c.canvas.copy())
+                # end with
+            # end for
+
+            self.assertEqual(c.frag_store.miss_count, 0)
+            self.assertGreater(c.frag_store.hit_count, 0)
+            self.assertEqual(len(_listdir(store_path)), c.frag_count)
+        # end with
+
+        self.assertTrue(_nparray_equal(results[0], results[1]))
+        self.assertTrue(_nparray_equal(results[0], results[2]))
+
+
+class TestBatch(_TestCase):
+    """Tests for the batch config item."""
+
+    def _blend(self, proj_path, **config_items):
+        _make_proj(proj_path, **config_items)
+        blender = _prep_blender(proj_path)
+        blender.blend()
+        names = sorted(name for name in _listdir(proj_path) if name.startswith("Blended-From-"))
+        images = []
+
+        for name in names:
+            with _pil_image_open(_join(proj_path, name)) as image:
+                images.append(_nparray(image))
+            # end with
+        # end for
+
+        return names, images
+
+    def test_count(self):
+        """Tests that a batch blends different pictures and that the first one matches a single blend."""
+        with _TemporaryDirectory() as proj_path:
+            _, single_images = self._blend(proj_path, canvas_backend="memmap")
+        # end with
+
+        with _TemporaryDirectory() as proj_path:
+            names, images = self._blend(proj_path, batch={"count": 3}, canvas_backend="memmap")
+            self.assertEqual([name for name in _listdir(proj_path) if name.endswith(".npy")], [])
+        # end with
+
+        self.assertEqual(len(names), 3)
+
+        for index, name in enumerate(names):
+            self.assertIn(f"-Batch-{index + 1}-", name)
+
+        self.assertTrue(_nparray_equal(single_images[0], images[0]))
+        self.assertFalse(_nparray_equal(images[0], images[1]))
+        self.assertFalse(_nparray_equal(images[1], images[2]))
+
+
+class TestFragLocs(_TestCase):
+    """Tests for the save_frag_locations and frag_locations_data_format config items."""
+
+    def _blend(self, proj_path, data_format):
+        """Returns blender, text, data_text."""
+        _make_proj(proj_path, save_frag_locations=True, frag_locations_data_format=data_format)
+        blender = _prep_blender(proj_path)
+        blender.blend()
+        names = _listdir(proj_path)
+        text_name = [name for name in names if name.startswith("Frag-Locations-From-") and name.endswith(".txt")][0]
+        data_name = [name for name in names if name.endswith(f".{data_format}")][0]
+
+        with open(_join(proj_path, text_name), "r") as text_file:
+            text = text_file.read()
+
+        with open(_join(proj_path, data_name), "r", encoding="utf-8", newline="") as data_file:
+            data_text = data_file.read()
+
+        return blender, text, data_text
+
+    def _check_rows(self, blender, rows):
+        c = blender._context
+        self.assertEqual(len(rows), c.x_frag_count * c.y_frag_count)
+
+        for row_index, row in enumerate(rows):
+            x, y, index, image, flip, rotation = row
+            self.assertEqual((y, x), divmod(row_index, c.x_frag_count))
+            self.assertEqual(index, c.index_matrix[y, x])
+            self.assertEqual(image, c.frag_locs[index])
+            self.assertEqual(flip, _flip_str(c.flip_matrix[y, x]))
+            self.assertEqual(rotation, 180 if c.rot_matrix[y, x] & _rot_180 else 0)
+        # end for
+
+    def test_text(self):
+        """Tests that the text file has a block for each fragment, column by column."""
+        with _TemporaryDirectory() as proj_path:
+            blender, text, _ = self._blend(proj_path, "csv")
+        # end with
+
+        c = blender._context
+        expected_text = ""
+
+        for ix in range(c.x_frag_count):
+            for iy in range(c.y_frag_count):
+                expected_text += blender._make_frag_loc_block(ix, iy)
+        # end for
+
+        self.assertEqual(text, expected_text)
+        self.assertTrue(text.startswith("- Fragment\n\n(X, Y): (0, 0)\n"))
+
+    def test_csv(self):
+        """Tests the CSV data file."""
+        with _TemporaryDirectory() as proj_path:
+            blender, _, data_text = self._blend(proj_path, "csv")
+        # end with
+
+        rows = list(_csv_reader(data_text.splitlines()))
+        self.assertEqual(rows[0], ["x", "y", "index", "image", "flip", "rotation"])
+        rows = [[int(row[0]), int(row[1]), int(row[2]), row[3], row[4], int(row[5])] for row in rows[1:]]
+        self._check_rows(blender, rows)
+
+    def test_jsonl(self):
+        """Tests the JSON Lines data file."""
+        with _TemporaryDirectory() as proj_path:
+            blender, _, data_text = self._blend(proj_path, "jsonl")
+        # end with
+
+        keys = ["x", "y", "index", "image", "flip", "rotation"]
+        rows = [[_loads_json(line)[key] for key in keys] for line in data_text.splitlines()]
+        self._check_rows(blender, rows)
+
+    def test_npz(self):
+        """Tests that the .npz data file loads as the layout of the blended picture."""
+        with _TemporaryDirectory() as proj_path:
+            _make_proj(proj_path, save_frag_locations=False, frag_locations_data_format="npz")
+            blender = _prep_blender(proj_path)
+            blender.blend()
+            names = _listdir(proj_path)
+            self.assertEqual([name for name in names if name.endswith(".txt") and "Frag-Locations" in name], [])
+            npz_name = [name for name in names if name.endswith(".npz")][0]
+            layout = _load_layout_npz(_join(proj_path, npz_name))
+        # end with
+
+        c = blender._context
+        locs_matrix = _nparray(layout.frag_locs)[layout.index_matrix]
+        self.assertTrue(_nparray_equal(locs_matrix, _nparray(c.frag_locs)[c.index_matrix]))
+        self.assertTrue(_nparray_equal(layout.flip_matrix, c.flip_matrix))
+        self.assertTrue(_nparray_equal(layout.rot_matrix, c.rot_matrix))
+
+
+class TestRender(_TestCase):
+    """Tests for rendering a given layout."""
+
+    def _blend(self, proj_path, layout=None, **config_items):
+        """Returns blender, image."""
+        _make_proj(proj_path, **config_items)
+        blender = _Blender(_default_frags_path, proj_path, [], 0)
+        blender.layout = layout
+        blender.prep()
+        blender.blend()
+        blended_name = [name for name in _listdir(proj_path) if name.startswith("Blended-From-")][0]
+
+        with _pil_image_open(_join(proj_path, blended_name)) as image:
+            image = _nparray(image)
+
+        return blender, image
+
+    def test_same_res(self):
+        """Tests that rendering the saved layouts at the same resolution matches the blended picture."""
+        config_items = {"random_frags": True, "random_flipping": True, "random_rotating": True}
+
+        with _TemporaryDirectory() as proj_path:
+            blender, image = self._blend(proj_path, frag_locations_data_format="csv", **config_items)
+            csv_name = [name for name in _listdir(proj_path) if name.endswith(".csv")][0]
+            layout = _load_layout(_join(proj_path, csv_name))
+        # end with
+
+        with _TemporaryDirectory() as proj_path:
+            render_blender, render_image = self._blend(proj_path, layout, manual_seed=1, **config_items)
+        # end with
+
+        self.assertTrue(_nparray_equal(image, render_image))
+        c = blender._context
+        render_c = render_blender._context
+        locs_matrix = _nparray(c.frag_locs)[c.index_matrix]
+        render_locs_matrix = _nparray(render_c.frag_locs)[render_c.index_matrix]
+        self.assertTrue(_nparray_equal(locs_matrix, render_locs_matrix))
+
+    def test_text_rotation(self):
+        """Tests that rendering the saved .txt layout at the same resolution matches the rotated blended picture."""
+        config_items = {"random_frags": True, "random_flipping": True, "random_rotating": True}
+
+        with _TemporaryDirectory() as proj_path:
+            blender, image = self._blend(proj_path, save_frag_locations=True, **config_items)
+            text_name = [name for name in _listdir(proj_path) if name.endswith(".txt")][0]
+            layout = _load_layout(_join(proj_path, text_name))
+        # end with
+
+        with _TemporaryDirectory() as proj_path:
+            _, render_image = self._blend(proj_path, layout, manual_seed=1, **config_items)
+        # end with
+
+        c = blender._context
+        self.assertTrue(c.rot_matrix.any())
+        self.assertTrue(_nparray_equal(image, render_image))
+
+    def test_other_res(self):
+        """Tests rendering a layout at another resolution and grid size."""
+        with _TemporaryDirectory() as proj_path:
+            blender, _ = self._blend(proj_path, random_frags=True, frag_locations_data_format="npz")
+            npz_name = [name for name in _listdir(proj_path) if name.endswith(".npz")][0]
+            layout = _load_layout(_join(proj_path, npz_name))
+        # end with
+
+        with _TemporaryDirectory() as proj_path:
+            frag_res_overrides = {"apply": False, "x_resolution": 32, "y_resolution": 32}
+
+            render_blender, render_image = self._blend(
+                proj_path, layout, frag_resolution=32, frag_resolution_overrides=frag_res_overrides, x_frag_count=2,
+                y_frag_count=2, batch={"count": 2}
+            )
+        # end with
+
+        c = blender._context
+        render_c = render_blender._context
+        self.assertEqual((render_c.x_frag_count, render_c.y_frag_count), (c.x_frag_count, c.y_frag_count))
+        self.assertEqual(render_c.batch_count, 1)
+        self.assertEqual(render_image.shape, (render_c.canvas_height, render_c.canvas_width, 3))
+        self.assertEqual((render_c.frag_width, render_c.frag_height), (32, 32))
+        self.assertLess(render_c.canvas_height, c.canvas_height)
+
+    def test_small_layout(self):
+        """Tests that rendering a layout smaller than 2 x 2 fails before the blending."""
+        layout = _Layout([_join(_default_frags_path, "1-Black.jpg")], [[0], [0]], [[0], [0]], [[0], [0]])
+
+        with _TemporaryDirectory() as proj_path:
+            with self.assertRaisesRegex(ValueError, "1 x 2 fragment grid"):
+                self._blend(proj_path, layout)
+        # end with
+
+
+class TestPreview(_TestCase):
+    """Tests for the preview config item."""
+
+    def _blend(self, proj_path, preview_continue):
+        """Returns blender, names."""
+        preview = {"enabled": True, "resolution": 8, "continue": preview_continue}
+        _make_proj(proj_path, random_frags=True, frag_locations_data_format="npz", preview=preview)
+        blender = _prep_blender(proj_path)
+        blender.blend()
+        names = sorted(_listdir(proj_path))
+        return blender, names
+
+    def test_continue(self):
+        """Tests blending a preview and then the full resolution picture."""
+        with _TemporaryDirectory() as proj_path:
+            blender, names = self._blend(proj_path, True)
+            blended_names = [name for name in names if name.startswith("Blended-From-")]
+            preview_name = [name for name in blended_names if "-Preview-" in name][0]
+            full_name = [name for name in blended_names if "-Preview-" not in name][0]
+
+            with _pil_image_open(_join(proj_path, preview_name)) as image:
+                preview_size = image.size
+
+            with _pil_image_open(_join(proj_path, full_name)) as image:
+                full_size = image.size
+        # end with
+
+        c = blender._context
+        self.assertEqual(len(blended_names), 2)
+        self.assertEqual(full_size, (c.canvas_width, c.canvas_height))
+        self.assertLess(preview_size[0], full_size[0])
+        self.assertLess(preview_size[1], full_size[1])
+
+    def test_match_render(self):
+        """Tests that the preview matches rendering its layout at the preview resolution with draft decoding."""
+        with _TemporaryDirectory() as proj_path:
+            _, names = self._blend(proj_path, False)
+            preview_name = [name for name in names if name.startswith("Blended-From-")][0]
+            npz_name = [name for name in names if name.endswith(".npz")][0]
+            layout = _load_layout(_join(proj_path, npz_name))
+
+            with _pil_image_open(_join(proj_path, preview_name)) as image:
+                preview_image = _nparray(image)
+        # end with
+
+        with _TemporaryDirectory() as proj_path:
+            frag_res_overrides = {"apply": False, "x_resolution": 8, "y_resolution": 8}
+
+            _make_proj(
+                proj_path, frag_resolution=8, frag_resolution_overrides=frag_res_overrides, draft_decoding=True
+            )
+
+            blender = _Blender(_default_frags_path, proj_path, [], 0)
+            blender.layout = layout
+            blender.prep()
+            blender.blend()
+            blended_name = [name for name in _listdir(proj_path) if name.startswith("Blended-From-")][0]
+
+            with _pil_image_open(_join(proj_path, blended_name)) as image:
+                render_image = _nparray(image)
+        # end with
+
+        self.assertTrue(_nparray_equal(preview_image, render_image))
+
+    def test_preview_only(self):
+        """Tests that the layout saved with a preview renders as the picture blended without a preview."""
+        with _TemporaryDirectory() as proj_path:
+            _, names = self._blend(proj_path, False)
+            blended_names = [name for name in names if name.startswith("Blended-From-")]
+            npz_name = [name for name in names if name.endswith(".npz")][0]
+            layout = _load_layout(_join(proj_path, npz_name))
+        # end with
+
+        self.assertEqual(len(blended_names), 1)
+        self.assertIn("-Preview-", blended_names[0])
+        images = []
+
+        for layout_ in [layout, None]:
+            with _TemporaryDirectory() as proj_path:
+                _make_proj(proj_path, random_frags=True)
+                blender = _Blender(_default_frags_path, proj_path, [], 0)
+                blender.layout = layout_
+                blender.prep()
+                blender.blend()
+                blended_name = [name for name in _listdir(proj_path) if name.startswith("Blended-From-")][0]
+
+                with _pil_image_open(_join(proj_path, blended_name)) as image:
+                    images.append(_nparray(image))
+            # end with
+        # end for
+
+        self.assertTrue(_nparray_equal(images[0], images[1]))
+
+
+class TestTimeStages(_TestCase):
+    """Tests for the time_stages method."""
+
+    def test_norm(self):
+        """Tests that each stage is timed once in order and that the timed blend is saved."""
+        calls = []
+
+        def time_stage(name, func, call_count):
+            calls.append((name, call_count))
+            func()
+            return call_count
+
+        with _TemporaryDirectory() as proj_path:
+            _make_proj(proj_path, random_frags=True)
+            blender = _Blender(_default_frags_path, proj_path, [], 0)
+            result = blender.time_stages(time_stage)
+            blended_names = [name for name in _listdir(proj_path) if name.startswith("Blended-From-")]
+        # end with
+
+        c = blender._context
+        self.assertEqual([name for name, _ in calls], blenders.timed_stage_names)
+        self.assertEqual(result["timings"]["_blend_block"], 6 * 4)
+        self.assertEqual(result["frag_count"], c.frag_count)
+        self.assertEqual((result["canvas_width"], result["canvas_height"]), (c.canvas_width, c.canvas_height))
+        self.assertEqual(len(blended_names), 1)
+
+
+class TestCanvasLayout(_TestCase):
+    """Tests for the canvas and fragments grid layouts."""
+
+    def test_uint8_hwc(self):
+        """Tests that the canvas and fragments grid are uint8 arrays with the [y, x, c] subscripts."""
+        with _TemporaryDirectory() as proj_path:
+            _make_proj(proj_path)
+            blender = _prep_blender(proj_path)
+            c = blender._context
+            self.assertEqual(c.canvas.shape, (c.canvas_height, c.canvas_width, 3))
+            self.assertEqual(c.canvas.dtype, _npubyte)
+            self.assertEqual(c.frags_grid.shape, (c.frags_grid_height, c.frags_grid_width, 3))
+            self.assertEqual(c.frags_grid.dtype, _npubyte)
+            self.assertEqual(c.bms.shape, (4, c.bm_height, c.bm_width, 1))
+        # end with
+
+
+class TestStreaming(_TestCase):
+    """Tests for the streaming config item."""
+
+    def _blend_in_memory(self):
+        with _TemporaryDirectory() as proj_path:
+            _make_proj(proj_path)
+            blender = _prep_blender(proj_path)
+            blender._blend_blocks()
+            canvas = blender._context.canvas
+        # end with
+
+        return canvas
+
+    def _test_format(self, stream_format, workers):
+        canvas = self._blend_in_memory()
+
+        with _TemporaryDirectory() as proj_path:
+            _make_proj(proj_path, workers=workers, streaming={"enabled": True, "format": stream_format})
+            blender = _prep_blender(proj_path)
+            c = blender._context
+            self.assertEqual(c.canvas_block_rows, min(workers, c.y_frag_count - 1))
+            blender._blend_blocks()
+            blender._save_blended_blocks()
+
+            names = [name for name in _listdir(proj_path) if name.endswith(f".{stream_format}")]
+            self.assertEqual(len(names), 1)
+
+            with _pil_image_open(_join(proj_path, names[0])) as image:
+                streamed = _nparray(image)
+            # end with
+        # end with
+
+        self.assertTrue(_nparray_equal(canvas, streamed))
+
+    def test_png(self):
+        """Tests streaming a PNG output."""
+        self._test_format("png", 1)
+
+    def test_ppm(self):
+        """Tests streaming a PPM output with multiple workers."""
+        self._test_format("ppm", 3)
+
+
+class TestPipeline(_TestCase):
+    """Tests for the pipeline config item."""
+
+    def _blend(self, proj_path, **config_items):
+        """Returns images, log_text."""
+        _make_proj(proj_path, random_frags=True, **config_items)
+        logs = []
+        blender = _Blender(_default_frags_path, proj_path, [_ListLog(logs)], 1)
+        blender.prep()
+        blender.blend()
+        names = sorted(name for name in _listdir(proj_path) if name.startswith(("Blended-From-", "Frags-From-")))
+        images = []
+
+        for name in names:
+            with _pil_image_open(_join(proj_path, name)) as image:
+                images.append(_nparray(image))
+            # end with
+        # end for
+
+        log_text = "".join(logs)
+        return images, log_text
+
+    def _test_match(self, **config_items):
+        with _TemporaryDirectory() as proj_path:
+            images, _ = self._blend(proj_path, **config_items)
+        # end with
+
+        pipeline = {"enabled": True, "loaders": 3, "prefetch_rows": 1}
+
+        with _TemporaryDirectory() as proj_path:
+            pipeline_images, log_text = self._blend(proj_path, pipeline=pipeline, **config_items)
+        # end with
+
+        self.assertEqual(len(images), 2)
+        self.assertEqual(len(pipeline_images), 2)
+
+        for image, pipeline_image in zip(images, pipeline_images):
+            self.assertTrue(_nparray_equal(image, pipeline_image))
+
+        self.assertIn("Pipeline stages:", log_text)
+        self.assertIn("  Load:  Items: ", log_text)
+        self.assertIn("  Encode:  Items: ", log_text)
+
+    def test_in_memory(self):
+        """Tests that the pipelined results match the results without the pipeline."""
+        self._test_match(workers=2)
+
+    def test_streamed(self):
+        """Tests that the pipelined streamed results match the streamed results without the pipeline."""
+        self._test_match(workers=1, streaming={"enabled": True, "format": "png"})
+
+
+class TestFragPrefetch(_TestCase):
+    """Tests for the frag_prefetch config item."""
+
+    def _test_match(self, **config_items):
+        blend = TestPipeline._blend
+
+        with _TemporaryDirectory() as proj_path:
+            images, _ = blend(self, proj_path, **config_items)
+        # end with
+
+        frag_prefetch = {"enabled": True, "rows_ahead": 1}
+
+        with _TemporaryDirectory() as proj_path:
+            prefetch_images, log_text = blend(self, proj_path, frag_prefetch=frag_prefetch, **config_items)
+        # end with
+
+        self.assertEqual(len(images), 2)
+        self.assertEqual(len(prefetch_images), 2)
+
+        for image, prefetch_image in zip(images, prefetch_images):
+            self.assertTrue(_nparray_equal(image, prefetch_image))
+
+        self.assertIn("Fragment prefetch:  Steps: ", log_text)
+
+    def test_in_memory(self):
+        """Tests that the prefetched results match the results without the prefetch."""
+        self._test_match(workers=2)
+
+    def test_streamed_pipeline(self):
+        """Tests that the prefetched streamed and pipelined results match the results without the prefetch."""
+        pipeline = {"enabled": True, "loaders": 2, "prefetch_rows": 1}
+        self._test_match(workers=1, streaming={"enabled": True, "format": "png"}, pipeline=pipeline)
+
+    def test_peak_frags(self):
+        """Tests that the held frags are bounded by the distinct frags of the rows in the window."""
+        rows_ahead = 1
+
+        with _TemporaryDirectory() as proj_path:
+            frag_prefetch = {"enabled": True, "rows_ahead": rows_ahead}
+            _make_proj(proj_path, random_frags=True, workers=1, frag_prefetch=frag_prefetch)
+            blender = _Blender(_default_frags_path, proj_path, [], 0)
+            blender.prep()
+            c = blender._context
+            c.save_frags_grid = False
+            blender._prep_batch_blend(0)
+            blender._start_frag_prefetch()
+            cache = c.planned_frag_cache
+
+            try:
+                blender._blend_blocks()
+            finally:
+                blender._stop_frag_prefetch()
+            # end try
+        # end with
+
+        # The window has rows_ahead + 1 block rows, which use rows_ahead + 2 frag rows
+        window_frag_rows = rows_ahead + 2
+        max_count = max(
+            len(_npunique(c.index_matrix[y: y + window_frag_rows]))
+            for y in range(c.y_frag_count - window_frag_rows + 1)
+        )
+
+        self.assertLessEqual(cache.peak_count, max_count)
+        self.assertEqual(cache.miss_count + cache.load_count, cache.evict_count)
+
+
+class TestMetrics(_TestCase):
+    """Tests for the phase metrics and the save_metrics config item."""
+
+    def test_save(self):
+        """Tests that the log and the metrics file have the metrics of each phase of each batch blend."""
+        pipeline = {"enabled": True, "loaders": 2, "prefetch_rows": 1}
+
+        with _TemporaryDirectory() as proj_path:
+            _make_proj(proj_path, save_metrics=True, batch={"count": 2}, pipeline=pipeline)
+            logs = []
+            blender = _Blender(_default_frags_path, proj_path, [_ListLog(logs)], 1)
+            blender.prep()
+            blender.blend()
+            metrics_names = [name for name in _listdir(proj_path) if name.startswith("Metrics-From-test_frags-")]
+            self.assertEqual(len(metrics_names), 1)
+
+            with open(_join(proj_path, metrics_names[0]), "r") as metrics_file:
+                metrics_dict = _loads_json(metrics_file.read())
+            # end with
+        # end with
+
+        log_text = "".join(logs)
+        self.assertIn("Phase _blend_blocks:  Wall: ", log_text)
+        self.assertIn("Phase totals:  Wall: ", log_text)
+
+        phases = metrics_dict["phases"]
+        prep_names = [phase["name"] for phase in phases if "batch_index" not in phase]
+        self.assertEqual(prep_names[:2], ["_read_config", "_prep_frags"])
+        self.assertIn("_prep_matrices", prep_names)
+        self.assertIn("_prep_canvas", prep_names)
+
+        c = blender._context
+        save_names = ["_save_blended_blocks", "_save_frags_grid", "_save_frag_locs"]
+
+        for batch_index in range(2):
+            batch_phases = {phase["name"]: phase for phase in phases if phase.get("batch_index") == batch_index}
+            self.assertEqual(sorted(batch_phases), sorted(["_blend_blocks", "_render_frags_grid"] + save_names))
+            blend_phase = batch_phases["_blend_blocks"]
+            self.assertEqual(blend_phase["counts"]["blocks"], (c.x_frag_count - 1) * (c.y_frag_count - 1))
+            self.assertIn("megapixels_per_sec", blend_phase["rates"])
+            self.assertGreaterEqual(blend_phase["cpu_secs"], 0)
+            self.assertFalse(blend_phase["overlapped"])
+            self.assertTrue(batch_phases["_save_blended_blocks"]["overlapped"])
+            self.assertTrue(batch_phases["_save_frags_grid"]["overlapped"])
+            self.assertFalse(batch_phases["_save_frag_locs"]["overlapped"])
+        # end for
+
+        for phase in phases:
+            if phase["peak_rss_bytes"] is not None:
+                self.assertGreaterEqual(phase["peak_rss_bytes"], phase["start_rss_bytes"])
+                self.assertGreaterEqual(phase["peak_rss_bytes"], phase["end_rss_bytes"])
+            # end if
+        # end for
+
+        start_secs = min(phase["start_secs"] for phase in phases)
+        end_secs = max(phase["start_secs"] + phase["wall_secs"] for phase in phases)
+        self.assertAlmostEqual(metrics_dict["totals"]["wall_secs"], end_secs - start_secs)
+
+    def test_rss_sampling(self):
+        """Tests that the peak RSS of a phase covers the memory that the phase allocates and frees."""
+        phase_metrics = _PhaseMetrics()
+        alloc_size = 256 * 1024 * 1024
+
+        def alloc():
+            array = _npzeros(alloc_size, dtype=_npubyte)
+            array[::4096] = 1
+            _sleep(4 * metrics.rss_sample_secs)
+            del array
+
+        if metrics.find_rss() is None:
+            self.skipTest("The current RSS is unknown on this platform")
+
+        _, record = phase_metrics.run("alloc", alloc)
+        self.assertGreaterEqual(record["peak_rss_bytes"] - record["start_rss_bytes"], alloc_size // 2)
+        self.assertLess(record["end_rss_bytes"] - record["start_rss_bytes"], alloc_size // 2)
+
+    def test_peak_rss_fallback(self):
+        """Tests that the RSS items fall back to the peak RSS of the process where the current RSS is unknown."""
+        if metrics.find_peak_rss() is None:
+            self.skipTest("The peak RSS is unknown on this platform")
+
+        find_rss = metrics.find_rss
+
+        try:
+            metrics.find_rss = lambda: None
+            _, record = _PhaseMetrics().run("alloc", _npzeros, 1024)
+        finally:
+            metrics.find_rss = find_rss
+        # end try
+
+        self.assertIsNotNone(record["start_rss_bytes"])
+        self.assertGreaterEqual(record["end_rss_bytes"], record["start_rss_bytes"])
+        self.assertEqual(record["peak_rss_bytes"], record["end_rss_bytes"])
+
+
+class TestProgress(_TestCase):
+    """Tests for the progress config item."""
+
+    def test_events(self):
+        """Tests the progress lines and the progress events of each task."""
+        progress = {"interval_seconds": 0, "events_path": "Events.jsonl"}
+
+        with _TemporaryDirectory() as proj_path:
+            _make_proj(proj_path, save_frag_locations=True, progress=progress)
+            logs = []
+            blender = _Blender(_default_frags_path, proj_path, [_ListLog(logs)], 1)
+            blender.prep()
+            blender.blend()
+
+            with open(_join(proj_path, "Events.jsonl"), "r") as events_file:
+                records = [_loads_json(line) for line in events_file]
+            # end with
+        # end with
+
+        c = blender._context
+        block_total = (c.x_frag_count - 1) * (c.y_frag_count - 1)
+        log_text = "".join(logs)
+        self.assertIn(f"Blended blocks: {block_total} / {block_total} (100.0%)  Rate: ", log_text)
+        self.assertIn("Rendered fragments grid blocks: ", log_text)
+        self.assertIn("Saved fragment locations blocks: ", log_text)
+
+        for task in ["blend_blocks", "render_frags_grid", "save_frag_locs"]:
+            task_events = [record["event"] for record in records if record.get("task") == task]
+            self.assertEqual(task_events[0], "start")
+            self.assertEqual(task_events[-1], "end")
+            self.assertIn("progress", task_events)
+        # end for
+
+        blend_records = [record for record in records if record.get("task") == "blend_blocks"]
+        self.assertEqual(blend_records[-2]["done"], block_total)
+        self.assertIn("_blend_blocks", [record["phase"]["name"] for record in records if record["event"] == "phase"])
+        self.assertEqual(records[-1]["event"], "completed")
+
+
+class TestCanvasBackend(_TestCase):
+    """Tests for the canvas_backend config item."""
+
+    def test_memmap(self):
+        """Tests that the memmap backend matches the memory backend and cleans up its scratch files."""
+        with _TemporaryDirectory() as proj_path:
+            _make_proj(proj_path)
+            blender = _prep_blender(proj_path)
+            blender._blend_blocks()
+            blender._render_frags_grid()
+            c = blender._context
+            canvas = c.canvas.copy()
+            frags_grid = c.frags_grid.copy()
+            self.assertIsNone(c.canvas_scratch_loc)
+        # end with
+
+        with _TemporaryDirectory() as proj_path:
+            _make_proj(proj_path, canvas_backend="memmap", scratch_path="scratch")
+            blender = _prep_blender(proj_path)
+            c = blender._context
+            canvas_scratch_loc = c.canvas_scratch_loc
+            frags_grid_scratch_loc = c.frags_grid_scratch_loc
+            self.assertTrue(canvas_scratch_loc.startswith(_join(proj_path, "scratch")))
+            self.assertTrue(_exists(canvas_scratch_loc))
+            self.assertTrue(_exists(frags_grid_scratch_loc))
+            self.assertIsInstance(c.canvas, _npmemmap)
+
+            blender._blend_blocks()
+            blender._render_frags_grid()
+            self.assertTrue(_nparray_equal(canvas, c.canvas))
+            self.assertTrue(_nparray_equal(frags_grid, c.frags_grid))
+
+            blender._save_blended_blocks()
+            blender._save_frags_grid()
+            self.assertFalse(_exists(canvas_scratch_loc))
+            self.assertFalse(_exists(frags_grid_scratch_loc))
+        # end with
+
+    def test_memmap_strips(self):
+        """Tests that the memmap backend saves its images strip by strip, without a full copy in RAM."""
+        with _TemporaryDirectory() as proj_path:
+            _make_proj(proj_path)
+            blender = _prep_blender(proj_path)
+            blender._blend_blocks()
+            blender._render_frags_grid()
+            c = blender._context
+            canvas = c.canvas.copy()
+            frags_grid = c.frags_grid.copy()
+        # end with
+
+        band_heights = []
+        orig_make_writer = blenders._make_writer
+        orig_fromarray = blenders._pil_image_fromarray
+        orig_strip_size = blenders.scratch_strip_size
+
+        def make_writer(format_name, loc, width, height):
+            writer = orig_make_writer(format_name, loc, width, height)
+            orig_write = writer.write
+
+            def write(band):
+                band_heights.append(band.shape[0])
+                orig_write(band)
+
+            writer.write = write
+            return writer
+
+        def fromarray(*args, **kwargs):
+            raise AssertionError("Copied a whole image into RAM")
+
+        with _TemporaryDirectory() as proj_path:
+            _make_proj(proj_path, canvas_backend="memmap")
+
+            try:
+                blenders._make_writer = make_writer
+                blenders._pil_image_fromarray = fromarray
+                blenders.scratch_strip_size = canvas.shape[1] * 3 * 5
+                blender = _prep_blender(proj_path)
+                blender._blend_blocks()
+                blender._render_frags_grid()
+                blender._save_blended_blocks()
+                blender._save_frags_grid()
+            finally:
+                blenders._make_writer = orig_make_writer
+                blenders._pil_image_fromarray = orig_fromarray
+                blenders.scratch_strip_size = orig_strip_size
+            # end try
+
+            self.assertGreater(len(band_heights), 2)
+            self.assertLessEqual(max(band_heights), 5)
+
+            names = _listdir(proj_path)
+            blended_name = [name for name in names if name.startswith("Blended-From-")][0]
+            frags_grid_name = [name for name in names if name.startswith("Frags-From-")][0]
+            self.assertTrue(blended_name.endswith(".png"))
+
+            with _pil_image_open(_join(proj_path, blended_name)) as image:
+                self.assertTrue(_nparray_equal(_nparray(image), canvas))
+
+            with _pil_image_open(_join(proj_path, frags_grid_name)) as image:
+                self.assertTrue(_nparray_equal(_nparray(image), frags_grid))
+        # end with
+
+
+def main():
+    """Runs this module as an executable."""
+    unittest.main(verbosity=1)
+
+
+if __name__ == "__main__":
+    main()
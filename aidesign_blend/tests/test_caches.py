@@ -0,0 +1,246 @@
+"""Executable that tests the caches module."""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import numpy
+import os
+import pathlib
+import tempfile
+import unittest
+
+from os import path as ospath
+from PIL import Image as pil_image
+
+from aidesign_blend.libs import caches
+
+_default_rng = numpy.random.default_rng
+_FragCache = caches.FragCache
+_FragStore = caches.FragStore
+_join = ospath.join
+_listdir = os.listdir
+_load_frag = caches.load_frag
+_nparray_equal = numpy.array_equal
+_npcos = numpy.cos
+_npdouble = numpy.double
+_nplog10 = numpy.log10
+_npmgrid = numpy.mgrid
+_npsin = numpy.sin
+_npstack = numpy.stack
+_npubyte = numpy.ubyte
+_Path = pathlib.Path
+_pil_image_fromarray = pil_image.fromarray
+_PlannedFragCache = caches.PlannedFragCache
+_TemporaryDirectory = tempfile.TemporaryDirectory
+_TestCase = unittest.TestCase
+_utime = os.utime
+
+_tests_path = str(_Path(__file__).parent)
+_repo_path = str(_Path(_tests_path).parent.parent)
+_default_frags_path = _join(_repo_path, "aidesign_blend_default_configs", "test_data", "test_frags")
+_frag_loc1 = _join(_default_frags_path, "1-Black.jpg")
+_frag_loc2 = _join(_default_frags_path, "2-Red.jpg")
+_frag_loc3 = _join(_default_frags_path, "3-Green.jpg")
+
+
+def _make_large_jpeg(loc):
+    """Makes a 2000 x 1500 JPEG image with smooth stripes and some noise."""
+    y_grid, x_grid = _npmgrid[0: 1500, 0: 2000]
+    red = (_npsin(x_grid / 37) + 1) * 100 + (y_grid / 30) % 40
+    green = (_npcos(y_grid / 53) + 1) * 100
+    blue = ((x_grid + y_grid) / 28) % 255
+    image_np = _npstack([red, green, blue], axis=-1)
+    image_np += _default_rng(0).normal(0, 8, image_np.shape)
+    image_np = image_np.clip(0, 255).astype(_npubyte)
+    _pil_image_fromarray(image_np, "RGB").save(loc, quality=92)
+
+
+def _find_psnr(frag1, frag2):
+    mse = ((frag1.astype(_npdouble) - frag2.astype(_npdouble)) ** 2).mean()
+    result = 10 * _nplog10(255 ** 2 / mse)
+    return result
+
+
+class TestFragCache(_TestCase):
+    """Tests for the FragCache class."""
+
+    def test_load_frag(self):
+        """Tests loading a frag."""
+        frag = _load_frag(_frag_loc1, 12, 8)
+        self.assertEqual(frag.shape, (8, 12, 3))
+        self.assertEqual(str(frag.dtype), "uint8")
+
+    def test_draft_quality(self):
+        """Tests that draft decoding matches full decoding within a PSNR of 40 dB."""
+        with _TemporaryDirectory() as temp_path:
+            loc = _join(temp_path, "Large.jpg")
+            _make_large_jpeg(loc)
+
+            for width, height in [(256, 192), (64, 48), (250, 500)]:
+                frag = _load_frag(loc, width, height)
+                draft_frag = _load_frag(loc, width, height, draft=True)
+                self.assertEqual(draft_frag.shape, frag.shape)
+                self.assertGreater(_find_psnr(frag, draft_frag), 40)
+            # end for
+        # end with
+
+    def test_draft_non_jpeg(self):
+        """Tests that draft decoding does not change the non-JPEG images."""
+        with _TemporaryDirectory() as temp_path:
+            loc = _join(temp_path, "Large.png")
+            _pil_image_fromarray(_load_frag(_frag_loc2, 400, 300), "RGB").save(loc)
+            self.assertTrue(_nparray_equal(_load_frag(loc, 40, 30), _load_frag(loc, 40, 30, draft=True)))
+        # end with
+
+    def test_hit(self):
+        """Tests getting the same frag twice."""
+        cache = _FragCache(1024 * 1024)
+        frag1 = cache.get(_frag_loc1, 12, 8)
+        frag2 = cache.get(_frag_loc1, 12, 8)
+        self.assertIs(frag1, frag2)
+        self.assertEqual(cache.hit_count, 1)
+        self.assertEqual(cache.miss_count, 1)
+        self.assertFalse(frag1.flags.writeable)
+
+    def test_size_in_key(self):
+        """Tests getting the same frag at different sizes."""
+        cache = _FragCache(1024 * 1024)
+        cache.get(_frag_loc1, 12, 8)
+        cache.get(_frag_loc1, 8, 12)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.miss_count, 2)
+
+    def test_lru_eviction(self):
+        """Tests evicting the least recently used frags."""
+        frag_bytes = 12 * 8 * 3
+        cache = _FragCache(2 * frag_bytes)
+        cache.get(_frag_loc1, 12, 8)
+        cache.get(_frag_loc2, 12, 8)
+        cache.get(_frag_loc1, 12, 8)
+        cache.get(_frag_loc3, 12, 8)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.held_bytes, 2 * frag_bytes)
+        self.assertEqual(cache.evict_count, 1)
+
+        cache.get(_frag_loc1, 12, 8)
+        self.assertEqual(cache.hit_count, 2)
+        cache.get(_frag_loc2, 12, 8)
+        self.assertEqual(cache.miss_count, 4)
+
+    def test_zero_budget(self):
+        """Tests a cache with a zero byte budget."""
+        cache = _FragCache(0)
+        cache.get(_frag_loc1, 12, 8)
+        cache.get(_frag_loc1, 12, 8)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.miss_count, 2)
+
+
+class TestPlannedFragCache(_TestCase):
+    """Tests for the PlannedFragCache class."""
+
+    def test_last_use_eviction(self):
+        """Tests loading each frag once per window and evicting the frags after their last use in the window."""
+        calls = []
+
+        def loader(loc, width, height):
+            calls.append(loc)
+            return _load_frag(loc, width, height)
+
+        frag_locs = [_frag_loc1, _frag_loc2, _frag_loc3]
+        steps = [[0, 1], [1, 2], [0]]
+
+        with _PlannedFragCache(frag_locs, 12, 8, steps, 0, loader) as cache:
+            for step_index, step in enumerate(steps):
+                for index in step:
+                    frag = cache.get(frag_locs[index], 12, 8)
+                    self.assertTrue(_nparray_equal(frag, _load_frag(frag_locs[index], 12, 8)))
+                    self.assertFalse(frag.flags.writeable)
+                # end for
+
+                cache.finish_step(step_index)
+            # end for
+
+            # Frag 1 is kept for step 1; Frag 0 is evicted after step 0, since step 2 is out of the window
+            self.assertEqual(sorted(calls), sorted([_frag_loc1, _frag_loc2, _frag_loc3, _frag_loc1]))
+            self.assertEqual(cache.load_count + cache.miss_count, 4)
+            self.assertEqual(cache.evict_count, 4)
+            self.assertEqual(cache.held_bytes, 0)
+            self.assertLessEqual(cache.peak_count, 2)
+        # end with
+
+
+class TestFragStore(_TestCase):
+    """Tests for the FragStore class."""
+
+    def test_put_get(self):
+        """Tests putting a frag and getting it back."""
+        frag = _load_frag(_frag_loc2, 12, 8)
+
+        with _TemporaryDirectory() as store_path:
+            store = _FragStore(store_path, 1024 * 1024)
+            self.assertIsNone(store.get("hash1", 12, 8))
+            store.put("hash1", 12, 8, frag)
+            self.assertTrue(_nparray_equal(store.get("hash1", 12, 8), frag))
+            self.assertIsNone(store.get("hash1", 8, 12))
+            self.assertEqual(store.hit_count, 1)
+            self.assertEqual(store.miss_count, 2)
+            self.assertEqual(store.find_usage()[0], 1)
+        # end with
+
+    def test_damaged(self):
+        """Tests getting a damaged file."""
+        with _TemporaryDirectory() as store_path:
+            store = _FragStore(store_path, 1024 * 1024)
+
+            with open(store.find_loc("hash1", 12, 8), "w") as file:
+                file.write("Damaged")
+
+            self.assertIsNone(store.get("hash1", 12, 8))
+            self.assertEqual(_listdir(store_path), [])
+        # end with
+
+    def test_prune(self):
+        """Tests pruning the least recently used files."""
+        frag = _load_frag(_frag_loc1, 12, 8)
+
+        with _TemporaryDirectory() as store_path:
+            store = _FragStore(store_path, 0)
+
+            for index, content_hash in enumerate(["hash1", "hash2", "hash3"]):
+                store.put(content_hash, 12, 8, frag)
+                _utime(store.find_loc(content_hash, 12, 8), ns=(index, index))
+            # end for
+
+            file_bytes = store.find_usage()[1] // 3
+            store.max_bytes = 2 * file_bytes
+            self.assertEqual(store.prune(), 1)
+            self.assertIsNone(store.get("hash1", 12, 8))
+            self.assertIsNotNone(store.get("hash2", 12, 8))
+            self.assertEqual(store.clear(), 2)
+            self.assertEqual(store.find_usage(), (0, 0))
+        # end with
+
+    def test_loader(self):
+        """Tests a frag cache with a custom loader."""
+        calls = []
+
+        def loader(loc, width, height):
+            calls.append(loc)
+            return _load_frag(loc, width, height)
+
+        cache = _FragCache(1024 * 1024, loader)
+        cache.get(_frag_loc1, 12, 8)
+        cache.get(_frag_loc1, 12, 8)
+        self.assertEqual(calls, [_frag_loc1])
+
+
+def main():
+    """Runs this module as an executable."""
+    unittest.main(verbosity=1)
+
+
+if __name__ == "__main__":
+    main()
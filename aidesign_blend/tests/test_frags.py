@@ -0,0 +1,200 @@
+"""Executable that tests the frags module."""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import os
+import pathlib
+import tempfile
+import threading
+import unittest
+
+from os import path as ospath
+from PIL import Image as pil_image
+
+from aidesign_blend.libs import frags
+
+_basename = ospath.basename
+_discover_frags = frags.discover_frags
+_exists = ospath.exists
+_find_index_loc = frags.find_index_loc
+_FragIndex = frags.FragIndex
+_hash_file = frags.hash_file
+_join = ospath.join
+_listdir = os.listdir
+_makedirs = os.makedirs
+_Path = pathlib.Path
+_pil_image_new = pil_image.new
+_probe_frags = frags.probe_frags
+_relpath = ospath.relpath
+_remove = os.remove
+_scan_image_locs = frags.scan_image_locs
+_TemporaryDirectory = tempfile.TemporaryDirectory
+_TestCase = unittest.TestCase
+_Thread = threading.Thread
+
+_tests_path = str(_Path(__file__).parent)
+_repo_path = str(_Path(_tests_path).parent.parent)
+_default_frags_path = _join(_repo_path, "aidesign_blend_default_configs", "test_data", "test_frags")
+
+
+def _make_frags_folder(frags_path):
+    _pil_image_new("RGB", (12, 8)).save(_join(frags_path, "1.png"))
+    _pil_image_new("L", (5, 9)).save(_join(frags_path, "2.JPG"))
+    _pil_image_new("RGBA", (3, 4)).save(_join(frags_path, "3.png"))
+
+    with open(_join(frags_path, "4-Fake.png"), "w") as file:
+        file.write("Not an image")
+
+    with open(_join(frags_path, "5-Notes.txt"), "w") as file:
+        file.write("Not an image")
+
+    _makedirs(_join(frags_path, "6-Folder.png"))
+
+
+class TestDiscovery(_TestCase):
+    """Tests for the fragment discovery functions."""
+
+    def test_scan(self):
+        """Tests scanning for the files with image extensions."""
+        with _TemporaryDirectory() as frags_path:
+            _make_frags_folder(frags_path)
+            locs = _scan_image_locs(frags_path)
+        # end with
+
+        names = [_basename(loc) for loc in locs]
+        self.assertEqual(names, ["1.png", "2.JPG", "3.png", "4-Fake.png"])
+
+    def test_discover(self):
+        """Tests discovering the fragments and recording their headers."""
+        with _TemporaryDirectory() as frags_path:
+            _make_frags_folder(frags_path)
+            infos = _discover_frags(frags_path)
+        # end with
+
+        records = [(_basename(info.loc), info.width, info.height, info.mode) for info in infos]
+        self.assertEqual(records, [("1.png", 12, 8, "RGB"), ("2.JPG", 5, 9, "L"), ("3.png", 3, 4, "RGBA")])
+
+    def test_probe_order(self):
+        """Tests that probing with multiple workers keeps the location order."""
+        names = sorted(_listdir(_default_frags_path))
+        locs = [_join(_default_frags_path, name) for name in names] * 5
+        serial_infos = _probe_frags(locs, 1)
+        parallel_infos = _probe_frags(locs, 3)
+        self.assertEqual([info.loc for info in serial_infos], locs)
+        self.assertEqual([info.loc for info in parallel_infos], locs)
+
+
+class TestFragIndex(_TestCase):
+    """Tests for the FragIndex class."""
+
+    def _update(self, index_loc, frags_path):
+        frag_index = _FragIndex(index_loc, frags_path)
+        frag_index.load()
+        infos = frag_index.update(2)
+
+        if frag_index.needs_save():
+            frag_index.save()
+
+        counts = frag_index.reused_count, frag_index.probed_count, frag_index.removed_count
+        return infos, counts
+
+    def test_incremental(self):
+        """Tests updating an index after adding, changing, and removing files."""
+        with _TemporaryDirectory() as frags_path, _TemporaryDirectory() as index_path:
+            _make_frags_folder(frags_path)
+            index_loc = _find_index_loc(index_path, frags_path)
+
+            infos, counts = self._update(index_loc, frags_path)
+            self.assertTrue(_exists(index_loc))
+            self.assertEqual(counts, (0, 4, 0))
+            records = [(info.width, info.height, info.mode) for info in infos]
+            self.assertEqual(records, [(12, 8, "RGB"), (5, 9, "L"), (3, 4, "RGBA")])
+            self.assertEqual(infos[0].content_hash, _hash_file(_join(frags_path, "1.png")))
+
+            infos, counts = self._update(index_loc, frags_path)
+            self.assertEqual(counts, (4, 0, 0))
+            self.assertEqual(len(infos), 3)
+            self.assertEqual(infos[0].content_hash, _hash_file(_join(frags_path, "1.png")))
+
+            _pil_image_new("RGB", (20, 10)).save(_join(frags_path, "1.png"))
+            _pil_image_new("RGB", (7, 7)).save(_join(frags_path, "0.png"))
+            _remove(_join(frags_path, "3.png"))
+
+            infos, counts = self._update(index_loc, frags_path)
+            self.assertEqual(counts, (2, 2, 1))
+            records = [(_basename(info.loc), info.width, info.height) for info in infos]
+            self.assertEqual(records, [("0.png", 7, 7), ("1.png", 20, 10), ("2.JPG", 5, 9)])
+        # end with
+
+    def test_relative_locs(self):
+        """Tests that the fragment locations match discover_frags with a relative fragments path."""
+        with _TemporaryDirectory() as frags_path, _TemporaryDirectory() as index_path:
+            _make_frags_folder(frags_path)
+            rel_frags_path = _relpath(frags_path)
+            index_loc = _find_index_loc(index_path, rel_frags_path)
+            infos, _ = self._update(index_loc, rel_frags_path)
+            self.assertEqual([info.loc for info in infos], [info.loc for info in _discover_frags(rel_frags_path)])
+
+            # The reused entries give the same locations
+            infos, _ = self._update(index_loc, rel_frags_path)
+            self.assertEqual([info.loc for info in infos], [info.loc for info in _discover_frags(rel_frags_path)])
+        # end with
+
+    def test_concurrent_saves(self):
+        """Tests that the concurrent saves of the same index file do not interfere."""
+        with _TemporaryDirectory() as frags_path, _TemporaryDirectory() as index_path:
+            _make_frags_folder(frags_path)
+            index_loc = _find_index_loc(index_path, frags_path)
+            frag_index = _FragIndex(index_loc, frags_path)
+            frag_index.update(2)
+            errors = []
+
+            def save_repeatedly():
+                try:
+                    for _ in range(50):
+                        frag_index.save()
+                except Exception as exception:
+                    errors.append(exception)
+                # end try
+
+            threads = [_Thread(target=save_repeatedly) for _ in range(4)]
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(errors, [])
+            self.assertEqual(_listdir(index_path), [_basename(index_loc)])
+
+            loaded_index = _FragIndex(index_loc, frags_path)
+            loaded_index.load()
+            self.assertEqual(loaded_index.entries, frag_index.entries)
+        # end with
+
+    def test_other_folder(self):
+        """Tests that an index file of another fragments folder is rebuilt."""
+        with _TemporaryDirectory() as frags_path, _TemporaryDirectory() as index_path:
+            _make_frags_folder(frags_path)
+            index_loc = _find_index_loc(index_path, frags_path)
+            self._update(index_loc, frags_path)
+
+            frag_index = _FragIndex(index_loc, _default_frags_path)
+            frag_index.load()
+            frag_index.update()
+            self.assertEqual(frag_index.reused_count, 0)
+            self.assertEqual(frag_index.probed_count, 8)
+        # end with
+
+
+def main():
+    """Runs this module as an executable."""
+    unittest.main(verbosity=1)
+
+
+if __name__ == "__main__":
+    main()
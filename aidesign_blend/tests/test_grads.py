@@ -0,0 +1,94 @@
+"""Executable that tests the grads module."""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import numpy
+import unittest
+
+from aidesign_blend.libs import grads
+
+_GradFunc = grads.GradFunc
+_LU = grads.LU
+_npallclose = numpy.allclose
+_nplinspace = numpy.linspace
+_np_ndarray = numpy.ndarray
+_Poly1V = grads.Poly1V
+_TestCase = unittest.TestCase
+
+_invals = [-1, 0, 1e-6, 0.25, 0.5, 0.75, 1 - 1e-6, 1, 2]
+"""Input values to test. Includes values outside of the input range."""
+
+
+class _TestGradFunc(_TestCase):
+
+    def _test_scalar(self, grad_func, expected_outvals):
+        for inval, expected in zip(_invals, expected_outvals):
+            outval = grad_func(inval)
+            self.assertIsInstance(outval, float)
+            self.assertEqual(outval, expected)
+        # end for
+
+    def _test_array_matches_scalar(self, grad_func):
+        invals = _nplinspace(-0.5, 1.5, 101)
+        outvals = grad_func(invals)
+        self.assertIsInstance(outvals, _np_ndarray)
+        self.assertEqual(outvals.shape, invals.shape)
+        expected = [grad_func(float(inval)) for inval in invals]
+        self.assertTrue(_npallclose(outvals, expected, rtol=1e-12, atol=1e-12))
+
+        invals2d = invals[:100].reshape(10, 10)
+        outvals2d = grad_func(invals2d)
+        self.assertEqual(outvals2d.shape, invals2d.shape)
+        self.assertTrue(_npallclose(outvals2d.ravel(), expected[:100], rtol=1e-12, atol=1e-12))
+
+
+class TestLU(_TestGradFunc):
+    """Tests for the LU class."""
+
+    def test_scalar(self):
+        """Tests scalar input values."""
+        grad_func = _LU()
+        eps = grad_func.eps
+        expected = [eps, eps, eps, 0.25, 0.5, 0.75, 1 - eps, 1 - eps, 1 - eps]
+        self._test_scalar(grad_func, expected)
+
+    def test_array(self):
+        """Tests NumPy array input values."""
+        self._test_array_matches_scalar(_LU())
+
+
+class TestPoly1V(_TestGradFunc):
+    """Tests for the Poly1V class."""
+
+    def test_scalar(self):
+        """Tests scalar input values."""
+        grad_func = _Poly1V([2, -1], [1, 2])
+        expected = []
+
+        for inval in _invals:
+            inval = _GradFunc.clamp(inval, grad_func.eps, 1 - grad_func.eps)
+            outval = float(0)
+            outval += 2.0 * (inval ** 1.0)
+            outval += -1.0 * (inval ** 2.0)
+            expected.append(_GradFunc.clamp(outval, 0, 1))
+        # end for
+
+        self._test_scalar(grad_func, expected)
+
+    def test_array(self):
+        """Tests NumPy array input values."""
+        self._test_array_matches_scalar(_Poly1V([0.2, 0.2, 0.2, 0.2, 0.2], [0.25, 0.5, 1, 2, 4]))
+        self._test_array_matches_scalar(_Poly1V([3, -2], [2, 3]))
+        self._test_array_matches_scalar(_Poly1V([1.5], [0.5]))
+
+
+def main():
+    """Runs this module as an executable."""
+    unittest.main(verbosity=1)
+
+
+if __name__ == "__main__":
+    main()
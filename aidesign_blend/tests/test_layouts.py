@@ -0,0 +1,197 @@
+"""Executable that tests the layouts module."""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import numpy
+import tempfile
+import unittest
+
+from os import path as ospath
+
+from aidesign_blend.libs import layouts
+from aidesign_blend.libs import utils
+
+_join = ospath.join
+_Layout = layouts.Layout
+_load = layouts.load
+_load_npz = layouts.load_npz
+_nparray = numpy.array
+_nparray_equal = numpy.array_equal
+_npsavez = numpy.savez
+_parse_flip_str = layouts.parse_flip_str
+_save_npz = layouts.save_npz
+_save_text = utils.save_text
+_TemporaryDirectory = tempfile.TemporaryDirectory
+_TestCase = unittest.TestCase
+
+_frags_text = str(
+    "- Fragment\n\n(X, Y): (0, 0)\nImage: \"C:\\\\frags\\\\it's é.png\"\nFlip: \"xy\"\n\n- End of fragment\n"
+    "- Fragment\n\n(X, Y): (0, 1)\nImage: \"b.png\"\nFlip: \"\"\n\n- End of fragment\n"
+    "- Fragment\n\n(X, Y): (1, 0)\nImage: \"b.png\"\nFlip: \"x\"\n\n- End of fragment\n"
+    "- Fragment\n\n(X, Y): (1, 1)\nImage: \"C:\\\\frags\\\\it's é.png\"\nFlip: \"y\"\n\n- End of fragment\n"
+)
+"""Text of a .txt fragment locations file."""
+
+
+def _make_layout():
+    frag_locs = ["a.png", "b.png", "c.png", "d/é.jpg"]
+    index_matrix = [[3, 0, 3], [0, 3, 3]]
+    flip_matrix = [[0, 1, 2], [3, 0, 1]]
+    rot_matrix = [[1, 0, 0], [0, 1, 0]]
+    result = _Layout(frag_locs, index_matrix, flip_matrix, rot_matrix)
+    return result
+
+
+def _find_locs_matrix(layout):
+    layout: _Layout = layout
+    result = _nparray(layout.frag_locs)[layout.index_matrix]
+    return result
+
+
+class TestLayout(_TestCase):
+    """Tests for the Layout class."""
+
+    def test_counts(self):
+        """Tests the fragment counts."""
+        layout = _make_layout()
+        self.assertEqual(layout.x_frag_count, 3)
+        self.assertEqual(layout.y_frag_count, 2)
+
+    def test_invalid(self):
+        """Tests making layouts with invalid matrices."""
+        with self.assertRaises(ValueError):
+            _Layout(["a.png"], [[0, 0]], [[0]], [[0, 0]])
+
+        with self.assertRaises(ValueError):
+            _Layout(["a.png"], [[0, 1]], [[0, 0]], [[0, 0]])
+
+    def test_dedup(self):
+        """Tests that deduplicating keeps only the used locations and the same layout."""
+        layout = _make_layout()
+        dedup_layout = layout.dedup()
+        self.assertEqual(dedup_layout.frag_locs, ["a.png", "d/é.jpg"])
+        self.assertTrue(_nparray_equal(_find_locs_matrix(dedup_layout), _find_locs_matrix(layout)))
+        self.assertTrue(_nparray_equal(dedup_layout.flip_matrix, layout.flip_matrix))
+        self.assertTrue(_nparray_equal(dedup_layout.rot_matrix, layout.rot_matrix))
+
+
+class TestNPZ(_TestCase):
+    """Tests for the save_npz and load_npz functions."""
+
+    def test_round_trip(self):
+        """Tests that loading a saved layout gets the same layout."""
+        layout = _make_layout()
+
+        with _TemporaryDirectory() as path:
+            loc = _join(path, "layout.npz")
+            _save_npz(layout, loc)
+            loaded_layout = _load_npz(loc)
+        # end with
+
+        self.assertTrue(_nparray_equal(_find_locs_matrix(loaded_layout), _find_locs_matrix(layout)))
+        self.assertTrue(_nparray_equal(loaded_layout.flip_matrix, layout.flip_matrix))
+        self.assertTrue(_nparray_equal(loaded_layout.rot_matrix, layout.rot_matrix))
+
+    def test_invalid(self):
+        """Tests loading a .npz file that is not a layout."""
+        with _TemporaryDirectory() as path:
+            loc = _join(path, "other.npz")
+            _npsavez(loc, values=_nparray([1, 2, 3]))
+
+            with self.assertRaises(ValueError):
+                _load_npz(loc)
+        # end with
+
+
+class TestLoad(_TestCase):
+    """Tests for the load function."""
+
+    def test_text(self):
+        """Tests loading a .txt fragment locations file."""
+        with _TemporaryDirectory() as path:
+            loc = _join(path, "locs.txt")
+            _save_text(_frags_text, loc)
+            layout = _load(loc)
+        # end with
+
+        self.assertEqual(layout.frag_locs, ["C:\\frags\\it's é.png", "b.png"])
+        self.assertEqual(layout.index_matrix.tolist(), [[0, 1], [1, 0]])
+        self.assertEqual(layout.flip_matrix.tolist(), [[3, 1], [0, 2]])
+        self.assertEqual(layout.rot_matrix.tolist(), [[0, 0], [0, 0]])
+
+    def test_text_rotation(self):
+        """Tests loading the rotation lines of a .txt fragment locations file."""
+        text = _frags_text.replace("Flip: \"xy\"\n", "Flip: \"xy\"\nRotation: \"180\"\n")
+        text = text.replace("Flip: \"x\"\n", "Flip: \"x\"\nRotation: \"0\"\n")
+
+        with _TemporaryDirectory() as path:
+            loc = _join(path, "locs.txt")
+            _save_text(text, loc)
+            layout = _load(loc)
+        # end with
+
+        self.assertEqual(layout.flip_matrix.tolist(), [[3, 1], [0, 2]])
+        self.assertEqual(layout.rot_matrix.tolist(), [[1, 0], [0, 0]])
+
+    def test_invalid(self):
+        """Tests loading invalid files."""
+        with _TemporaryDirectory() as path:
+            loc = _join(path, "locs.txt")
+            _save_text(_frags_text.replace("(1, 1)", "(1, 0)"), loc)
+
+            with self.assertRaises(ValueError):
+                _load(loc)
+
+            loc = _join(path, "locs.json")
+            _save_text("{}", loc)
+
+            with self.assertRaises(ValueError):
+                _load(loc)
+        # end with
+
+    def test_small_grid(self):
+        """Tests loading layouts with grids smaller than 2 x 2."""
+        with _TemporaryDirectory() as path:
+            loc = _join(path, "locs.csv")
+            _save_text("x,y,index,image,flip,rotation\n0,0,0,a.png,,0\n0,1,0,a.png,,0\n", loc)
+
+            with self.assertRaisesRegex(ValueError, "1 x 2 fragment grid"):
+                _load(loc)
+
+            loc = _join(path, "locs.npz")
+            _save_npz(_Layout(["a.png", "b.png"], [[0, 1]], [[0, 0]], [[0, 0]]), loc)
+
+            with self.assertRaisesRegex(ValueError, "2 x 1 fragment grid"):
+                _load(loc)
+        # end with
+
+    def test_negative_positions(self):
+        """Tests loading a layout with negative fragment positions."""
+        with _TemporaryDirectory() as path:
+            loc = _join(path, "locs.jsonl")
+            line = "{{\"x\": {}, \"y\": {}, \"image\": \"a.png\", \"flip\": \"\", \"rotation\": 0}}\n"
+            _save_text("".join(line.format(x, y) for x, y in [(-1, 0), (0, 0), (-1, 1), (0, 1)]), loc)
+
+            with self.assertRaisesRegex(ValueError, "negative"):
+                _load(loc)
+        # end with
+
+    def test_flip_names(self):
+        """Tests parsing the flip names."""
+        for flip in range(4):
+            self.assertEqual(_parse_flip_str(layouts.flip_str(flip)), flip)
+
+        with self.assertRaises(ValueError):
+            _parse_flip_str("yx")
+
+
+def main():
+    """Runs this module as an executable."""
+    unittest.main(verbosity=1)
+
+
+if __name__ == "__main__":
+    main()
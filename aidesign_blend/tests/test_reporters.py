@@ -0,0 +1,80 @@
+"""Executable that tests the reporters module."""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import json
+import tempfile
+import unittest
+
+from os import path as ospath
+
+from aidesign_blend.libs import reporters
+
+_join = ospath.join
+_loads_json = json.loads
+_ProgressEvents = reporters.ProgressEvents
+_ProgressReporter = reporters.ProgressReporter
+_TemporaryDirectory = tempfile.TemporaryDirectory
+_TestCase = unittest.TestCase
+
+
+class TestProgressReporter(_TestCase):
+    """Tests for the ProgressReporter class."""
+
+    def test_interval(self):
+        """Tests reporting at the first update and the completion within a long interval."""
+        lines = []
+        reporter = _ProgressReporter("task", "Done items", 10, "items", 3600, lines.append)
+
+        for _ in range(10):
+            reporter.update(1)
+
+        self.assertEqual(reporter.report_count, 2)
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("Done items: 1 / 10 (10.0%)  Rate: "))
+        self.assertTrue(lines[1].startswith("Done items: 10 / 10 (100.0%)  Rate: "))
+        self.assertIn("ETA: 0:00:00  Memory: ", lines[1])
+
+    def test_zero_interval(self):
+        """Tests reporting at each update with a zero interval."""
+        lines = []
+        reporter = _ProgressReporter("task", "Done items", 4, "items", 0, lines.append)
+
+        for _ in range(4):
+            reporter.update(1)
+
+        self.assertEqual(len(lines), 4)
+
+    def test_events(self):
+        """Tests the structured events of a task."""
+        with _TemporaryDirectory() as temp_path:
+            loc = _join(temp_path, "events.jsonl")
+            events = _ProgressEvents(loc, "Tag")
+            reporter = _ProgressReporter("task", "Done items", 3, "items", 3600, lambda line: None, events)
+            reporter.update(2)
+            reporter.update(1)
+            reporter.finish()
+            events.close()
+
+            with open(loc, "r") as events_file:
+                records = [_loads_json(line) for line in events_file]
+            # end with
+        # end with
+
+        self.assertEqual([record["event"] for record in records], ["start", "progress", "progress", "end"])
+        self.assertTrue(all(record["source"] == "Tag" and record["task"] == "task" for record in records))
+        self.assertEqual(records[2]["done"], 3)
+        self.assertEqual(records[2]["percent"], 100)
+        self.assertEqual(records[2]["eta_secs"], 0)
+
+
+def main():
+    """Runs this module as an executable."""
+    unittest.main(verbosity=1)
+
+
+if __name__ == "__main__":
+    main()
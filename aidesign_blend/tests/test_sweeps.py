@@ -0,0 +1,117 @@
+"""Executable that tests the sweeps module."""
+
+# Copyright 2022-2023 Yucheng Liu. GNU GPL3 license.
+# GNU GPL3 license copy: https://www.gnu.org/licenses/gpl-3.0.txt
+# First added by username: liu-yucheng
+# Last updated by username: liu-yucheng
+
+import numpy
+import os
+import pathlib
+import tempfile
+import unittest
+
+from os import path as ospath
+from PIL import Image as pil_image
+
+from aidesign_blend.libs import blenders
+from aidesign_blend.libs import configs
+from aidesign_blend.libs import sweeps
+
+_Blender = blenders.Blender
+_BlendersConfig = configs.BlendersConfig
+_join = ospath.join
+_listdir = os.listdir
+_nparray = numpy.array
+_nparray_equal = numpy.array_equal
+_parse_seeds = sweeps.parse_seeds
+_Path = pathlib.Path
+_pil_image_open = pil_image.open
+_run_sweep = sweeps.run_sweep
+_TemporaryDirectory = tempfile.TemporaryDirectory
+_TestCase = unittest.TestCase
+
+_tests_path = str(_Path(__file__).parent)
+_repo_path = str(_Path(_tests_path).parent.parent)
+_default_test_data_path = _join(_repo_path, "aidesign_blend_default_configs", "test_data")
+_default_proj_path = _join(_default_test_data_path, "test_project")
+_default_frags_path = _join(_default_test_data_path, "test_frags")
+
+
+def _make_proj(proj_path):
+    config = _BlendersConfig.load_from_path(_default_proj_path)
+    config["x_frag_count"] = 7
+    config["y_frag_count"] = 5
+    config["save_frag_locations"] = True
+    _BlendersConfig.save_to_path(config, proj_path)
+
+
+def _read_results(proj_path, tag):
+    """Returns image, locs_text."""
+    names = _listdir(proj_path)
+    blended_name = [name for name in names if name.startswith(f"Blended-From-test_frags{tag}-")][0]
+    locs_name = [name for name in names if name.startswith(f"Frag-Locations-From-test_frags{tag}-")][0]
+
+    with _pil_image_open(_join(proj_path, blended_name)) as image:
+        image = _nparray(image)
+
+    with open(_join(proj_path, locs_name), "r") as locs_file:
+        locs_text = locs_file.read()
+
+    return image, locs_text
+
+
+class TestParseSeeds(_TestCase):
+    """Tests for the parse_seeds function."""
+
+    def test_norm(self):
+        """Tests parsing seeds and seed ranges."""
+        self.assertEqual(_parse_seeds("1..4"), [1, 2, 3, 4])
+        self.assertEqual(_parse_seeds("7, 1..3,2,9..9"), [7, 1, 2, 3, 9])
+
+    def test_invalid(self):
+        """Tests parsing invalid seeds strings."""
+        for seeds_str in ["", "a", "4..1", "-1", "1..", "1,,2"]:
+            with self.assertRaises(ValueError):
+                _parse_seeds(seeds_str)
+        # end for
+
+
+class TestRunSweep(_TestCase):
+    """Tests for the run_sweep function."""
+
+    def test_match_serial(self):
+        """Tests that the sweep results match the serial results with the same seeds."""
+        seeds = [3, 11]
+
+        with _TemporaryDirectory() as proj_path:
+            _make_proj(proj_path)
+            _run_sweep(_default_frags_path, proj_path, seeds, 2, [], 0)
+            sweep_results = [_read_results(proj_path, f"-Seed-{seed}") for seed in seeds]
+        # end with
+
+        for seed, sweep_result in zip(seeds, sweep_results):
+            with _TemporaryDirectory() as proj_path:
+                _make_proj(proj_path)
+                blender = _Blender(_default_frags_path, proj_path, [], 0)
+                blender.config_overrides["manual_seed"] = seed
+                blender.prep()
+                blender.blend()
+                serial_image, serial_locs_text = _read_results(proj_path, "")
+            # end with
+
+            sweep_image, sweep_locs_text = sweep_result
+            self.assertTrue(_nparray_equal(serial_image, sweep_image))
+            self.assertEqual(serial_locs_text, sweep_locs_text)
+        # end for
+
+        self.assertNotEqual(sweep_results[0][1], sweep_results[1][1])
+
+
+def main():
+    """Runs this module as an executable."""
+    unittest.main(verbosity=1)
+
+
+if __name__ == "__main__":
+    main()